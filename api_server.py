@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, web
+
+from matching import (
+    fuse_scores,
+    hybrid_result_rows,
+    keyword_result_rows,
+    reciprocal_rank_fusion,
+    score_keywords,
+    score_vectors_batch,
+    top_k,
+    vector_result_rows,
+)
+from keyword_weights import WEIGHTING_METHODS, KeywordStats, score_keywords_weighted
+from mongo_config import get_database
+from range_search import attach_or_build_range_index
+from resume_index import count_duplicate_resumes
+from shared_index import attach_index, attach_or_load_index, current_version
+from stage_timing import percentiles
+
+# Latency samples kept per route for /stats
+LATENCY_WINDOW = 10000
+DUPLICATE_STATS_TTL = 60
+
+
+class VectorBatcher:
+    """Coalesce concurrent vector queries into one matrix multiply.
+
+    Queries arriving within max_wait seconds of each other (up to max_batch)
+    are scored together with score_vectors_batch on a worker thread.
+    """
+
+    def __init__(self, index, max_batch=64, max_wait=0.005):
+        self.index = index
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self._queue = asyncio.Queue()
+
+    async def score(self, jd_embedding):
+        """Return the vector match percentage of every row for one JD embedding."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((jd_embedding, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batch_sizes.append(len(batch))
+            try:
+                scores = await loop.run_in_executor(
+                    None, score_vectors_batch, self.index, [embedding for embedding, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for column, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(scores[:, column])
+
+@web.middleware
+async def record_latency(request, handler):
+    start = time.perf_counter()
+    try:
+        return await handler(request)
+    finally:
+        route = request.match_info.route.resource
+        name = route.canonical if route is not None else "unmatched"
+        request.app["latencies"][name].append(time.perf_counter() - start)
+
+def number_field(body, name, default, kind=float, minimum=None):
+    """Read a numeric body field, answering 400 when it is not a number (or below minimum)."""
+    value = body.get(name, default)
+    try:
+        if isinstance(value, bool):
+            raise TypeError(name)
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise web.HTTPBadRequest(text=f"{name} must be a number")
+    if minimum is not None and number < minimum:
+        raise web.HTTPBadRequest(text=f"{name} must be at least {minimum}")
+    return number
+
+async def resolve_jd(request, body):
+    """Return (keywords, embedding) from an inline JD or a stored jobId."""
+    if "jd_id" not in body:
+        return body.get("keywords") or [], body.get("embedding")
+    jds = request.app["jds"]
+    jd = jds.get(body["jd_id"])
+    if jd is None:
+        jd = await asyncio.get_running_loop().run_in_executor(
+            None, request.app["db"]["job_description"].find_one, {"jobId": body["jd_id"]}
+        )
+        if jd is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": "job description not found"}),
+                                   content_type="application/json")
+        jds[body["jd_id"]] = jd
+    return jd.get("structured_query", {}).get("keywords", []), jd.get("embedding")
+
+async def match(request):
+    mode = request.match_info["mode"]
+    if mode not in ("keyword", "vector", "hybrid"):
+        raise web.HTTPNotFound()
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="request body must be a JSON object")
+    num_candidates = number_field(body, "k", 50, int, minimum=0)
+    threshold = number_field(body, "threshold", 80)
+    keyword_weight = number_field(body, "keyword_weight", 0.7)
+    vector_weight = number_field(body, "vector_weight", 0.3)
+    jd_keywords, jd_embedding = await resolve_jd(request, body)
+    index = request.app["index"]
+    loop = asyncio.get_running_loop()
+
+    if mode == "vector" and "min_score" in body:
+        rows, vector_percentage = await loop.run_in_executor(
+            None, request.app["range_index"].search, jd_embedding, number_field(body, "min_score", None)
+        )
+        rows = rows[:num_candidates] if "k" in body else rows
+        results = vector_result_rows(index, rows, dict(zip(rows, vector_percentage)))
+        return web.json_response({"results": results})
+
+    if mode == "vector":
+        vector_percentage = await request.app["batcher"].score(jd_embedding)
+        rows = top_k(vector_percentage, num_candidates)
+        return web.json_response({"results": vector_result_rows(index, rows, vector_percentage)})
+
+    if body.get("weighting") not in (None, *WEIGHTING_METHODS):
+        raise web.HTTPBadRequest(text=f"weighting must be one of {', '.join(WEIGHTING_METHODS)}")
+    if mode == "keyword" and body.get("weighting"):
+        keyword_task = loop.run_in_executor(
+            None, score_keywords_weighted, index, jd_keywords, request.app["keyword_stats"],
+            body["weighting"], threshold,
+        )
+    else:
+        keyword_task = loop.run_in_executor(None, score_keywords, index, jd_keywords, threshold)
+    if mode == "keyword":
+        jd_keywords_normalized, keyword_percentage, hits = await keyword_task
+        rows = top_k(keyword_percentage, num_candidates)
+        results = keyword_result_rows(index, rows, keyword_percentage, hits, jd_keywords_normalized)
+        return web.json_response({"results": results})
+
+    (jd_keywords_normalized, keyword_percentage, hits), vector_percentage = await asyncio.gather(
+        keyword_task, request.app["batcher"].score(jd_embedding)
+    )
+    fuse = reciprocal_rank_fusion if body.get("method") == "rrf" else fuse_scores
+    final_score = fuse(
+        keyword_percentage, vector_percentage,
+        keyword_weight, vector_weight,
+    )
+    rows = top_k(final_score, num_candidates)
+    results = hybrid_result_rows(
+        index, rows, keyword_percentage, vector_percentage, final_score, hits, jd_keywords_normalized
+    )
+    return web.json_response({"results": results})
+
+async def resume_details(request):
+    resume = await asyncio.get_running_loop().run_in_executor(
+        None, request.app["db"]["resumes"].find_one,
+        {"resumeId": request.match_info["resume_id"]}, {"embedding": 0},
+    )
+    if resume is None:
+        raise web.HTTPNotFound(text=json.dumps({"error": "resume not found"}), content_type="application/json")
+    return web.json_response(resume, dumps=lambda obj: json.dumps(obj, default=str))
+
+async def duplicate_stats(request):
+    cached_at, stats = request.app["duplicate_stats"]
+    if stats is None or time.monotonic() - cached_at > DUPLICATE_STATS_TTL:
+        groups, duplicates = await asyncio.get_running_loop().run_in_executor(
+            None, count_duplicate_resumes, request.app["db"]["resumes"]
+        )
+        stats = {"duplicate_groups": groups, "total_duplicates": duplicates}
+        request.app["duplicate_stats"] = (time.monotonic(), stats)
+    return web.json_response(stats)
+
+async def list_jds(request):
+    return web.json_response({"jd_ids": list(request.app["jds"])})
+
+async def server_stats(request):
+    uptime = time.monotonic() - request.app["started_at"]
+    routes = {}
+    for name, samples in request.app["latencies"].items():
+        routes[name] = {"count": len(samples), **percentiles(list(samples))}
+    batch_sizes = request.app["batcher"].batch_sizes
+    return web.json_response({
+        "resumes": len(request.app["index"]),
+        "uptime_s": round(uptime, 1),
+        "routes": routes,
+        "mean_vector_batch": round(float(np.mean(batch_sizes)), 2) if batch_sizes else None,
+    })
+
+async def health(request):
+    return web.json_response({"status": "ok", "resumes": len(request.app["index"])})
+
+async def warm_up(app):
+    """Load the index and the JD table before serving the first request."""
+    loop = asyncio.get_running_loop()
+    # Pin the published version, so range bounds shared under it match the attached index
+    version = current_version()
+    if version:
+        app["index"] = await loop.run_in_executor(None, lambda: attach_index(version=version))
+    else:
+        app["index"] = await loop.run_in_executor(None, attach_or_load_index, app["db"]["resumes"])
+    app["keyword_stats"] = await loop.run_in_executor(None, KeywordStats.from_index, app["index"])
+    app["range_index"] = await loop.run_in_executor(None, attach_or_build_range_index, app["index"], version)
+    jds = await loop.run_in_executor(None, list, app["db"]["job_description"].find({"jobId": {"$exists": True}}))
+    app["jds"] = {jd["jobId"]: jd for jd in jds}
+    app["batcher"] = VectorBatcher(app["index"])
+    app["batcher_task"] = asyncio.create_task(app["batcher"].run())
+    app["started_at"] = time.monotonic()
+
+async def shut_down(app):
+    app["batcher_task"].cancel()
+
+def create_app(db):
+    app = web.Application(middlewares=[record_latency])
+    app["db"] = db
+    app["latencies"] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+    app["duplicate_stats"] = (0, None)
+    app.on_startup.append(warm_up)
+    app.on_cleanup.append(shut_down)
+    app.add_routes([
+        web.post("/match/{mode}", match),
+        web.get("/resumes/{resume_id}", resume_details),
+        web.get("/duplicates", duplicate_stats),
+        web.get("/jds", list_jds),
+        web.get("/stats", server_stats),
+        web.get("/health", health),
+    ])
+    return app
+
+async def run_load(url, mode, concurrency, total_requests, num_candidates):
+    """Drive /match/<mode> with concurrent clients and report throughput and latency."""
+    async with ClientSession(connector=TCPConnector(limit=concurrency), timeout=ClientTimeout(total=60)) as session:
+        async with session.get(f"{url}/jds") as response:
+            jd_ids = (await response.json())["jd_ids"]
+        if not jd_ids:
+            raise SystemExit("no job descriptions to query")
+
+        latencies, errors = [], 0
+        remaining = iter(range(total_requests))
+
+        async def client():
+            nonlocal errors
+            for _ in remaining:
+                body = {"jd_id": random.choice(jd_ids), "k": num_candidates}
+                start = time.perf_counter()
+                async with session.post(f"{url}/match/{mode}", json=body) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        async with session.get(f"{url}/stats") as response:
+            server = await response.json()
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "throughput_rps": round(total_requests / elapsed, 1),
+        **percentiles(latencies),
+        "server": server,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP matching API over a warm in-memory index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve")
+    serve.add_argument("--mongo-uri")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+
+    bench = subparsers.add_parser("bench", help="load-test a running server")
+    bench.add_argument("--url", default="http://127.0.0.1:8080")
+    bench.add_argument("--mode", default="hybrid", choices=["keyword", "vector", "hybrid"])
+    bench.add_argument("--concurrency", type=int, default=32)
+    bench.add_argument("--requests", type=int, default=1000)
+    bench.add_argument("--k", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        web.run_app(create_app(get_database(args.mongo_uri)), host=args.host, port=args.port)
+    else:
+        report = asyncio.run(run_load(args.url, args.mode, args.concurrency, args.requests, args.k))
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
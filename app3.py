@@ -60,8 +60,20 @@ def fuzzy_match(keyword, target_keywords, threshold=80):
     """Perform fuzzy matching with a similarity threshold."""
     return any(fuzz.ratio(keyword, tk) >= threshold for tk in target_keywords)
 
+# Function to calculate the cosine match percentage of two embeddings
+def vector_match_percentage(jd_embedding, resume_embedding):
+    """Return the cosine similarity as a percentage, or 0 if it cannot be computed."""
+    if not jd_embedding or not resume_embedding:
+        return 0
+    dot_product = sum(a * b for a, b in zip(jd_embedding, resume_embedding))
+    magnitude_jd = sum(a * a for a in jd_embedding) ** 0.5
+    magnitude_resume = sum(b * b for b in resume_embedding) ** 0.5
+    if magnitude_jd == 0 or magnitude_resume == 0:
+        return 0
+    return round(dot_product / (magnitude_jd * magnitude_resume) * 100, 2)
+
 # Function to calculate keyword match percentage
-def find_keyword_matches(jd_keywords, num_candidates=10, keyword_weight=0.7, vector_weight=0.3):
+def find_keyword_matches(jd_keywords, jd_embedding=None, num_candidates=10, keyword_weight=0.7, vector_weight=0.3):
     """Match resumes to job descriptions using keywords and vector similarity."""
     results = []
     resumes = resume_collection.find().limit(num_candidates)
@@ -89,14 +101,15 @@ def find_keyword_matches(jd_keywords, num_candidates=10, keyword_weight=0.7, vec
             continue
         match_percentage = round((match_count / total_keywords) * 100, 2)
 
-        # Example: Combine with vector similarity score (mocked here for demo)
-        vector_score = 85  # Placeholder value for vector similarity
+        # Combine with the resume's vector similarity (0 if either embedding is missing)
+        vector_score = vector_match_percentage(jd_embedding, resume.get("embedding"))
         final_score = (match_percentage * keyword_weight) + (vector_score * vector_weight)
 
         results.append({
             "Resume ID": resume.get("resumeId"),
             "Name": resume.get("name", "N/A"),
             "Match Percentage (Keywords)": match_percentage,
+            "Match Percentage (Vector)": vector_score,
             "Final Score": round(final_score, 2),
             "Matching Keywords": matching_keywords
         })
@@ -179,7 +192,7 @@ def main():
 
         # Keyword Matching
         st.subheader("Top Matches (Keywords)")
-        keyword_matches = find_keyword_matches(jd_keywords)
+        keyword_matches = find_keyword_matches(jd_keywords, jd_embedding)
         if keyword_matches:
             keyword_match_df = pd.DataFrame(keyword_matches).astype(str)
             st.dataframe(keyword_match_df, use_container_width=True, height=300)
@@ -2,25 +2,93 @@ import streamlit as st
 import pandas as pd
 from pymongo import MongoClient
 import requests
-import re
-from rapidfuzz import fuzz
 import os
+import numpy as np
+
+from batch_scorer import MATCHES_COLLECTION, read_leaderboard
+from bulk_loader import load_resume_index_parallel
+from cascade import SHORTLIST_STAGES, rerank_fuzzy
+from cascade import find_keyword_matches_cascade as shortlist_keyword_matches
+from facets import (
+    FACET_COUNTS_COLLECTION,
+    filtered_keyword_matches,
+    filtered_top_matches,
+    load_facet_index,
+    read_facet_counts,
+)
+from jd_embedding import EMBEDDING_CACHE_COLLECTION, EmbeddingCache, JdEmbedder, normalize_jd_text
+from jd_index import best_jds, jd_index_token, load_jd_index
+from keyword_weights import KEYWORD_STATS_COLLECTION, KeywordStats, load_keyword_stats, score_keywords_weighted
+from matcher_service import ScatterGatherMatcher
+from matching import (
+    cosine_percentages, hybrid_result_rows, keyword_result_rows, score_hybrid, similar_resumes, stream_matches,
+    top_k, vector_result_rows,
+)
+from mongo_profiler import MONGO_PROFILER, query_volume_change
+from parallel_scoring import ShardedScorer
+from profile_capture import PROFILE_MODES, capture, set_capture_tags
+from range_search import attach_or_build_range_index, find_matches_above
+from resume_index import build_resume_index, count_duplicate_resumes
+from shared_index import attach_index, current_version
+from stage_timing import TIMINGS, start_metrics_server
 
 # Disable Streamlit's file watcher to avoid inotify limit issues
 os.environ["STREAMLIT_SERVER_FILE_WATCHER_TYPE"] = "none"
 
 # MongoDB connection details
 mongo_uri = st.secrets["mongo"]["uri"]
-client = MongoClient(mongo_uri)
+client = MongoClient(mongo_uri, event_listeners=[MONGO_PROFILER])
 
 # Accessing the database and collections
 db = client["resumes_database"]
 resume_collection = db["resumes"]  # Collection for resumes
 jd_collection = db["job_description"]  # Collection for job descriptions
+matches_collection = db[MATCHES_COLLECTION]  # Per-JD leaderboards written by batch_scorer.py
+facet_counts_collection = db[FACET_COUNTS_COLLECTION]  # Maintained by facets.py and leaderboard_updates.py
 
 # Lambda function URL for processing job descriptions
 lambda_url = "https://ljlj3twvuk.execute-api.ap-south-1.amazonaws.com/default/getJobDescriptionVector"
 
+# Sidebar ranking choices and the fusion method each one uses
+RANKING_METHODS = {
+    "Separate keyword and vector tables": None,
+    "Hybrid (weighted sum)": "weighted",
+    "Hybrid (reciprocal rank fusion)": "rrf",
+}
+
+# Sidebar keyword weighting choices and the keyword_weights method each one uses
+KEYWORD_WEIGHTINGS = {
+    "Equal": None,
+    "IDF": "idf",
+    "BM25": "bm25",
+}
+
+# Resume fields read for the detail columns of the result tables
+DETAIL_PROJECTION = {"_id": 0, "resumeId": 1, "keywords": 1, "jobExperiences": 1, "educationalQualifications": 1}
+
+# Resume fields the first-page keyword and vector matchers read for their candidate window
+WINDOW_KEYWORD_PROJECTION = {
+    "_id": 0, "resumeId": 1, "name": 1, "email": 1, "contactNo": 1, "candidateKey": 1, "keywords": 1,
+    "keywords_norm": 1,
+}
+WINDOW_VECTOR_PROJECTION = {
+    "_id": 0, "resumeId": 1, "name": 1, "email": 1, "contactNo": 1, "candidateKey": 1, "embedding": 1,
+}
+
+# Resumes scored between table refreshes in streaming mode
+STREAM_CHUNK_SIZE = 20000
+
+# Result table rows shown per page; detail columns are only read for these
+RESULTS_PAGE_SIZE = 25
+
+# Sidebar and panel labels for the facets in facets.FACET_FIELDS
+FACET_LABELS = {
+    "degree": "Degree",
+    "field": "Field of Study",
+    "title": "Job Title",
+    "company": "Employer",
+}
+
 # Set Streamlit page configuration for a wider layout
 st.set_page_config(layout="wide")
 
@@ -47,152 +115,316 @@ def load_css():
         unsafe_allow_html=True,
     )
 
-def preprocess_keyword(keyword):
-    """Preprocess a keyword by normalizing its format."""
-    keyword = keyword.casefold().strip()
-    keyword = re.sub(r'[^\w\s]', '', keyword)
-    return ' '.join(sorted(keyword.split()))
-
-def fuzzy_match(keyword, target_keywords, threshold=80):
-    """Perform fuzzy matching with a similarity threshold."""
-    return any(fuzz.ratio(keyword, tk) >= threshold for tk in target_keywords)
-
+@TIMINGS.timed("find_duplicate_resumes")
 def find_duplicate_resumes():
-    """Find duplicate resumes based on email and phone number."""
-    duplicates = {}
-    all_resumes = list(resume_collection.find())
-    
-    # Group resumes by email and phone
-    for resume in all_resumes:
-        email = resume.get('email')
-        phone = resume.get('contactNo')
-        
-        # Create a key only if either email or phone is not None
-        if email or phone:
-            key = f"{email}_{phone}"
-            if key in duplicates:
-                duplicates[key].append(resume)
-            else:
-                duplicates[key] = [resume]
-    
-    # Filter out non-duplicates
-    duplicate_groups = {k: v for k, v in duplicates.items() if len(v) > 1}
-    total_duplicates = sum(len(group) - 1 for group in duplicate_groups.values())
-    
-    return total_duplicates
-
+    """Find duplicate resumes based on email and phone number (grouped on the server)."""
+    return count_duplicate_resumes(resume_collection)[1]
+
+def detail_columns(resume):
+    """Format the Skills, Job Experiences and Educational Qualifications cells of one resume."""
+    job_experiences = [
+        f"{job.get('title', 'N/A')} at {job.get('companyName', 'N/A')}" 
+        for job in resume.get("jobExperiences") or []
+    ]
+    educational_qualifications = [
+        f"{edu.get('degree', 'N/A')} in {edu.get('field', 'N/A')}" 
+        for edu in resume.get("educationalQualifications") or []
+    ]
+    return {
+        "Skills": ", ".join(resume.get("keywords") or []),
+        "Job Experiences": "; ".join(job_experiences),
+        "Educational Qualifications": "; ".join(educational_qualifications),
+    }
+
+def with_detail_columns(matches):
+    """Add the detail columns to result rows, reading just those resumes in one $in query.
+
+    Called on the rows being displayed only; tables without a "Resume ID"
+    column (e.g. job descriptions) are returned as they are. Rows whose
+    resume has no resumeId cannot be looked up and get empty detail cells.
+    """
+    if not matches or "Resume ID" not in matches[0]:
+        return matches
+    resumes = {}
+    resume_ids = [match["Resume ID"] for match in matches if match["Resume ID"] is not None]
+    if resume_ids:
+        for resume in resume_collection.find({"resumeId": {"$in": resume_ids}}, DETAIL_PROJECTION):
+            resumes.setdefault(resume["resumeId"], resume)
+    return [{**match, **detail_columns(resumes.get(match["Resume ID"], {}))} for match in matches]
+
+def candidate_window(projection, num_candidates):
+    """Read the first num_candidates * 2 resumes in collection order.
+
+    This is the window the first-page matchers have always scanned: twice
+    as many documents to allow for duplicates, documents without a resumeId
+    included. Only the fields in projection are read.
+    """
+    cursor = resume_collection.find({}, projection).limit(num_candidates * 2)
+    return list(TIMINGS.iterate("mongo_fetch", cursor))
+
+@TIMINGS.accumulate("preprocess_keyword")
+def index_keyword_window(resumes):
+    """Normalize the window's keywords into a ResumeIndex, one row per candidate."""
+    return build_resume_index(resumes)
+
+def window_result_rows(matches):
+    """Show a missing resumeId as None, as the document-based matchers did."""
+    return [{**match, "Resume ID": match["Resume ID"] or None} for match in matches]
+
+@TIMINGS.timed("find_keyword_matches")
 def find_keyword_matches(jd_keywords, num_candidates=50):
     """Match resumes to job descriptions using keywords."""
-    results = []
-    seen_keys = set()
-    resumes = resume_collection.find().limit(num_candidates * 2)  # Fetch more to account for duplicates
-
-    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
-
-    for resume in resumes:
-        # Create a unique key based on email and phone
-        key = f"{resume.get('email')}_{resume.get('contactNo')}"
-        
-        # Skip if we've already seen this combination
-        if key in seen_keys:
-            continue
-        seen_keys.add(key)
-
-        resume_keywords = resume.get("keywords") or []
-        if not resume_keywords:
-            continue
-
-        resume_keywords_normalized = [preprocess_keyword(keyword) for keyword in resume_keywords]
-
-        matching_keywords = [
-            keyword for keyword in jd_keywords_normalized
-            if any(preprocess_keyword(keyword) == rk or fuzzy_match(keyword, [rk]) for rk in resume_keywords_normalized)
-        ]
-
-        match_count = len(matching_keywords)
-        total_keywords = len(jd_keywords_normalized)
-        if total_keywords == 0:
-            continue
-        match_percentage = round((match_count / total_keywords) * 100, 2)
-
-        # Add new fields for the table
-        skills = ", ".join(resume_keywords)
-        job_experiences = [
-            f"{job.get('title', 'N/A')} at {job.get('companyName', 'N/A')}" 
-            for job in resume.get("jobExperiences") or []
-        ]
-        educational_qualifications = [
-            f"{edu.get('degree', 'N/A')} in {edu.get('field', 'N/A')}" 
-            for edu in resume.get("educationalQualifications") or []
-        ]
-
-        results.append({
-            "Resume ID": resume.get("resumeId"),
-            "Name": resume.get("name", "N/A"),
-            "Match Percentage (Keywords)": match_percentage,
-            "Matching Keywords": matching_keywords,
-            "Skills": skills,
-            "Job Experiences": "; ".join(job_experiences),
-            "Educational Qualifications": "; ".join(educational_qualifications),
-        })
-
-        if len(results) >= num_candidates:
-            break
-
-    return sorted(results, key=lambda x: x["Match Percentage (Keywords)"], reverse=True)
+    window = index_keyword_window(candidate_window(WINDOW_KEYWORD_PROJECTION, num_candidates))
+    # The first num_candidates candidates with keywords
+    rows = np.flatnonzero(np.diff(window.keyword_offsets) > 0)[:num_candidates]
+    with TIMINGS.part("fuzzy_match"):
+        jd_keywords_normalized, match_percentage, hits = rerank_fuzzy(window, rows, jd_keywords)
+    if not jd_keywords_normalized:
+        return []
+    with TIMINGS.part("sort"):
+        order = top_k(match_percentage)
+    return window_result_rows(keyword_result_rows(
+        window, rows[order], dict(zip(rows[order], match_percentage[order])),
+        dict(zip(rows[order], hits[order])), jd_keywords_normalized,
+    ))
+
+def find_keyword_matches_cascade(jd_keywords, jd_embedding, shortlist_size=300, stage="vector", num_candidates=50):
+    """Shortlist from the in-memory index, then fuzzy-match only the shortlist."""
+    return shortlist_keyword_matches(
+        get_resume_index(), jd_keywords, jd_embedding, shortlist_size, stage, num_candidates
+    )
 
+@TIMINGS.timed("find_top_matches")
 def find_top_matches(jd_embedding, num_candidates=50):
     """Find top matches using vector similarity."""
-    results = []
-    seen_keys = set()
-    resumes = resume_collection.find().limit(num_candidates * 2)
-
-    for resume in resumes:
-        # Create a unique key based on email and phone
-        key = f"{resume.get('email')}_{resume.get('contactNo')}"
-        
-        # Skip if we've already seen this combination
-        if key in seen_keys:
-            continue
-        seen_keys.add(key)
-
-        resume_embedding = resume.get("embedding")
-        if not resume_embedding:
-            continue
-
-        dot_product = sum(a * b for a, b in zip(jd_embedding, resume_embedding))
-        magnitude_jd = sum(a * a for a in jd_embedding) ** 0.5
-        magnitude_resume = sum(b * b for b in resume_embedding) ** 0.5
-        if magnitude_jd == 0 or magnitude_resume == 0:
-            continue
-        similarity_score = dot_product / (magnitude_jd * magnitude_resume)
-
-        match_percentage = round(similarity_score * 100, 2)
-
-        # Add new fields for the table
-        skills = ", ".join(resume.get("keywords") or [])
-        job_experiences = [
-            f"{job.get('title', 'N/A')} at {job.get('companyName', 'N/A')}" 
-            for job in resume.get("jobExperiences") or []
-        ]
-        educational_qualifications = [
-            f"{edu.get('degree', 'N/A')} in {edu.get('field', 'N/A')}" 
-            for edu in resume.get("educationalQualifications") or []
-        ]
-
-        results.append({
-            "Resume ID": resume.get("resumeId"),
-            "Name": resume.get("name", "N/A"),
-            "Match Percentage (Vector)": match_percentage,
-            "Skills": skills,
-            "Job Experiences": "; ".join(job_experiences),
-            "Educational Qualifications": "; ".join(educational_qualifications),
-        })
-
-        if len(results) >= num_candidates:
-            break
+    window = build_resume_index(candidate_window(WINDOW_VECTOR_PROJECTION, num_candidates))
+    # The first num_candidates candidates with an embedding
+    rows = np.flatnonzero(window.norms > 0)[:num_candidates]
+    with TIMINGS.part("cosine"):
+        match_percentage = cosine_percentages(window.embeddings[rows], window.norms[rows], [jd_embedding])[:, 0]
+    with TIMINGS.part("sort"):
+        order = top_k(match_percentage)
+    return window_result_rows(vector_result_rows(window, rows[order], dict(zip(rows[order], match_percentage[order]))))
+
+@st.cache_resource
+def load_local_resume_index():
+    """Load the full resume corpus into this server process."""
+    return load_resume_index_parallel(resume_collection)
+
+@st.cache_resource(max_entries=2)
+def attach_shared_index(version):
+    """Map a version published by shared_index.py; the pages are shared by all replicas."""
+    return attach_index(version=version)
+
+def get_resume_index():
+    """Use the published shared index when there is one, else a private copy."""
+    version = current_version()
+    if version:
+        return attach_shared_index(version)
+    return load_local_resume_index()
+
+@st.cache_resource(max_entries=1)
+def get_sharded_scorer(version):
+    """Start the shard worker processes once per index version."""
+    # Workers map their slices of a published version instead of copying the embeddings
+    index = attach_shared_index(version) if version else load_local_resume_index()
+    return ShardedScorer(index, version=version)
+
+@st.cache_resource
+def get_scatter_gather_matcher(worker_urls):
+    """Coordinator for shard workers started with matcher_service.py."""
+    return ScatterGatherMatcher(worker_urls.split(","))
+
+@st.cache_resource(max_entries=1)
+def get_facet_index(version):
+    """Degree, employer and must-have keyword row sets for the current index."""
+    return load_facet_index(resume_collection, get_resume_index())
+
+@st.cache_resource(max_entries=1, ttl=600)
+def get_keyword_stats(version):
+    """Stored document frequencies (kept current on ingestion), else the index's own."""
+    return load_keyword_stats(db[KEYWORD_STATS_COLLECTION]) or KeywordStats.from_index(get_resume_index())
+
+def find_weighted_keyword_matches(jd_keywords, method="idf", num_candidates=50):
+    """Rank the full corpus with keywords weighted by how rare they are."""
+    index = get_resume_index()
+    jd_keywords_normalized, scores, hits = score_keywords_weighted(
+        index, jd_keywords, get_keyword_stats(current_version()), method
+    )
+    rows = top_k(scores, num_candidates)
+    return keyword_result_rows(index, rows, scores, hits, jd_keywords_normalized)
+
+@st.cache_resource(max_entries=1)
+def get_range_search_index(version):
+    """Pruning bounds for thresholded vector queries, mapped from the published version when there is one."""
+    index = attach_shared_index(version) if version else load_local_resume_index()
+    return attach_or_build_range_index(index, version)
+
+@st.cache_resource(max_entries=1)
+def get_jd_index(token):
+    """JD vectors for resume-to-JD matching; a new token (JDs added or removed) reloads them."""
+    return load_jd_index(jd_collection)
+
+@st.cache_resource
+def get_jd_embedder():
+    """Pooled client for the embedding lambda, caching results on disk and in MongoDB."""
+    url = os.environ.get("JD_EMBEDDING_URL", lambda_url)
+    return JdEmbedder(url, EmbeddingCache(collection=db[EMBEDDING_CACHE_COLLECTION]))
+
+def find_similar_candidates(resume, num_candidates=10):
+    """Resumes closest to this one in the shared vector index."""
+    return similar_resumes(get_resume_index(), resume.get("resumeId"), resume.get("embedding"), num_candidates)
+
+def find_best_jds(resume, num_candidates=10):
+    """Job descriptions that best fit this resume."""
+    return best_jds(get_jd_index(jd_index_token(jd_collection)), resume, num_candidates)
+
+def find_hybrid_matches(jd_keywords, jd_embedding, method="weighted", keyword_weight=0.7, num_candidates=50):
+    """Rank the full corpus by fused keyword and vector score in one vectorized pass."""
+    index = get_resume_index()
+    jd_keywords_normalized, keyword_percentage, vector_percentage, final_score, hits = score_hybrid(
+        index, jd_keywords, jd_embedding, keyword_weight, 1 - keyword_weight, method=method
+    )
+    rows = top_k(final_score, num_candidates)
+    return hybrid_result_rows(
+        index, rows, keyword_percentage, vector_percentage, final_score, hits, jd_keywords_normalized
+    )
 
-    return sorted(results, key=lambda x: x["Match Percentage (Vector)"], reverse=True)
+def stream_full_corpus_matches(jd_keywords, jd_embedding, num_candidates=50):
+    """Scan the full corpus chunk by chunk, refreshing both top-k tables and a progress bar as chunks finish.
+
+    The interim tables are replaced by the regular ones once the scan is done.
+    """
+    index = get_resume_index()
+    progress = st.progress(0.0, text="Scoring resumes...")
+    keyword_slot, vector_slot = st.empty(), st.empty()
+    keyword_matches, vector_matches = [], []
+    for done, keyword_matches, vector_matches in stream_matches(
+        index, jd_keywords, jd_embedding, num_candidates, STREAM_CHUNK_SIZE
+    ):
+        progress.progress(done / len(index), text=f"Scored {done:,} of {len(index):,} resumes")
+        for slot, heading, matches in (
+            (keyword_slot, "Top Matches (Keywords) so far", keyword_matches),
+            (vector_slot, "Top Matches (Vector Similarity) so far", vector_matches),
+        ):
+            with slot.container():
+                st.caption(heading)
+                st.dataframe(pd.DataFrame(matches), use_container_width=True, height=300)
+    progress.empty()
+    keyword_slot.empty()
+    vector_slot.empty()
+    return keyword_matches, vector_matches
+
+def score_columns(columns):
+    """The numeric score columns of a result table, in table order."""
+    return [c for c in columns if c.startswith("Match Percentage") or c == "Final Score"]
+
+def show_matches(matches, empty_message="No matching resumes found.", key="matches"):
+    """Render result rows as a typed, paginated table; sort and filter run here, not in the browser.
+
+    Scores stay float columns, so they sort as numbers, and only one page
+    of rows is sent. Detail columns are fetched and formatted for the rows
+    of the current page only.
+    """
+    if not matches:
+        st.info(empty_message)
+        return
+    with TIMINGS.part("dataframe_build"):
+        results = pd.DataFrame(matches)
+    scores = score_columns(results.columns)
+    if scores:
+        sort_column, order_column, filter_column = st.columns(3)
+        sort_by = sort_column.selectbox("Sort by", scores, key=f"{key}_sort")
+        descending = order_column.radio(
+            "Order", ["Highest first", "Lowest first"], horizontal=True, key=f"{key}_order"
+        ) == "Highest first"
+        min_score = filter_column.number_input(f"Minimum {sort_by}", min_value=0.0, value=0.0, step=5.0, key=f"{key}_min")
+        with TIMINGS.part("sort_filter"):
+            if min_score:
+                results = results[results[sort_by] >= min_score]
+            results = results.sort_values(sort_by, ascending=not descending, kind="stable", na_position="last")
+        if results.empty:
+            st.info(f"No rows with {sort_by} of at least {min_score:g}.")
+            return
+
+    pages = -(-len(results) // RESULTS_PAGE_SIZE)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    first = (page - 1) * RESULTS_PAGE_SIZE
+    shown = results.iloc[first:first + RESULTS_PAGE_SIZE].to_dict("records")
+    with TIMINGS.part("mongo_fetch"):
+        shown = with_detail_columns(shown)
+    with TIMINGS.part("dataframe_build"):
+        page_df = pd.DataFrame(shown, index=range(first + 1, first + len(shown) + 1))
+        for column in page_df.columns:
+            if page_df[column].map(lambda value: isinstance(value, list)).any():
+                page_df[column] = page_df[column].map(lambda value: ", ".join(value) if isinstance(value, list) else value)
+    with TIMINGS.part("st_dataframe"):
+        st.dataframe(
+            page_df,
+            use_container_width=True,
+            height=300,
+            column_config={column: st.column_config.NumberColumn(format="%.2f") for column in scores},
+        )
+    if pages > 1:
+        st.caption(f"Rows {first + 1}-{first + len(shown)} of {len(results)}")
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve the stage timings on /metrics once per process; None if the port is taken."""
+    try:
+        return start_metrics_server(TIMINGS)
+    except OSError:
+        return None
+
+def show_stage_latency_panel():
+    """Sidebar panel with rolling p50/p95/p99 per timed stage."""
+    with st.sidebar.expander("Stage latency", expanded=False):
+        summary = TIMINGS.summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No timings recorded yet.")
+        server = get_metrics_server()
+        if server is not None:
+            st.caption(f"Prometheus text on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+
+def show_mongo_command_panel():
+    """Sidebar panel with the Mongo commands of the last rerun, per app function."""
+    reruns = MONGO_PROFILER.last_reruns(2)
+    if not reruns:
+        return
+    current = reruns[-1]
+    with st.sidebar.expander("Mongo commands", expanded=False):
+        st.caption(
+            f"Rerun {current.number}: {current.round_trips} round trips, "
+            f"{current.reply_bytes / 1024:.1f} KiB, {current.duration_ms:.1f} ms"
+        )
+        rows = current.rows()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        if len(reruns) == 2:
+            changes = query_volume_change(reruns[0], current)
+            if changes:
+                st.caption("Round trips changed since the previous rerun")
+                st.dataframe(pd.DataFrame(changes), use_container_width=True, hide_index=True)
+
+def show_profiler_controls():
+    """Sidebar controls to run the next rerun under a profiler and download what it saved."""
+    with st.sidebar.expander("Profile a run", expanded=False):
+        mode = st.radio("Profiler", PROFILE_MODES, horizontal=True)
+
+        def request_profile():
+            st.session_state["profile_next_run"] = mode
+
+        # The callback runs before the rerun the click triggers, so that rerun is profiled
+        st.button("Profile next run", on_click=request_profile)
+        st.caption("Or open the app with ?profile=cprofile or ?profile=sampling to profile every run.")
+        path = st.session_state.get("last_profile")
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                st.download_button(f"Download {os.path.basename(path)}", f.read(), file_name=os.path.basename(path))
 
 def display_resume_details(resume_id):
     resume = resume_collection.find_one({"resumeId": resume_id})
@@ -206,54 +438,166 @@ def display_resume_details(resume_id):
     st.write(f"**Contact No:** {resume.get('contactNo', 'N/A')}")
     st.write(f"**Address:** {resume.get('address', 'N/A')}")
     st.markdown("---")
+    return resume
 
 def main():
+    use_leaderboards = st.sidebar.checkbox("Use precomputed leaderboards", value=True)
+    full_corpus = st.sidebar.checkbox("Score full corpus (parallel)", value=False)
+    stream_results = st.sidebar.checkbox(
+        "Stream results while scoring", value=False, disabled=not full_corpus,
+        help="Scan the full corpus in chunks here, updating the tables as each chunk completes",
+    )
+    ranking_method = RANKING_METHODS[st.sidebar.radio("Ranking", list(RANKING_METHODS))]
+    keyword_weight = st.sidebar.slider(
+        "Keyword weight", 0.0, 1.0, 0.7, 0.05, disabled=ranking_method is None
+    )
+    min_vector_match = st.sidebar.number_input(
+        "Minimum vector match % (0 = top 50)", min_value=0.0, max_value=100.0, value=0.0, step=5.0
+    )
+    keyword_weighting = KEYWORD_WEIGHTINGS[st.sidebar.selectbox("Keyword weighting", list(KEYWORD_WEIGHTINGS))]
+    shortlist_stage = st.sidebar.selectbox("Keyword shortlist", ["off", *SHORTLIST_STAGES])
+    shortlist_size = st.sidebar.number_input(
+        "Shortlist size", min_value=50, max_value=5000, value=300, step=50, disabled=shortlist_stage == "off"
+    )
+    filters = {}
+    if st.sidebar.checkbox("Filter candidates", value=False):
+        facets = get_facet_index(current_version())
+        filters["must_have"] = [
+            k.strip() for k in st.sidebar.text_input("Must-have keywords (comma separated)").split(",") if k.strip()
+        ]
+        for facet, label in FACET_LABELS.items():
+            filters[facet] = st.sidebar.multiselect(label, facets.options(facet))
+    filtered_rows = facets.filter_rows(**filters) if any(filters.values()) else None
+
     st.markdown("<div class='metrics-container'>", unsafe_allow_html=True)
 
     total_resumes = resume_collection.count_documents({})
+    set_capture_tags(corpus_size=total_resumes)
     total_jds = jd_collection.count_documents({})
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
 
     with col1:
         st.metric(label="Total Resumes", value=total_resumes)
     with col2:
         st.metric(label="Total Job Descriptions", value=total_jds)
+    with col3:
+        if filtered_rows is not None:
+            st.metric(label="Resumes Matching Filters", value=len(filtered_rows))
+
+    with st.expander("Browse by education and experience"):
+        for tab, (facet, label) in zip(st.tabs(list(FACET_LABELS.values())), FACET_LABELS.items()):
+            with tab:
+                if filtered_rows is not None:
+                    counts = facets.counts(facet, filtered_rows, limit=20)
+                else:
+                    counts = read_facet_counts(facet_counts_collection, facet)
+                if counts:
+                    st.dataframe(pd.DataFrame(counts, columns=[label, "Resumes"]), use_container_width=True, hide_index=True)
+                else:
+                    st.info("No facet counts yet; run facets.py to build them.")
 
     st.markdown("</div>", unsafe_allow_html=True)
 
+    st.markdown("<div class='section-heading'>Search Candidate by Resume ID</div>", unsafe_allow_html=True)
+    search_id = st.text_input("Enter Resume ID:")
+    if search_id.strip():
+        resume = display_resume_details(search_id.strip())
+        if resume and resume.get("embedding"):
+            for heading, matches in (
+                ("More Like This Candidate", find_similar_candidates(resume)),
+                ("Best-Fitting Job Descriptions", find_best_jds(resume)),
+            ):
+                st.subheader(heading)
+                show_matches(matches, "No matches found.", key=heading)
+        elif resume:
+            st.error("Embedding not found for this resume.")
+
     st.markdown("<div class='section-heading'>Select Job Description for Matching</div>", unsafe_allow_html=True)
-    jds = list(jd_collection.find())
-    jd_mapping = {jd.get("jobDescription", "N/A"): jd.get("jobId", "N/A") for jd in jds}
-    selected_jd_description = st.selectbox("Select a Job Description:", list(jd_mapping.keys()))
+    jd_source = st.radio("Job description source:", ["Stored", "Paste a new one"], horizontal=True)
+    selected_jd_id, selected_jd_description = None, None
+    if jd_source == "Stored":
+        jds = list(jd_collection.find())
+        jd_mapping = {jd.get("jobDescription", "N/A"): jd.get("jobId", "N/A") for jd in jds}
+        selected_jd_description = st.selectbox("Select a Job Description:", list(jd_mapping.keys()))
+        if selected_jd_description:
+            selected_jd_id = jd_mapping[selected_jd_description]
+            set_capture_tags(jd_id=selected_jd_id)
+            selected_jd = next(jd for jd in jds if jd.get("jobId") == selected_jd_id)
+            jd_keywords = selected_jd.get("structured_query", {}).get("keywords", [])
+            jd_embedding = selected_jd.get("embedding")
+    else:
+        pasted_jd = st.text_area("Paste a job description:", height=200)
+        if pasted_jd.strip():
+            try:
+                embedded = get_jd_embedder().embed(pasted_jd)
+            except (requests.RequestException, ValueError) as e:
+                st.error(f"Could not embed the job description: {e}")
+            else:
+                selected_jd_description = normalize_jd_text(pasted_jd)
+                set_capture_tags(jd_id="pasted")
+                jd_keywords, jd_embedding = embedded["keywords"], embedded["embedding"]
+                st.caption(f"Embedding served from {embedded['source']}")
 
     if selected_jd_description:
-        selected_jd_id = jd_mapping[selected_jd_description]
-        selected_jd = next(jd for jd in jds if jd.get("jobId") == selected_jd_id)
-        jd_keywords = selected_jd.get("structured_query", {}).get("keywords", [])
-        jd_embedding = selected_jd.get("embedding")
-
-        st.write(f"**Job Description ID:** {selected_jd_id}")
+        st.write(f"**Job Description ID:** {selected_jd_id or 'not stored'}")
         st.write(f"**Job Description:** {selected_jd_description}")
 
-        st.subheader("Top Matches (Keywords)")
-        keyword_matches = find_keyword_matches(jd_keywords)
-        if keyword_matches:
-            keyword_match_df = pd.DataFrame(keyword_matches).astype(str)
-            st.dataframe(keyword_match_df, use_container_width=True, height=300)
+        if ranking_method:
+            st.subheader("Top Matches (Hybrid)")
+            hybrid_matches = find_hybrid_matches(jd_keywords, jd_embedding, ranking_method, keyword_weight)
+            show_matches(hybrid_matches, key="hybrid")
+            return
+
+        leaderboard = None
+        if use_leaderboards and selected_jd_id and not any(filters.values()) and not keyword_weighting:
+            leaderboard = read_leaderboard(matches_collection, selected_jd_id)
+        if any(filters.values()):
+            keyword_matches = filtered_keyword_matches(facets, jd_keywords, **filters)
+            vector_matches = filtered_top_matches(facets, jd_embedding, **filters) if jd_embedding else []
+        elif keyword_weighting:
+            keyword_matches = find_weighted_keyword_matches(jd_keywords, keyword_weighting)
+            vector_matches = find_top_matches(jd_embedding) if jd_embedding else []
+        elif leaderboard:
+            keyword_matches, vector_matches = leaderboard["keywords"], leaderboard["vector"]
+            st.caption(f"Precomputed over {leaderboard['corpusSize']} resumes at {leaderboard['computedAt']:%Y-%m-%d %H:%M} UTC")
+        elif full_corpus and stream_results:
+            keyword_matches, vector_matches = stream_full_corpus_matches(jd_keywords, jd_embedding)
+        elif full_corpus and os.environ.get("MATCHER_WORKERS"):
+            matches = get_scatter_gather_matcher(os.environ["MATCHER_WORKERS"]).search(jd_keywords, jd_embedding)
+            keyword_matches, vector_matches = matches["keywords"], matches["vector"]
+            if matches["missing_shards"]:
+                st.warning(f"Partial results: no answer from {', '.join(matches['missing_shards'])}")
+        elif full_corpus:
+            keyword_matches, vector_matches = get_sharded_scorer(current_version()).find_matches(jd_keywords, jd_embedding)
+        elif shortlist_stage != "off":
+            keyword_matches = find_keyword_matches_cascade(jd_keywords, jd_embedding, shortlist_size, shortlist_stage)
+            vector_matches = find_top_matches(jd_embedding) if jd_embedding else []
         else:
-            st.info("No matching resumes found.")
+            keyword_matches = find_keyword_matches(jd_keywords)
+            vector_matches = find_top_matches(jd_embedding) if jd_embedding else []
+
+        if min_vector_match and jd_embedding and not any(filters.values()):
+            vector_matches = find_matches_above(get_range_search_index(current_version()), jd_embedding, min_vector_match)
+
+        st.subheader("Top Matches (Keywords)")
+        show_matches(keyword_matches, key="keyword")
 
         if jd_embedding:
             st.subheader("Top Matches (Vector Similarity)")
-            vector_matches = find_top_matches(jd_embedding)
-            if vector_matches:
-                vector_match_df = pd.DataFrame(vector_matches).astype(str)
-                st.dataframe(vector_match_df, use_container_width=True, height=300)
-            else:
-                st.info("No matching resumes found.")
+            show_matches(vector_matches, key="vector")
         else:
             st.error("Embedding not found for the selected JD.")
 
 if __name__ == "__main__":
     load_css()
-    main()
+    profile_mode = st.session_state.pop("profile_next_run", None) or st.query_params.get("profile")
+    with MONGO_PROFILER.rerun(), TIMINGS.stage("main"):
+        if profile_mode in PROFILE_MODES:
+            with capture(profile_mode) as profiled:
+                main()
+            st.session_state["last_profile"] = profiled.path
+        else:
+            main()
+    show_profiler_controls()
+    show_stage_latency_panel()
+    show_mongo_command_panel()
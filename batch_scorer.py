@@ -0,0 +1,202 @@
+import argparse
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+from pymongo import ReplaceOne
+from scipy import sparse
+
+from matching import cosine_percentages, expand_keywords, preprocess_keyword, top_k
+from mongo_config import get_database
+from shared_index import attach_or_load_index
+
+MATCHES_COLLECTION = "matches"
+KEYWORD_COLUMN = "Match Percentage (Keywords)"
+VECTOR_COLUMN = "Match Percentage (Vector)"
+
+
+def load_jds(collection):
+    """Return the JDs to score as dicts with jobId, normalized keywords and embedding."""
+    return [
+        {
+            "jobId": jd.get("jobId"),
+            "keywords": [preprocess_keyword(k) for k in jd.get("structured_query", {}).get("keywords", [])],
+            "embedding": jd.get("embedding"),
+        }
+        for jd in collection.find({"jobId": {"$exists": True}})
+    ]
+
+def expand_jd_block(index, jds, threshold=80):
+    """Prepare a block of JDs for sparse keyword scoring.
+
+    Each JD keyword is expanded once to the vocabulary terms it exactly or
+    fuzzily matches. Returns the transposed (vocabulary x JD keyword)
+    expansion, a (JD keyword x JD) ownership matrix and keyword totals per JD.
+    """
+    all_keywords = [keyword for jd in jds for keyword in jd["keywords"]]
+    owners = np.repeat(np.arange(len(jds)), [len(jd["keywords"]) for jd in jds])
+    totals = np.array([len(jd["keywords"]) for jd in jds], dtype=np.float64)
+
+    expansion = sparse.csr_matrix(expand_keywords(all_keywords, index.vocab, threshold), dtype=np.int32)
+    owner_matrix = sparse.csr_matrix(
+        (np.ones(len(owners), dtype=np.int32), (np.arange(len(owners)), owners)),
+        shape=(len(owners), len(jds)),
+    )
+    return expansion.T.tocsr(), owner_matrix, totals
+
+def keyword_scores_block(keyword_matrix, has_keywords, jd_block):
+    """Keyword match percentages for a block of resume rows against a prepared JD block.
+
+    keyword_matrix holds the rows' postings; the sparse product counts the
+    matched JD keywords for every (resume, JD) pair. Returns a dense
+    (row x JD) array with NaN where the resume or the JD has no keywords.
+    """
+    expansion_t, owner_matrix, totals = jd_block
+    hits = keyword_matrix @ expansion_t
+    hits.data[:] = 1
+    counts = (hits @ owner_matrix).toarray().astype(np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        match_percentage = np.round(counts * 100 / totals, 2)
+    match_percentage[:, totals == 0] = np.nan
+    match_percentage[~has_keywords] = np.nan
+    return match_percentage
+
+def _merge_top(best_rows, best_scores, rows, scores, top_n):
+    """Merge a chunk's candidates into a running top-n, keeping ties in row order."""
+    merged_rows = np.concatenate([best_rows, rows])
+    merged_scores = np.concatenate([best_scores, scores])
+    order = top_k(merged_scores, top_n)
+    return merged_rows[order], merged_scores[order]
+
+def matching_keywords(index, row, jd, threshold=80):
+    """Return the JD keywords matched by one resume, in JD order."""
+    resume_keywords = index.row_keywords(row)
+    hits = expand_keywords(jd["keywords"], resume_keywords, threshold).any(axis=1)
+    return [keyword for keyword, hit in zip(jd["keywords"], hits) if hit]
+
+def leaderboard_rows(index, jd, keyword_top, vector_top, threshold=80, with_keywords=True):
+    """Turn the top rows for one JD into the apps' keyword and vector table rows.
+
+    With with_keywords=False the keyword rows leave out "Matching Keywords",
+    for callers that fill it in only for the rows they keep.
+    """
+    keyword_rows, keyword_scores = keyword_top
+    vector_rows, vector_scores = vector_top
+    return {
+        "keywords": [
+            {
+                "Resume ID": index.resume_ids[row],
+                "Name": index.names[row],
+                KEYWORD_COLUMN: round(float(score), 2),
+                **({"Matching Keywords": matching_keywords(index, row, jd, threshold)} if with_keywords else {}),
+            }
+            for row, score in zip(keyword_rows, keyword_scores)
+        ],
+        "vector": [
+            {
+                "Resume ID": index.resume_ids[row],
+                "Name": index.names[row],
+                VECTOR_COLUMN: round(float(score), 2),
+            }
+            for row, score in zip(vector_rows, vector_scores)
+        ],
+    }
+
+def score_all(index, jds, top_n=200, jd_block=16, row_chunk=100000, threshold=80):
+    """Score every JD against every resume and return {jobId: leaderboard}.
+
+    Work is blocked over JDs and resume rows so memory stays bounded by
+    jd_block x row_chunk scores.
+    """
+    keyword_matrix = index.keyword_matrix()
+    has_keywords = np.diff(index.keyword_offsets) > 0
+    leaderboards = {}
+    empty = (np.empty(0, dtype=np.int64), np.empty(0))
+
+    for block_start in range(0, len(jds), jd_block):
+        block = jds[block_start:block_start + jd_block]
+        prepared = expand_jd_block(index, block, threshold)
+        jd_embeddings = [jd["embedding"] for jd in block]
+        keyword_top = [empty] * len(block)
+        vector_top = [empty] * len(block)
+
+        for start in range(0, len(index), row_chunk):
+            stop = min(start + row_chunk, len(index))
+            rows = np.arange(start, stop)
+            keyword_scores = keyword_scores_block(keyword_matrix[start:stop], has_keywords[start:stop], prepared)
+            vector_scores = cosine_percentages(index.embeddings[start:stop], index.norms[start:stop], jd_embeddings)
+            for column in range(len(block)):
+                keyword_top[column] = _merge_top(*keyword_top[column], rows, keyword_scores[:, column], top_n)
+                vector_top[column] = _merge_top(*vector_top[column], rows, vector_scores[:, column], top_n)
+
+        for column, jd in enumerate(block):
+            leaderboards[jd["jobId"]] = leaderboard_rows(index, jd, keyword_top[column], vector_top[column], threshold)
+    return leaderboards
+
+def write_leaderboards_mongo(collection, leaderboards, corpus_size):
+    """Replace each JD's stored leaderboard with the new one."""
+    computed_at = datetime.datetime.now(datetime.timezone.utc)
+    operations = [
+        ReplaceOne(
+            {"jobId": job_id},
+            {"jobId": job_id, "computedAt": computed_at, "corpusSize": corpus_size, **leaderboard},
+            upsert=True,
+        )
+        for job_id, leaderboard in leaderboards.items()
+    ]
+    if operations:
+        collection.create_index("jobId", unique=True)
+        collection.bulk_write(operations, ordered=False)
+
+def write_leaderboards_parquet(path, leaderboards):
+    """Write all leaderboards as one long table: jobId, kind, rank, resumeId, name, score, keywords."""
+    records = []
+    for job_id, leaderboard in leaderboards.items():
+        for kind, column in (("keywords", KEYWORD_COLUMN), ("vector", VECTOR_COLUMN)):
+            for rank, row in enumerate(leaderboard[kind], start=1):
+                records.append({
+                    "jobId": job_id,
+                    "kind": kind,
+                    "rank": rank,
+                    "resumeId": row["Resume ID"],
+                    "name": row["Name"],
+                    "score": row[column],
+                    "matchingKeywords": row.get("Matching Keywords", []),
+                })
+    pd.DataFrame.from_records(records).to_parquet(path, index=False)
+
+def read_leaderboard(collection, job_id):
+    """Return the stored leaderboard document for a JD, or None."""
+    return collection.find_one({"jobId": job_id}, {"_id": 0})
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every JD against every resume and store per-JD leaderboards.")
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--top-n", type=int, default=200)
+    parser.add_argument("--jd-block", type=int, default=16)
+    parser.add_argument("--row-chunk", type=int, default=100000)
+    parser.add_argument("--parquet", help="write to this Parquet file instead of the matches collection")
+    args = parser.parse_args()
+
+    db = get_database(args.mongo_uri)
+    start = time.perf_counter()
+    index = attach_or_load_index(db["resumes"])
+    jds = load_jds(db["job_description"])
+    loaded = time.perf_counter()
+
+    leaderboards = score_all(index, jds, args.top_n, args.jd_block, args.row_chunk)
+    scored = time.perf_counter()
+
+    if args.parquet:
+        write_leaderboards_parquet(args.parquet, leaderboards)
+    else:
+        write_leaderboards_mongo(db[MATCHES_COLLECTION], leaderboards, len(index))
+    done = time.perf_counter()
+
+    print(f"{len(jds)} JDs x {len(index)} resumes: load {loaded - start:.1f}s, "
+          f"score {scored - loaded:.1f}s, write {done - scored:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import argparse
+import ast
+import datetime
+import json
+import os
+import platform
+import string
+import sys
+import time
+
+import numpy as np
+
+from matching import keyword_result_rows, score_keywords, score_vectors, top_k, vector_result_rows
+from resume_index import count_duplicate_resumes, load_resume_index
+from stage_timing import percentiles
+
+# Database the benchmark loads into on a real server; it is dropped and refilled
+BENCHMARK_DB = "resumes_benchmark"
+BENCHMARKED_FUNCTIONS = ("find_keyword_matches", "find_top_matches", "find_duplicate_resumes")
+# Engines built on the in-memory index, benchmarked next to the app files
+ENGINES = ("index",)
+APP_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def keyword_vocabulary(size, rng):
+    """Distinct made-up skill names of one to three words."""
+    syllables = [a + b for a in "bcdfgklmnprstvz" for b in "aeiou"]
+    vocabulary = set()
+    while len(vocabulary) < size:
+        words = [
+            "".join(rng.choice(syllables, rng.integers(2, 5)))
+            for _ in range(rng.choice([1, 1, 1, 2, 2, 3]))
+        ]
+        vocabulary.add(" ".join(words))
+    return sorted(vocabulary)
+
+def misspell(keyword, rng):
+    """Replace one letter, the kind of variant the fuzzy matchers exist for."""
+    positions = [i for i, c in enumerate(keyword) if c != " "]
+    i = rng.choice(positions)
+    return keyword[:i] + rng.choice(list(string.ascii_lowercase)) + keyword[i + 1:]
+
+def zipf_keywords(vocabulary, probabilities, count, rng, typo_rate=0.0):
+    """Up to `count` distinct keywords drawn with Zipfian frequencies."""
+    drawn = rng.choice(len(vocabulary), size=2 * count, p=probabilities)
+    keywords = [vocabulary[i] for i in dict.fromkeys(drawn.tolist())][:count]
+    return [misspell(k, rng) if rng.random() < typo_rate else k for k in keywords]
+
+def generate_corpus(num_resumes, dim=1536, vocabulary_size=2000, zipf_exponent=1.1, duplicate_rate=0.05,
+                    keywords_per_resume=(3, 15), missing_embedding_rate=0.02, typo_rate=0.05, num_jds=5,
+                    num_topics=20, seed=0):
+    """Synthetic resume and job_description documents shaped like the real collections.
+
+    Keyword frequencies follow a Zipf law over a made-up vocabulary, and a
+    few keywords are misspelled. Embeddings are clustered around topics, so
+    vector scores spread out as they do in production. A duplicate_rate
+    share of resumes reuse an earlier resume's email and phone number.
+    Returns (resumes, jds).
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = keyword_vocabulary(vocabulary_size, rng)
+    probabilities = 1.0 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+    probabilities /= probabilities.sum()
+    topics = rng.standard_normal((num_topics, dim))
+
+    def embedding(topic):
+        return (topics[topic] + rng.standard_normal(dim)).tolist()
+
+    resumes = []
+    for i in range(num_resumes):
+        if resumes and rng.random() < duplicate_rate:
+            original = resumes[rng.integers(len(resumes))]
+            email, phone = original["email"], original["contactNo"]
+        else:
+            email, phone = f"candidate{i}@example.com", f"+91{9000000000 + i}"
+        topic = int(rng.integers(num_topics))
+        count = int(rng.integers(keywords_per_resume[0], keywords_per_resume[1] + 1))
+        resumes.append({
+            "resumeId": f"R{i:08d}",
+            "name": f"Candidate {i}",
+            "email": email,
+            "contactNo": phone,
+            "address": "Bengaluru",
+            "keywords": zipf_keywords(vocabulary, probabilities, count, rng, typo_rate),
+            "embedding": None if rng.random() < missing_embedding_rate else embedding(topic),
+            "jobExperiences": [{"title": f"Engineer {topic}", "companyName": f"Company {int(rng.integers(200))}"}],
+            "educationalQualifications": [{"degree": rng.choice(["BSc", "BTech", "MSc", "MBA"]), "field": f"Field {topic % 7}"}],
+        })
+
+    jds = []
+    for j in range(num_jds):
+        keywords = zipf_keywords(vocabulary, probabilities, 10, rng)
+        jds.append({
+            "jobId": f"J{j:04d}",
+            "jobDescription": f"Synthetic job {j}: " + ", ".join(keywords),
+            "structured_query": {"keywords": keywords},
+            "embedding": embedding(int(rng.integers(num_topics))),
+        })
+    return resumes, jds
+
+def in_process_database():
+    """An empty mongomock database, for runs without a mongod."""
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("the in-process stand-in needs mongomock (pip install mongomock); or pass --mongo-uri")
+    return mongomock.MongoClient()[BENCHMARK_DB]
+
+def server_database(uri):
+    """The benchmark database on a real server (never the production resumes_database)."""
+    from pymongo import MongoClient
+    return MongoClient(uri)[BENCHMARK_DB]
+
+def load_corpus(db, resumes, jds, batch_size=10000):
+    """Replace the benchmark collections with the given documents."""
+    for name, documents in (("resumes", resumes), ("job_description", jds)):
+        db[name].drop()
+        for start in range(0, len(documents), batch_size):
+            # insert_many adds _id to the dicts; insert copies so the corpus can be reloaded
+            db[name].insert_many([dict(d) for d in documents[start:start + batch_size]])
+
+class ScanCounter:
+    """Resumes the matchers read or had the server scan, for a per-call throughput figure.
+
+    Documents iterated from find() cursors count one each; an aggregate or
+    count_documents() counts the whole collection, which the server scans.
+    """
+
+    def __init__(self):
+        self.resumes = 0
+
+    def take(self):
+        resumes, self.resumes = self.resumes, 0
+        return resumes
+
+class CountingCursor:
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attribute = getattr(self._cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        def chained(*args, **kwargs):
+            # limit(), sort() and friends return the cursor itself; keep counting through them
+            result = attribute(*args, **kwargs)
+            if result is self._cursor:
+                return self
+            return result
+        return chained
+
+    def __iter__(self):
+        for document in self._cursor:
+            self._counter.resumes += 1
+            yield document
+
+class CountingCollection:
+    """Resumes collection wrapper feeding a ScanCounter."""
+
+    def __init__(self, collection, counter):
+        self._collection = collection
+        self._counter = counter
+
+    def find(self, *args, **kwargs):
+        return CountingCursor(self._collection.find(*args, **kwargs), self._counter)
+
+    def aggregate(self, *args, **kwargs):
+        self._counter.resumes += self._collection.estimated_document_count()
+        return self._collection.aggregate(*args, **kwargs)
+
+    def count_documents(self, *args, **kwargs):
+        self._counter.resumes += self._collection.estimated_document_count()
+        return self._collection.count_documents(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+def load_app_functions(path, db, counter=None, names=BENCHMARKED_FUNCTIONS):
+    """Compile the matcher functions out of a Streamlit app file, bound to db.
+
+    Importing an app would connect to the production database and draw the
+    page, so only its imports, upper-case constants and function definitions
+    are executed; resume_collection and jd_collection point at db. Apps
+    that match on the in-memory index get one built from db, instead of the
+    process-wide cached or published one.
+    With a ScanCounter, the resumes the functions read are counted on it,
+    and every get_resume_index() call counts the whole index.
+    Returns ({function name: callable} for those of names that exist, index build seconds).
+    """
+    resume_collection = db["resumes"] if counter is None else CountingCollection(db["resumes"], counter)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    keep = [
+        node for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef))
+        or (isinstance(node, ast.Assign) and all(isinstance(t, ast.Name) and t.id.isupper() for t in node.targets))
+    ]
+    namespace = {"__name__": f"benchmark_{os.path.splitext(os.path.basename(path))[0]}", "db": db,
+                 "resume_collection": resume_collection, "jd_collection": db["job_description"]}
+    exec(compile(ast.Module(body=keep, type_ignores=[]), path, "exec"), namespace)
+    build_seconds = 0.0
+    if "get_resume_index" in namespace:
+        start = time.perf_counter()
+        index = load_resume_index(db["resumes"])
+        build_seconds = time.perf_counter() - start
+
+        def get_resume_index():
+            if counter is not None:
+                counter.resumes += len(index)
+            return index
+        namespace["get_resume_index"] = get_resume_index
+    functions = {name: namespace[name] for name in names if callable(namespace.get(name))}
+    return functions, build_seconds
+
+def index_engine(db, num_candidates=50, counter=None):
+    """The three functions on the in-memory ResumeIndex; returns (functions, build seconds)."""
+    start = time.perf_counter()
+    index = load_resume_index(db["resumes"])
+    build_seconds = time.perf_counter() - start
+    counter = counter or ScanCounter()
+    resume_collection = CountingCollection(db["resumes"], counter)
+
+    def find_keyword_matches(jd_keywords):
+        counter.resumes += len(index)
+        jd_keywords_normalized, match_percentage, hits = score_keywords(index, jd_keywords)
+        rows = top_k(match_percentage, num_candidates)
+        return keyword_result_rows(index, rows, match_percentage, hits, jd_keywords_normalized)
+
+    def find_top_matches(jd_embedding):
+        counter.resumes += len(index)
+        match_percentage = score_vectors(index, jd_embedding)
+        return vector_result_rows(index, top_k(match_percentage, num_candidates), match_percentage)
+
+    def find_duplicate_resumes():
+        return count_duplicate_resumes(resume_collection)[1]
+
+    functions = {
+        "find_keyword_matches": find_keyword_matches,
+        "find_top_matches": find_top_matches,
+        "find_duplicate_resumes": find_duplicate_resumes,
+    }
+    return functions, build_seconds
+
+def variant_functions(variant, db, counter=None):
+    """(functions, build seconds) for an app file name or an engine name."""
+    if variant in ENGINES:
+        return index_engine(db, counter=counter)
+    return load_app_functions(os.path.join(APP_DIRECTORY, variant), db, counter)
+
+def time_function(name, function, jds, repeats, max_seconds):
+    """Call the function once per JD per repeat; stops early past max_seconds.
+
+    Returns (latencies, rows returned by the last call).
+    """
+    latencies, rows = [], 0
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for jd in jds:
+            start = time.perf_counter()
+            if name == "find_keyword_matches":
+                result = function(jd["structured_query"]["keywords"])
+            elif name == "find_top_matches":
+                result = function(jd["embedding"])
+            else:
+                result = function()
+            latencies.append(time.perf_counter() - start)
+            rows = len(result) if isinstance(result, list) else result
+            if time.perf_counter() - started > max_seconds:
+                return latencies, rows
+    return latencies, rows
+
+def run_benchmark(db, sizes, variants, dim=1536, repeats=3, max_seconds=60.0, report=print, **corpus_options):
+    """Time every variant's matchers at every corpus size; returns one result dict per measurement.
+
+    A variant/function pair that runs past max_seconds at one size is not
+    run at the larger sizes, so slow full scans do not stall the curve.
+    """
+    results = []
+    over_budget = set()
+    for size in sorted(sizes):
+        resumes, jds = generate_corpus(size, dim, **corpus_options)
+        start = time.perf_counter()
+        load_corpus(db, resumes, jds)
+        report(f"{size} resumes loaded in {time.perf_counter() - start:.1f}s")
+
+        for variant in variants:
+            counter = ScanCounter()
+            try:
+                functions, build_seconds = variant_functions(variant, db, counter)
+            except SyntaxError as e:
+                report(f"{variant}: skipped, does not parse ({e.msg} at line {e.lineno})")
+                continue
+            for name, function in functions.items():
+                if (variant, name) in over_budget:
+                    continue
+                counter.take()
+                latencies, rows = time_function(name, function, jds, repeats, max_seconds)
+                scanned = counter.take()
+                total = sum(latencies)
+                result = {
+                    "variant": variant,
+                    "function": name,
+                    "corpus_size": size,
+                    "calls": len(latencies),
+                    "rows_returned": rows,
+                    "build_seconds": round(build_seconds, 4),
+                    "mean_ms": round(total / len(latencies) * 1000, 2),
+                    **percentiles(latencies),
+                    "calls_per_second": round(len(latencies) / total, 3) if total else None,
+                    # Resumes actually read or scanned, so partial scans are not credited with the corpus
+                    "resumes_scanned_per_call": round(scanned / len(latencies), 1),
+                    "resumes_per_second": round(scanned / total) if total else None,
+                }
+                results.append(result)
+                report(f"{variant} {name} @ {size}: p50 {result['p50_ms']}ms, {result['resumes_per_second']} resumes/s")
+                if total > max_seconds:
+                    over_budget.add((variant, name))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the matchers of the app variants on synthetic corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--variants", nargs="+", default=["app.py", "app7.py", "app9.py", "index"],
+                        help="app files and/or engines: " + ", ".join(ENGINES))
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--vocabulary-size", type=int, default=2000)
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--jds", type=int, default=5, help="job descriptions queried per repeat")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=60.0, help="time budget per function and size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-uri", help="benchmark against this server instead of the in-process stand-in")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    db = server_database(args.mongo_uri) if args.mongo_uri else in_process_database()
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "mongo_uri")}
+    config["backend"] = "mongod" if args.mongo_uri else "in-process"
+    results = run_benchmark(
+        db, args.sizes, args.variants, args.dim, args.repeats, args.max_seconds,
+        report=lambda line: print(line, file=sys.stderr, flush=True),
+        vocabulary_size=args.vocabulary_size, zipf_exponent=args.zipf_exponent,
+        duplicate_rate=args.duplicate_rate, num_jds=args.jds, seed=args.seed,
+    )
+    with open(args.output, "w") as f:
+        json.dump({
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "config": config,
+            "results": results,
+        }, f, indent=2)
+    print(f"{len(results)} measurements written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from mongo_config import get_database
+from resume_index import RESUME_PROJECTION, RESUME_QUERY, build_resume_index, load_resume_index
+
+
+def id_ranges(collection, num_ranges, query=None):
+    """Split the _id space of the matching documents into ranges of similar size.
+
+    Returns a list of `_id` filters that together cover every document. The
+    first and last ranges are open-ended so documents inserted while loading
+    still fall into one of them. Assumes a single _id type (ObjectId).
+    """
+    if num_ranges <= 1:
+        return [{}]
+    buckets = collection.aggregate(
+        [
+            {"$match": query or {}},
+            {"$bucketAuto": {"groupBy": "$_id", "buckets": num_ranges}},
+        ],
+        allowDiskUse=True,
+    )
+    lower_bounds = [bucket["_id"]["min"] for bucket in buckets][1:]
+    if not lower_bounds:
+        return [{}]
+
+    ranges = [{"_id": {"$lt": lower_bounds[0]}}]
+    for lo, hi in zip(lower_bounds, lower_bounds[1:]):
+        ranges.append({"_id": {"$gte": lo, "$lt": hi}})
+    ranges.append({"_id": {"$gte": lower_bounds[-1]}})
+    return ranges
+
+def fetch_resumes_parallel(collection, query=None, projection=RESUME_PROJECTION,
+                           num_ranges=32, max_workers=8, batch_size=1000):
+    """Read all matching documents with one cursor per _id range on a thread pool.
+
+    Results come back in _id order, so duplicate handling downstream is
+    deterministic regardless of which range finishes first.
+    """
+    query = query or RESUME_QUERY
+
+    def read_range(id_filter):
+        range_query = {"$and": [query, id_filter]} if id_filter else query
+        cursor = collection.find(range_query, projection, batch_size=batch_size)
+        return list(cursor.sort("_id", 1))
+
+    ranges = id_ranges(collection, num_ranges, query)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(ranges))) as pool:
+        return list(chain.from_iterable(pool.map(read_range, ranges)))
+
+def load_resume_index_parallel(collection, query=None, **options):
+    """Load a ResumeIndex using range-partitioned parallel cursors."""
+    return build_resume_index(fetch_resumes_parallel(collection, query, **options))
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a full resume load, single cursor vs parallel ranges.")
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--ranges", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    collection = get_database(args.mongo_uri, maxPoolSize=max(args.workers, 10))["resumes"]
+
+    start = time.perf_counter()
+    index = load_resume_index(collection)
+    single = time.perf_counter() - start
+    print(f"single cursor:   {len(index)} resumes in {single:.2f}s")
+
+    start = time.perf_counter()
+    index = load_resume_index_parallel(
+        collection, num_ranges=args.ranges, max_workers=args.workers, batch_size=args.batch_size
+    )
+    parallel = time.perf_counter() - start
+    print(f"parallel ranges: {len(index)} resumes in {parallel:.2f}s ({single / parallel:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import time
+
+import numpy as np
+
+from batch_scorer import load_jds
+from matching import expand_keywords, keyword_result_rows, preprocess_keyword, score_keywords, score_vectors, top_k
+from mongo_config import get_database
+from shared_index import attach_or_load_index
+
+SHORTLIST_STAGES = ("vector", "exact", "union")
+
+
+def exact_keyword_scores(index, jd_keywords):
+    """Keyword match percentage per row counting exact normalized matches only."""
+    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
+    if not jd_keywords_normalized:
+        return np.full(len(index), np.nan)
+    lookup = {term: i for i, term in enumerate(index.vocab)}
+    term_weights = np.bincount(
+        [lookup[k] for k in jd_keywords_normalized if k in lookup], minlength=len(index.vocab)
+    )
+    match_percentage = np.round(index.keyword_matrix() @ term_weights * (100.0 / len(jd_keywords_normalized)), 2)
+    match_percentage[np.diff(index.keyword_offsets) == 0] = np.nan
+    return match_percentage
+
+def shortlist(index, jd_keywords, jd_embedding, size=300, stage="vector"):
+    """Pick up to `size` candidate rows with a cheap first stage.
+
+    "vector" takes the best cosine matches, "exact" the best exact-keyword
+    matches, and "union" half of each (deduplicated), topping up from
+    either side when the other runs short. Without vector scores (no JD
+    embedding) "vector" falls back to "exact".
+    """
+    if stage not in SHORTLIST_STAGES:
+        raise ValueError(f"unknown shortlist stage {stage!r}; expected one of {SHORTLIST_STAGES}")
+    vector_scores = score_vectors(index, jd_embedding) if stage != "exact" else None
+    if stage == "vector" and np.isnan(vector_scores).all():
+        stage = "exact"
+    if stage == "vector":
+        return top_k(vector_scores, size)
+    by_keyword = top_k(exact_keyword_scores(index, jd_keywords), size)
+    if stage == "exact":
+        return by_keyword
+    by_vector = top_k(vector_scores, size)
+    rows = by_keyword[:size - size // 2]
+    for more in (by_vector, by_keyword):
+        more = more[~np.isin(more, rows)]
+        rows = np.concatenate([rows, more[:size - len(rows)]])
+    return rows
+
+def rerank_fuzzy(index, rows, jd_keywords, threshold=80):
+    """Run exact-or-fuzzy keyword matching on the shortlisted rows only.
+
+    Returns the normalized JD keywords and, per shortlisted row, the match
+    percentage (NaN without keywords) and the JD keyword hits.
+    """
+    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
+    match_percentage = np.full(len(rows), np.nan)
+    hits = np.zeros((len(rows), len(jd_keywords_normalized)), dtype=bool)
+    if not jd_keywords_normalized:
+        return jd_keywords_normalized, match_percentage, hits
+
+    for position, row in enumerate(rows):
+        resume_keywords = index.row_keywords(row)
+        if not resume_keywords:
+            continue
+        hits[position] = expand_keywords(jd_keywords_normalized, resume_keywords, threshold).any(axis=1)
+        match_percentage[position] = round(hits[position].sum() * 100.0 / len(jd_keywords_normalized), 2)
+    return jd_keywords_normalized, match_percentage, hits
+
+def find_keyword_matches_cascade(index, jd_keywords, jd_embedding, shortlist_size=300, stage="vector",
+                                 num_candidates=50, threshold=80):
+    """Shortlist cheaply, then fuzzy-rank only the shortlist; returns keyword table rows."""
+    rows = np.sort(shortlist(index, jd_keywords, jd_embedding, shortlist_size, stage))
+    jd_keywords_normalized, match_percentage, hits = rerank_fuzzy(index, rows, jd_keywords, threshold)
+    order = top_k(match_percentage, num_candidates)
+    return keyword_result_rows(
+        index, rows[order], dict(zip(rows[order], match_percentage[order])),
+        dict(zip(rows[order], hits[order])), jd_keywords_normalized,
+    )
+
+def recall_report(index, jds, shortlist_size=300, stage="vector", num_candidates=50, threshold=80):
+    """Compare cascade results with the full fuzzy scan for each JD.
+
+    recall is the share of the full scan's top-k resumes the cascade returns;
+    score_recall counts a rank as recovered when the cascade's score there is
+    at least the full scan's, which forgives swaps between tied resumes.
+    """
+    reports = []
+    for jd in jds:
+        start = time.perf_counter()
+        jd_keywords_normalized, match_percentage, hits = score_keywords(index, jd["keywords"], threshold)
+        full_rows = top_k(match_percentage, num_candidates)
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cascade = find_keyword_matches_cascade(
+            index, jd["keywords"], jd["embedding"], shortlist_size, stage, num_candidates, threshold
+        )
+        cascade_seconds = time.perf_counter() - start
+
+        if len(full_rows) == 0:
+            continue
+        full_ids = {index.resume_ids[row] for row in full_rows}
+        cascade_scores = [entry["Match Percentage (Keywords)"] for entry in cascade]
+        full_scores = match_percentage[full_rows]
+        recovered = sum(c >= f for c, f in zip(cascade_scores, full_scores))
+        reports.append({
+            "jobId": jd["jobId"],
+            "recall": sum(entry["Resume ID"] in full_ids for entry in cascade) / len(full_rows),
+            "score_recall": recovered / len(full_rows),
+            "full_ms": full_seconds * 1000,
+            "cascade_ms": cascade_seconds * 1000,
+        })
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cascade recall against the full fuzzy keyword scan.")
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--shortlist", type=int, default=300)
+    parser.add_argument("--stage", choices=SHORTLIST_STAGES, default="vector")
+    parser.add_argument("--k", type=int, default=50)
+    args = parser.parse_args()
+
+    db = get_database(args.mongo_uri)
+    index = attach_or_load_index(db["resumes"])
+    reports = recall_report(index, load_jds(db["job_description"]), args.shortlist, args.stage, args.k)
+    for report in reports:
+        print(f"{report['jobId']}: recall {report['recall']:.2f}, score recall {report['score_recall']:.2f}, "
+              f"{report['full_ms']:.0f}ms -> {report['cascade_ms']:.0f}ms")
+    if reports:
+        print(f"mean recall {np.mean([r['recall'] for r in reports]):.3f}, "
+              f"mean score recall {np.mean([r['score_recall'] for r in reports]):.3f} "
+              f"over {len(reports)} JDs (shortlist {args.shortlist}, stage {args.stage})")
+
+if __name__ == "__main__":
+    main()
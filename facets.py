@@ -0,0 +1,293 @@
+import argparse
+
+import numpy as np
+from pymongo import UpdateOne
+from scipy import sparse
+
+from matching import (
+    cosine_percentages,
+    expand_keywords,
+    keyword_result_rows,
+    preprocess_keyword,
+    top_k,
+    vector_result_rows,
+)
+from mongo_config import get_database
+from resume_index import RESUME_QUERY
+from shared_index import attach_or_load_index
+
+# Facet name -> (list field, value field) in the resume documents
+FACET_FIELDS = {
+    "degree": ("educationalQualifications", "degree"),
+    "field": ("educationalQualifications", "field"),
+    "title": ("jobExperiences", "title"),
+    "company": ("jobExperiences", "companyName"),
+}
+FACET_PROJECTION = {"resumeId": 1, **{f"{outer}.{inner}": 1 for outer, inner in FACET_FIELDS.values()}}
+FACET_COUNTS_COLLECTION = "facet_counts"
+
+# A packed bitset costs rows/8 bytes and a row list 4 bytes per row, so values
+# held by fewer than 1/DENSE_DIVISOR of the rows keep a sorted row list.
+DENSE_DIVISOR = 32
+
+
+def normalize_facet_value(value):
+    """Case- and whitespace-insensitive form of a degree, field, title or employer name."""
+    return " ".join(str(value).casefold().split())
+
+def resume_facet_values(resume):
+    """Yield (facet, normalized value, label) once per distinct value in a resume document."""
+    seen = set()
+    for facet, (outer, inner) in FACET_FIELDS.items():
+        for entry in resume.get(outer) or []:
+            label = entry.get(inner) if isinstance(entry, dict) else None
+            if not label:
+                continue
+            value = normalize_facet_value(label)
+            if (facet, value) not in seen:
+                seen.add((facet, value))
+                yield facet, value, label
+
+class RowSet:
+    """The index rows matching one filter value.
+
+    Dense sets are NumPy packed bits (one bit per row); sparse sets are sorted
+    int32 row numbers. Intersections start from the smallest sparse set and
+    probe the others, so their cost follows the narrowest filter.
+    """
+
+    def __init__(self, size, rows=None, bits=None):
+        self.size = size
+        self.rows = rows
+        self.bits = bits
+        self.count = len(rows) if bits is None else int(np.unpackbits(bits, count=size).sum())
+
+    @classmethod
+    def from_rows(cls, rows, size):
+        """Build a set from sorted, unique row numbers, packing it if dense."""
+        if len(rows) * DENSE_DIVISOR < size:
+            return cls(size, rows=np.asarray(rows, dtype=np.int32))
+        mask = np.zeros(size, dtype=bool)
+        mask[rows] = True
+        return cls(size, bits=np.packbits(mask))
+
+    def __len__(self):
+        return self.count
+
+    def contains(self, rows):
+        """Boolean mask telling which of the given rows are in the set."""
+        if self.bits is None:
+            return np.isin(rows, self.rows, assume_unique=True)
+        return ((self.bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+    def to_rows(self):
+        if self.bits is None:
+            return self.rows
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.size)).astype(np.int32)
+
+    @classmethod
+    def union(cls, sets, size):
+        sets = list(sets)
+        if len(sets) == 1:
+            return sets[0]
+        if any(s.bits is not None for s in sets):
+            bits = np.zeros((size + 7) // 8, dtype=np.uint8)
+            for s in sets:
+                if s.bits is None:
+                    # Unbuffered: several rows can share a byte
+                    np.bitwise_or.at(bits, s.rows >> 3, (128 >> (s.rows & 7)).astype(np.uint8))
+                else:
+                    bits |= s.bits
+            return cls(size, bits=bits)
+        return cls.from_rows(np.unique(np.concatenate([s.rows for s in sets] + [np.empty(0, np.int32)])), size)
+
+    @classmethod
+    def intersect(cls, sets, size):
+        sparse_sets = sorted((s for s in sets if s.bits is None), key=len)
+        if not sparse_sets:
+            return cls(size, bits=np.bitwise_and.reduce([s.bits for s in sets]))
+        rows = sparse_sets[0].rows
+        for s in sets:
+            if s is not sparse_sets[0] and len(rows):
+                rows = rows[s.contains(rows)]
+        return cls(size, rows=rows)
+
+class FacetIndex:
+    """Precomputed row sets for education and experience values, aligned with a ResumeIndex.
+
+    Must-have keywords are resolved against the index vocabulary (exact or
+    fuzzy, as in keyword matching) and their row sets cached on first use.
+    """
+
+    def __init__(self, index, values, labels):
+        self.index = index
+        self.values = values  # {facet: {normalized value: RowSet}}
+        self.labels = labels  # {facet: {normalized value: first spelling seen}}
+        self._keyword_postings = None
+        self._keyword_sets = {}
+
+    def options(self, facet):
+        """Display labels of a facet's values, most common first."""
+        ranked = sorted(self.values[facet].items(), key=lambda item: (-len(item[1]), item[0]))
+        return [self.labels[facet][value] for value, _ in ranked]
+
+    def counts(self, facet, rows=None, limit=None):
+        """Return [(label, count)] for a facet, most common first.
+
+        With rows (e.g. from filter_rows) only those rows are counted; limit
+        caps how many of the corpus-wide most common values are counted.
+        """
+        ranked = sorted(self.values[facet].items(), key=lambda item: (-len(item[1]), item[0]))[:limit]
+        counts = [
+            (self.labels[facet][value], len(row_set) if rows is None else int(row_set.contains(rows).sum()))
+            for value, row_set in ranked
+        ]
+        return sorted(counts, key=lambda item: -item[1])
+
+    def keyword_set(self, keyword, threshold=80):
+        keyword = preprocess_keyword(keyword)
+        if (keyword, threshold) not in self._keyword_sets:
+            if self._keyword_postings is None:
+                self._keyword_postings = self.index.keyword_matrix().tocsc()
+            postings = self._keyword_postings
+            terms = np.flatnonzero(expand_keywords([keyword], self.index.vocab, threshold)[0])
+            rows = np.concatenate(
+                [postings.indices[postings.indptr[t]:postings.indptr[t + 1]] for t in terms] + [np.empty(0, np.int32)]
+            )
+            self._keyword_sets[keyword, threshold] = RowSet.from_rows(np.unique(rows), len(self.index))
+        return self._keyword_sets[keyword, threshold]
+
+    def filter_rows(self, must_have=(), threshold=80, **facets):
+        """Return the sorted rows passing every filter, or None when no filter is set.
+
+        Every must-have keyword must match; within a facet (e.g. degree=[...])
+        any listed value matches.
+        """
+        size = len(self.index)
+        sets = [self.keyword_set(keyword, threshold) for keyword in must_have]
+        for facet, wanted in facets.items():
+            if not wanted:
+                continue
+            empty = RowSet(size, rows=np.empty(0, dtype=np.int32))
+            sets.append(RowSet.union(
+                [self.values[facet].get(normalize_facet_value(value), empty) for value in wanted], size
+            ))
+        if not sets:
+            return None
+        return RowSet.intersect(sets, size).to_rows()
+
+def build_facet_index(index, resumes):
+    """Build row sets from resume documents; resumes not in the index are ignored."""
+    row_of = {resume_id: row for row, resume_id in enumerate(index.resume_ids)}
+    postings = {facet: {} for facet in FACET_FIELDS}
+    labels = {facet: {} for facet in FACET_FIELDS}
+
+    for resume in resumes:
+        row = row_of.get(resume.get("resumeId"))
+        if row is None:
+            continue
+        for facet, value, label in resume_facet_values(resume):
+            labels[facet].setdefault(value, label)
+            postings[facet].setdefault(value, []).append(row)
+
+    values = {
+        facet: {value: RowSet.from_rows(np.unique(rows), len(index)) for value, rows in facet_postings.items()}
+        for facet, facet_postings in postings.items()
+    }
+    return FacetIndex(index, values, labels)
+
+def load_facet_index(collection, index):
+    """Read degree and employer values from MongoDB for the rows of an index."""
+    return build_facet_index(index, collection.find(RESUME_QUERY, FACET_PROJECTION))
+
+def write_facet_counts(db, facets):
+    """Replace the stored facet counts with the counts of a freshly built FacetIndex.
+
+    The new counts are written to a scratch collection and renamed over the
+    old one, so readers never see a half-written table. Increments applied
+    while a rebuild runs are lost; run it when the updater is idle.
+    """
+    documents = [
+        {"_id": f"{facet}:{value}", "facet": facet, "value": value,
+         "label": facets.labels[facet][value], "count": len(row_set)}
+        for facet, values in facets.values.items()
+        for value, row_set in values.items()
+    ]
+    scratch = db[f"{FACET_COUNTS_COLLECTION}_rebuild"]
+    scratch.drop()
+    if documents:
+        scratch.insert_many(documents, ordered=False)
+        scratch.create_index([("facet", 1), ("count", -1)])
+        scratch.rename(FACET_COUNTS_COLLECTION, dropTarget=True)
+    else:
+        db[FACET_COUNTS_COLLECTION].drop()
+
+def increment_facet_counts(collection, resumes):
+    """Add newly ingested candidates (already deduplicated) to the stored counts."""
+    increments = {}
+    for resume in resumes:
+        for facet, value, label in resume_facet_values(resume):
+            key = f"{facet}:{value}"
+            if key not in increments:
+                increments[key] = [facet, value, label, 0]
+            increments[key][3] += 1
+    operations = [
+        UpdateOne(
+            {"_id": key},
+            {"$inc": {"count": count}, "$setOnInsert": {"facet": facet, "value": value, "label": label}},
+            upsert=True,
+        )
+        for key, (facet, value, label, count) in increments.items()
+    ]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+def read_facet_counts(collection, facet, limit=20):
+    """Return the stored [(label, count)] of a facet, most common first."""
+    cursor = collection.find({"facet": facet}, {"label": 1, "count": 1}).sort("count", -1).limit(limit)
+    return [(doc["label"], doc["count"]) for doc in cursor]
+
+def filtered_top_matches(facets, jd_embedding, num_candidates=50, must_have=(), threshold=80, **filters):
+    """Vector matching over only the rows that pass the filters."""
+    index = facets.index
+    rows = facets.filter_rows(must_have, threshold, **filters)
+    if rows is None:
+        rows = np.arange(len(index))
+    match_percentage = cosine_percentages(index.embeddings[rows], index.norms[rows], [jd_embedding])[:, 0]
+    order = top_k(match_percentage, num_candidates)
+    return vector_result_rows(index, rows[order], dict(zip(rows[order], match_percentage[order])))
+
+def filtered_keyword_matches(facets, jd_keywords, num_candidates=50, must_have=(), threshold=80, **filters):
+    """Keyword matching over only the rows that pass the filters."""
+    index = facets.index
+    rows = facets.filter_rows(must_have, threshold, **filters)
+    if rows is None:
+        rows = np.arange(len(index))
+    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
+    if not jd_keywords_normalized or not len(rows):
+        return []
+
+    expansion = expand_keywords(jd_keywords_normalized, index.vocab, threshold)
+    hits = (index.keyword_matrix(rows) @ sparse.csr_matrix(expansion.T, dtype=np.int32)).toarray() > 0
+    match_percentage = np.round(hits.sum(axis=1) * (100.0 / len(jd_keywords_normalized)), 2)
+    match_percentage[np.diff(index.keyword_offsets)[rows] == 0] = np.nan
+
+    order = top_k(match_percentage, num_candidates)
+    return keyword_result_rows(
+        index, rows[order], dict(zip(rows[order], match_percentage[order])),
+        dict(zip(rows[order], hits[order])), jd_keywords_normalized,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the stored facet counts from the resume index.")
+    parser.add_argument("--mongo-uri")
+    args = parser.parse_args()
+
+    db = get_database(args.mongo_uri)
+    facets = load_facet_index(db["resumes"], attach_or_load_index(db["resumes"]))
+    write_facet_counts(db, facets)
+    for facet in FACET_FIELDS:
+        print(f"{facet}: {len(facets.values[facet])} values")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import argparse
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+import numpy as np
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from bulk_loader import load_resume_index_parallel
+from jd_embedding import JdEmbedder
+from leaderboard_updates import LeaderboardUpdater
+from mongo_config import get_database
+from resume_index import candidate_key, normalized_keywords
+from shared_index import publish_index
+
+# Characters read at a time from a JSON array file
+READ_CHUNK_SIZE = 1 << 16
+_WHITESPACE = re.compile(r"\s*")
+
+
+def read_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """Yield the elements of a JSON array whose opening "[" was already read, one chunk at a time."""
+    decoder = json.JSONDecoder()
+    buffer, position, exhausted = "", 0, False
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ","):
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+            # Only a following "," or "]" proves the element was not cut short (e.g. "6.75" of "6.75e2")
+            after = _WHITESPACE.match(buffer, end).end()
+            complete = after < len(buffer) and buffer[after] in ",]"
+        except json.JSONDecodeError:
+            complete = False
+        if complete:
+            yield element
+            position = end
+            continue
+        if exhausted:
+            raise ValueError("truncated or malformed JSON array")
+        chunk = f.read(chunk_size)
+        exhausted = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+def read_resumes(paths):
+    """Stream resume documents from JSON Lines files, JSON array files or stdin ("-").
+
+    Both formats are parsed incrementally, so input size is not bounded by memory.
+    """
+    for path in paths:
+        with (nullcontext(sys.stdin) if path == "-" else open(path)) as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            if first == "[":
+                yield from read_json_array(f)
+                continue
+            line = first + f.readline()
+            while line:
+                if line.strip():
+                    yield json.loads(line)
+                line = f.readline()
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def resume_embedding_text(resume):
+    """Text sent to the embedding endpoint for a resume that arrives without a vector."""
+    parts = [", ".join(resume.get("keywords") or [])]
+    parts += [f"{job.get('title', '')} at {job.get('companyName', '')}" for job in resume.get("jobExperiences") or []]
+    parts += [f"{edu.get('degree', '')} in {edu.get('field', '')}" for edu in resume.get("educationalQualifications") or []]
+    return "\n".join(part for part in parts if part.strip())
+
+def precompute(resume):
+    """Add the fields the matchers would otherwise derive at read time.
+
+    keywords_norm holds the distinct normalized keywords, candidateKey the
+    email/phone identity, and embedding is stored unit-normalized with its
+    original length in embeddingNorm (cosine scores are unchanged).
+    """
+    resume["keywords_norm"] = normalized_keywords(resume)
+    resume["candidateKey"] = candidate_key(resume)
+    embedding = resume.get("embedding")
+    if embedding:
+        vector = np.asarray(embedding, dtype=np.float64)
+        norm = float(np.linalg.norm(vector))
+        resume["embedding"] = (vector / norm).tolist() if norm > 0 else vector.tolist()
+        resume["embeddingNorm"] = norm
+    return resume
+
+def prepare_batch(batch, embedder=None, max_workers=8):
+    """Embed the resumes missing a vector (in parallel) and precompute derived fields.
+
+    Returns the prepared documents and the number whose embedding failed;
+    those are still written, without a vector.
+    """
+    failed = 0
+    if embedder is not None:
+        missing = [resume for resume in batch if not resume.get("embedding")]
+        texts = [resume_embedding_text(resume) for resume in missing]
+        for resume, result in zip(missing, embedder.embed_many(texts, max_workers)):
+            if isinstance(result, Exception):
+                failed += 1
+            else:
+                resume["embedding"] = result["embedding"]
+    return [precompute(resume) for resume in batch], failed
+
+def write_batch(collection, documents, upsert=False):
+    """Write one batch unordered; returns (documents written, documents new to the corpus).
+
+    Inserts skip documents rejected by the server (e.g. a duplicate resumeId)
+    instead of aborting the batch. Upserts replace by resumeId; only the
+    resumes that did not exist yet count as new.
+    """
+    if upsert:
+        operations = [ReplaceOne({"resumeId": d["resumeId"]}, d, upsert=True) for d in documents]
+        result = collection.bulk_write(operations, ordered=False)
+        new = []
+        for position, _id in result.upserted_ids.items():
+            documents[position]["_id"] = _id
+            new.append(documents[position])
+        return documents, new
+    try:
+        collection.insert_many(documents, ordered=False)
+        return documents, documents
+    except BulkWriteError as e:
+        rejected = {error["index"] for error in e.details.get("writeErrors", [])}
+        written = [d for i, d in enumerate(documents) if i not in rejected]
+        return written, written
+
+def duplicate_resume_ids(collection, limit=5):
+    """Return up to `limit` resumeIds held by more than one document."""
+    pipeline = [
+        {"$match": {"resumeId": {"$exists": True}}},
+        {"$group": {"_id": "$resumeId", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [group["_id"] for group in collection.aggregate(pipeline, allowDiskUse=True)]
+
+def ensure_indexes(collection):
+    """Create the indexes the write path and the incremental updater rely on.
+
+    The unique resumeId index is what makes inserts skip resumes that are
+    already loaded. MongoDB cannot build it over existing duplicates, so they
+    are looked for first and reported with a ValueError, before any index is
+    created.
+    """
+    duplicates = duplicate_resume_ids(collection)
+    if duplicates:
+        raise ValueError(f"resumeId is not unique in {collection.name} (e.g. {duplicates}); "
+                         "remove the duplicates before creating the unique index")
+    collection.create_index("resumeId", unique=True, sparse=True)
+    collection.create_index([("email", 1), ("contactNo", 1), ("_id", 1)])
+
+def ingest(db, resumes, batch_size=1000, embedder=None, embed_workers=8, upsert=False, updater=None,
+           create_indexes=False, report=print):
+    """Stream resumes into the resumes collection and push each batch to the search side.
+
+    Embedding for the next batch runs while the current batch is written.
+    With an updater (LeaderboardUpdater) the new resumes of every batch are
+    merged into the leaderboards, facet counts and keyword statistics. Pass
+    one only when `leaderboard_updates.py watch` is not running: the watcher
+    applies the same inserts from the change stream, and both together count
+    every resume twice.
+
+    Upserts cannot be combined with an updater, since a replaced resume would
+    keep its old facet values, keywords and leaderboard scores; with one,
+    resumes are inserted and an existing resumeId is rejected like any
+    duplicate.
+
+    Indexes are left alone unless create_indexes is set (see ensure_indexes);
+    without the unique resumeId index, inserts do not reject a resumeId that
+    is already loaded.
+    """
+    if upsert and updater is not None:
+        raise ValueError("upsert cannot be combined with incremental index updates; replaced resumes would go stale")
+    collection = db["resumes"]
+    if create_indexes:
+        ensure_indexes(collection)
+    totals = {"read": 0, "written": 0, "embedding_failures": 0, "candidates": 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=1) as preparer:
+        batches = batched(resumes, batch_size)
+        pending = next((preparer.submit(prepare_batch, b, embedder, embed_workers) for b in batches), None)
+        while pending is not None:
+            documents, failed = pending.result()
+            pending = next((preparer.submit(prepare_batch, b, embedder, embed_workers) for b in batches), None)
+
+            written, new = write_batch(collection, documents, upsert)
+            if updater is not None and new:
+                totals["candidates"] += len(updater.add_resumes(new))
+            totals["read"] += len(documents)
+            totals["written"] += len(written)
+            totals["embedding_failures"] += failed
+
+            elapsed = time.perf_counter() - start
+            report(f"{totals['written']}/{totals['read']} written, {totals['read'] / elapsed:.0f} docs/s")
+
+    totals["seconds"] = time.perf_counter() - start
+    totals["docs_per_second"] = totals["read"] / totals["seconds"] if totals["seconds"] else 0.0
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load resume JSON into MongoDB with write-time precomputation.")
+    parser.add_argument("paths", nargs="+", help="JSON Lines or JSON array files; - for stdin")
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--embed-url", help="embedding endpoint for resumes without a vector (skip if unset)")
+    parser.add_argument("--embed-workers", type=int, default=8)
+    parser.add_argument(
+        "--upsert", action="store_true",
+        help="replace existing resumes by resumeId; leaderboards and stats are not adjusted for replaced resumes, "
+             "so rebuild them afterwards (batch_scorer.py, facets.py, keyword_weights.py)",
+    )
+    parser.add_argument(
+        "--update-indexes", action="store_true",
+        help="merge each batch into leaderboards and stats; only without a running `leaderboard_updates.py watch`",
+    )
+    parser.add_argument(
+        "--create-indexes", action="store_true",
+        help="create the unique resumeId index (and the duplicate-lookup index) first; "
+             "fails if the collection already holds duplicate resumeIds",
+    )
+    parser.add_argument("--publish", action="store_true", help="republish the shared in-memory index afterwards")
+    args = parser.parse_args()
+    if args.upsert and args.update_indexes:
+        parser.error("--upsert cannot be combined with --update-indexes")
+
+    db = get_database(args.mongo_uri)
+    if args.create_indexes:
+        try:
+            ensure_indexes(db["resumes"])
+        except ValueError as e:
+            raise SystemExit(str(e))
+    embedder = None
+    if args.embed_url:
+        # No cache: each resume text is embedded once and its vector is stored on the resume itself
+        embedder = JdEmbedder(args.embed_url)
+    # Off by default: the change-stream watcher already applies inserts
+    updater = LeaderboardUpdater(db) if args.update_indexes else None
+
+    totals = ingest(db, read_resumes(args.paths), args.batch_size, embedder, args.embed_workers,
+                    args.upsert, updater, report=lambda line: print(line, file=sys.stderr, flush=True))
+    if args.publish:
+        publish_index(load_resume_index_parallel(db["resumes"]))
+    print(json.dumps(totals))
+
+if __name__ == "__main__":
+    main()
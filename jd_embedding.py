@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Lambda function URL for processing job descriptions
+LAMBDA_URL = "https://ljlj3twvuk.execute-api.ap-south-1.amazonaws.com/default/getJobDescriptionVector"
+EMBEDDING_CACHE_COLLECTION = "jd_embedding_cache"
+DEFAULT_CACHE_DIR = os.environ.get(
+    "JD_EMBEDDING_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "zapptest", "jd_embeddings")
+)
+# (connect, read) seconds; the lambda can take a while on a cold start
+DEFAULT_TIMEOUT = (3.05, 30)
+
+
+def normalize_jd_text(text):
+    """Collapse whitespace so re-pasted or re-wrapped text maps to the same cache entry."""
+    return " ".join(text.split())
+
+def jd_cache_key(text, url=LAMBDA_URL):
+    """Cache key for a JD: hash of the endpoint and the normalized text."""
+    return hashlib.sha256(f"{url}\n{normalize_jd_text(text)}".encode("utf-8")).hexdigest()
+
+def make_session(retries=3, backoff_factor=0.5, pool_maxsize=10):
+    """requests.Session with a connection pool and retries on throttling and 5xx answers."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["POST"]),
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def parse_embedding_response(payload):
+    """Pull the embedding and keywords out of an endpoint response.
+
+    Accepts the fields as stored on job_description documents ("embedding",
+    "structured_query.keywords"), either at the top level or inside an API
+    Gateway proxy "body" string.
+    """
+    if isinstance(payload.get("body"), str):
+        payload = json.loads(payload["body"])
+    embedding = payload.get("embedding")
+    if not embedding:
+        raise ValueError("embedding endpoint returned no embedding")
+    keywords = payload.get("structured_query", {}).get("keywords") or payload.get("keywords") or []
+    return {"embedding": [float(x) for x in embedding], "keywords": list(keywords)}
+
+class EmbeddingCache:
+    """Two-level cache of endpoint results: JSON files on local disk, then MongoDB.
+
+    Mongo hits are copied to disk, so each server process pays the network
+    round trip to Mongo at most once per JD.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, collection=None):
+        self.directory = directory
+        self.collection = collection
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return (result, "disk" | "mongo") or (None, None)."""
+        if self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    return json.load(f), "disk"
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+        if self.collection is not None:
+            document = self.collection.find_one({"_id": key}, {"embedding": 1, "keywords": 1})
+            if document:
+                result = {"embedding": document["embedding"], "keywords": document.get("keywords", [])}
+                self._write_disk(key, result)
+                return result, "mongo"
+        return None, None
+
+    def put(self, key, result):
+        self._write_disk(key, result)
+        if self.collection is not None:
+            self.collection.replace_one(
+                {"_id": key},
+                {**result, "createdAt": datetime.datetime.now(datetime.timezone.utc)},
+                upsert=True,
+            )
+
+    def _write_disk(self, key, result):
+        if not self.directory:
+            return
+        # Write then rename so a concurrent reader never sees half a file
+        temporary = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(result, f)
+        os.replace(temporary, self._path(key))
+
+class JdEmbedder:
+    """Embed ad-hoc job description text through the getJobDescriptionVector endpoint."""
+
+    def __init__(self, url=LAMBDA_URL, cache=None, session=None, timeout=DEFAULT_TIMEOUT):
+        self.url = url
+        self.cache = cache
+        self.session = session or make_session()
+        self.timeout = timeout
+
+    def embed(self, text):
+        """Return {"embedding", "keywords", "source"}; source is "disk", "mongo" or "endpoint".
+
+        Raises requests.RequestException when the endpoint fails after
+        retries, and ValueError when its answer has no embedding.
+        """
+        if not normalize_jd_text(text):
+            raise ValueError("job description is empty")
+        key = jd_cache_key(text, self.url)
+        if self.cache is not None:
+            result, source = self.cache.get(key)
+            if result is not None:
+                return {**result, "source": source}
+
+        response = self.session.post(self.url, json={"jobDescription": normalize_jd_text(text)}, timeout=self.timeout)
+        response.raise_for_status()
+        result = parse_embedding_response(response.json())
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return {**result, "source": "endpoint"}
+
+    def embed_many(self, texts, max_workers=8):
+        """Embed a batch of texts with up to max_workers requests in flight on the pooled session.
+
+        Returns results in input order; a text that fails gets the exception
+        instead of a result, so one bad document does not sink the batch.
+        """
+        def embed_or_error(text):
+            try:
+                return self.embed(text)
+            except (requests.RequestException, ValueError) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(texts)))) as pool:
+            return list(pool.map(embed_or_error, texts))
+
+    def close(self):
+        self.session.close()
+
+def stub_embedding(text, dim=1536):
+    """Deterministic bag-of-words embedding so similar texts land close together."""
+    vector = np.zeros(dim)
+    for word in re.findall(r"\w+", text.casefold()):
+        seed = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        vector += np.random.default_rng(seed).standard_normal(dim)
+    return vector.tolist()
+
+def make_stub_handler(dim=1536, delay=0.0):
+    """Request handler answering like the embedding lambda, for local runs and tests."""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        calls = 0
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            StubHandler.calls += 1
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                text = request["jobDescription"]
+            except (ValueError, KeyError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            if delay:
+                time.sleep(delay)
+            keywords = list(dict.fromkeys(w for w in re.findall(r"[A-Za-z][\w+#.]+", text) if len(w) > 2))[:20]
+            self._send_json(200, {"embedding": stub_embedding(text, dim), "structured_query": {"keywords": keywords}})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def serve_stub(host="127.0.0.1", port=8765, dim=1536, delay=0.0):
+    """Serve the stub endpoint until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_stub_handler(dim, delay))
+    print(f"embedding stub on http://{host}:{port} (dim {dim})", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed job descriptions through the lambda endpoint, with caching.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    embed = subparsers.add_parser("embed", help="embed JD text read from stdin")
+    embed.add_argument("--url", default=os.environ.get("JD_EMBEDDING_URL", LAMBDA_URL))
+    embed.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+
+    stub = subparsers.add_parser("stub", help="run a local stand-in for the lambda")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8765)
+    stub.add_argument("--dim", type=int, default=1536)
+    stub.add_argument("--delay", type=float, default=0.0, help="seconds to wait before answering")
+
+    args = parser.parse_args()
+    if args.command == "stub":
+        serve_stub(args.host, args.port, args.dim, args.delay)
+        return
+
+    embedder = JdEmbedder(args.url, EmbeddingCache(args.cache_dir))
+    result = embedder.embed(sys.stdin.read())
+    print(json.dumps({"source": result["source"], "dim": len(result["embedding"]), "keywords": result["keywords"]}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from matching import cosine_percentages, expand_keywords, preprocess_keyword, top_k
+from resume_index import normalized_keywords, unit_embeddings
+
+# Only documents with a jobId take part in matching
+JD_QUERY = {"jobId": {"$exists": True}}
+JD_PROJECTION = {"jobId": 1, "jobDescription": 1, "structured_query.keywords": 1, "embedding": 1}
+
+
+@dataclass
+class JdIndex:
+    """In-memory copy of the job descriptions for resume-to-JD matching.
+
+    Embeddings are unit-normalized float32 rows with their norms (0 for JDs
+    without an embedding), as in ResumeIndex; keywords are kept normalized.
+    """
+    job_ids: list
+    descriptions: list
+    keywords: list
+    embeddings: np.ndarray
+    norms: np.ndarray
+
+    def __len__(self):
+        return len(self.job_ids)
+
+def build_jd_index(jds):
+    jds = list(jds)
+    embeddings, norms = unit_embeddings([jd.get("embedding") or None for jd in jds])
+    return JdIndex(
+        job_ids=[jd.get("jobId") for jd in jds],
+        descriptions=[jd.get("jobDescription", "N/A") for jd in jds],
+        keywords=[
+            [preprocess_keyword(k) for k in jd.get("structured_query", {}).get("keywords", [])] for jd in jds
+        ],
+        embeddings=embeddings,
+        norms=norms,
+    )
+
+def load_jd_index(collection):
+    """Read all matchable job descriptions from MongoDB into a JdIndex."""
+    return build_jd_index(collection.find(JD_QUERY, JD_PROJECTION).sort("_id", 1))
+
+def jd_index_token(collection):
+    """Cheap fingerprint of the JD collection (count and newest _id).
+
+    Caches keyed by it reload the JdIndex after JDs are inserted or deleted;
+    JDs are not edited in place.
+    """
+    newest = next(collection.find(JD_QUERY, {"_id": 1}).sort("_id", -1).limit(1), None)
+    return collection.count_documents(JD_QUERY), newest and str(newest["_id"])
+
+def best_jds(jd_index, resume, num_candidates=10, threshold=80):
+    """Rank job descriptions for one resume document by vector match.
+
+    Each row also carries the share of the JD's keywords the resume matches
+    (exactly or fuzzily), for comparison with the keyword table.
+    """
+    vector_percentage = cosine_percentages(jd_index.embeddings, jd_index.norms, [resume.get("embedding")])[:, 0]
+    rows = top_k(vector_percentage, num_candidates)
+
+    resume_keywords = normalized_keywords(resume)
+    results = []
+    for row in rows:
+        jd_keywords = jd_index.keywords[row]
+        hits = expand_keywords(jd_keywords, resume_keywords, threshold).any(axis=1)
+        results.append({
+            "Job ID": jd_index.job_ids[row],
+            "Job Description": jd_index.descriptions[row],
+            "Match Percentage (Vector)": round(float(vector_percentage[row]), 2),
+            "Match Percentage (Keywords)": round(float(hits.sum()) * 100 / len(jd_keywords), 2) if jd_keywords else None,
+            "Matching Keywords": [kw for kw, hit in zip(jd_keywords, hits) if hit],
+        })
+    return results
@@ -0,0 +1,140 @@
+import argparse
+
+import numpy as np
+from pymongo import UpdateOne
+from scipy import sparse
+
+from matching import expand_keywords, preprocess_keyword
+from mongo_config import get_database
+from resume_index import normalized_keywords
+from shared_index import attach_or_load_index
+
+KEYWORD_STATS_COLLECTION = "keyword_stats"
+# _id of the document holding corpus totals; "$" never survives preprocess_keyword
+CORPUS_STATS_ID = "$corpus"
+WEIGHTING_METHODS = ("idf", "bm25")
+
+
+class KeywordStats:
+    """Document frequencies of normalized resume keywords plus corpus totals.
+
+    Resume keywords are deduplicated per resume, so term frequency is 0 or 1
+    and a resume's length is its number of distinct keywords.
+    """
+
+    def __init__(self, document_frequency=None, num_documents=0, total_length=0):
+        self.document_frequency = document_frequency or {}
+        self.num_documents = num_documents
+        self.total_length = total_length
+
+    @classmethod
+    def from_index(cls, index):
+        counts = np.bincount(index.keyword_ids, minlength=len(index.vocab))
+        return cls(dict(zip(index.vocab, counts.tolist())), len(index), len(index.keyword_ids))
+
+    @property
+    def average_length(self):
+        return self.total_length / self.num_documents if self.num_documents else 0.0
+
+    def add(self, resumes):
+        """Count newly ingested resume documents (already deduplicated by candidate)."""
+        for resume in resumes:
+            keywords = normalized_keywords(resume)
+            for keyword in keywords:
+                self.document_frequency[keyword] = self.document_frequency.get(keyword, 0) + 1
+            self.num_documents += 1
+            self.total_length += len(keywords)
+
+    def idf(self, document_frequency):
+        """BM25 inverse document frequency, log(1 + (N - df + 0.5) / (df + 0.5)); never negative."""
+        document_frequency = np.minimum(np.asarray(document_frequency, dtype=np.float64), self.num_documents)
+        return np.log1p((self.num_documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+def score_keywords_weighted(index, jd_keywords, stats=None, method="idf", threshold=80, k1=1.2, b=0.75):
+    """Keyword scores where each JD keyword counts by its IDF instead of equally.
+
+    "idf" returns the share of the JD's total IDF weight a resume matches, on
+    the usual 0-100 scale. "bm25" also normalizes by resume length; it is
+    scaled so a resume of average length matching every JD keyword scores
+    100, and shorter resumes can score above that.
+
+    A JD keyword's document frequency is the sum over the vocabulary terms it
+    exactly or fuzzily matches (exact for the usual single-term match).
+    Returns the normalized JD keywords, the score per row (NaN for resumes
+    without keywords) and the (row x JD keyword) hit matrix, like score_keywords.
+    """
+    if method not in WEIGHTING_METHODS:
+        raise ValueError(f"unknown weighting {method!r}; expected one of {WEIGHTING_METHODS}")
+    stats = stats or KeywordStats.from_index(index)
+    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
+    if not jd_keywords_normalized or len(index) == 0:
+        return jd_keywords_normalized, np.full(len(index), np.nan), np.zeros((len(index), len(jd_keywords_normalized)), dtype=bool)
+
+    expansion = expand_keywords(jd_keywords_normalized, index.vocab, threshold)
+    weights = stats.idf([
+        sum(stats.document_frequency.get(index.vocab[term], 0) for term in np.flatnonzero(matched))
+        for matched in expansion
+    ])
+
+    hits = (index.keyword_matrix() @ sparse.csr_matrix(expansion.T, dtype=np.int32)).toarray() > 0
+    scores = hits @ weights
+    if method == "bm25":
+        lengths = np.diff(index.keyword_offsets)
+        average_length = stats.average_length or 1.0
+        scores = scores * (k1 + 1) / (1 + k1 * (1 - b + b * lengths / average_length))
+
+    scores = np.round(scores * 100.0 / weights.sum(), 2)
+    scores[np.diff(index.keyword_offsets) == 0] = np.nan
+    return jd_keywords_normalized, scores, hits
+
+def load_keyword_stats(collection):
+    """Read stored statistics, or None if they have never been built."""
+    corpus = collection.find_one({"_id": CORPUS_STATS_ID})
+    if corpus is None:
+        return None
+    document_frequency = {
+        doc["_id"]: doc["df"] for doc in collection.find({"_id": {"$ne": CORPUS_STATS_ID}}, {"df": 1})
+    }
+    return KeywordStats(document_frequency, corpus["num_documents"], corpus["total_length"])
+
+def write_keyword_stats(db, stats):
+    """Replace the stored statistics, renaming a scratch collection over the old one."""
+    scratch = db[f"{KEYWORD_STATS_COLLECTION}_rebuild"]
+    scratch.drop()
+    scratch.insert_many(
+        [{"_id": CORPUS_STATS_ID, "num_documents": stats.num_documents, "total_length": stats.total_length}]
+        + [{"_id": term, "df": df} for term, df in stats.document_frequency.items()],
+        ordered=False,
+    )
+    scratch.rename(KEYWORD_STATS_COLLECTION, dropTarget=True)
+
+def increment_keyword_stats(collection, resumes):
+    """Add newly ingested candidates (already deduplicated) to the stored statistics."""
+    delta = KeywordStats()
+    delta.add(resumes)
+    if not delta.num_documents:
+        return
+    operations = [
+        UpdateOne({"_id": term}, {"$inc": {"df": df}}, upsert=True)
+        for term, df in delta.document_frequency.items()
+    ]
+    operations.append(UpdateOne(
+        {"_id": CORPUS_STATS_ID},
+        {"$inc": {"num_documents": delta.num_documents, "total_length": delta.total_length}},
+        upsert=True,
+    ))
+    collection.bulk_write(operations, ordered=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the stored keyword document frequencies from the resume index.")
+    parser.add_argument("--mongo-uri")
+    args = parser.parse_args()
+
+    db = get_database(args.mongo_uri)
+    stats = KeywordStats.from_index(attach_or_load_index(db["resumes"]))
+    write_keyword_stats(db, stats)
+    print(f"{len(stats.document_frequency)} terms over {stats.num_documents} resumes, "
+          f"average length {stats.average_length:.1f}")
+
+if __name__ == "__main__":
+    main()
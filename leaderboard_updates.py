@@ -0,0 +1,243 @@
+import argparse
+import datetime
+import time
+
+import numpy as np
+
+from batch_scorer import (
+    KEYWORD_COLUMN,
+    MATCHES_COLLECTION,
+    VECTOR_COLUMN,
+    expand_jd_block,
+    keyword_scores_block,
+    leaderboard_rows,
+    load_jds,
+    matching_keywords,
+    score_all,
+    write_leaderboards_mongo,
+)
+from bulk_loader import load_resume_index_parallel
+from facets import FACET_COUNTS_COLLECTION, increment_facet_counts
+from keyword_weights import KEYWORD_STATS_COLLECTION, increment_keyword_stats
+from matching import cosine_percentages, preprocess_keyword
+from mongo_config import get_database
+from resume_index import RESUME_QUERY, build_resume_index, concat_indexes
+
+# Retries when another updater changed a leaderboard between our read and write
+MAX_WRITE_ATTEMPTS = 5
+
+
+def merge_entries(entries, new_entries, score_column, top_n):
+    """Merge new rows into a ranked leaderboard list and keep the top_n.
+
+    A resume already on the board is replaced. New rows rank after existing
+    rows with the same score, as they would in a full recompute where newer
+    resumes come later in _id order.
+    """
+    new_ids = {entry["Resume ID"] for entry in new_entries}
+    ranked = [entry for entry in entries if entry["Resume ID"] not in new_ids] + new_entries
+    ranked.sort(key=lambda entry: entry[score_column], reverse=True)
+    return ranked[:top_n]
+
+class LeaderboardUpdater:
+    """Keep the per-JD leaderboards written by batch_scorer.py current.
+
+    New resumes are scored only against the JD set and merged into each JD's
+    top-N; new JDs are scored only against the resume index.
+    """
+
+    def __init__(self, db, top_n=200, threshold=80):
+        self.db = db
+        self.top_n = top_n
+        self.threshold = threshold
+        self.matches = db[MATCHES_COLLECTION]
+        self.reload_jds()
+
+    def reload_jds(self):
+        self.jds = load_jds(self.db["job_description"])
+
+    def _first_of_candidates(self, resumes):
+        """Keep the resumes no earlier resume shares email and phone with (the apps keep the first).
+
+        One query per batch: fetch the oldest _id of every email/phone pair in it.
+        """
+        pairs = {(r.get("email"), r.get("contactNo")) for r in resumes}
+        pipeline = [
+            {"$match": {"$or": [{"email": email, "contactNo": phone} for email, phone in pairs], **RESUME_QUERY}},
+            {"$group": {"_id": {"email": "$email", "contactNo": "$contactNo"}, "first": {"$min": "$_id"}}},
+        ]
+        first = {(g["_id"].get("email"), g["_id"].get("contactNo")): g["first"] for g in self.db["resumes"].aggregate(pipeline)}
+        return [r for r in resumes if first.get((r.get("email"), r.get("contactNo")), r["_id"]) >= r["_id"]]
+
+    def add_resumes(self, resumes):
+        """Score newly inserted resume documents against every JD and merge them in.
+
+        The stored facet counts and keyword statistics are bumped for the
+        same resumes.
+
+        Returns a ResumeIndex of the resumes that entered the corpus
+        (duplicates of an earlier candidate are skipped, as the matchers skip
+        them).
+        """
+        resumes = [r for r in resumes if r.get("resumeId") is not None]
+        resumes = self._first_of_candidates(resumes) if resumes else resumes
+        increment_facet_counts(self.db[FACET_COUNTS_COLLECTION], resumes)
+        increment_keyword_stats(self.db[KEYWORD_STATS_COLLECTION], resumes)
+        new_index = build_resume_index(resumes)
+        if not resumes or not self.jds:
+            return new_index
+
+        prepared = expand_jd_block(new_index, self.jds, self.threshold)
+        has_keywords = np.diff(new_index.keyword_offsets) > 0
+        keyword_scores = keyword_scores_block(new_index.keyword_matrix(), has_keywords, prepared)
+        vector_scores = cosine_percentages(
+            new_index.embeddings, new_index.norms, [jd["embedding"] for jd in self.jds]
+        )
+
+        rows = np.arange(len(new_index))
+        row_of = {resume_id: row for row, resume_id in enumerate(new_index.resume_ids)}
+        for column, jd in enumerate(self.jds):
+            keyword_rows = rows[~np.isnan(keyword_scores[:, column])]
+            vector_rows = rows[~np.isnan(vector_scores[:, column])]
+            new_entries = leaderboard_rows(
+                new_index, jd,
+                (keyword_rows, keyword_scores[keyword_rows, column]),
+                (vector_rows, vector_scores[vector_rows, column]),
+                self.threshold, with_keywords=False,
+            )
+
+            def fill_matching_keywords(entries, jd=jd):
+                # Only the new rows that made the top-N pay for the fuzzy keyword match
+                for entry in entries:
+                    if "Matching Keywords" not in entry:
+                        entry["Matching Keywords"] = matching_keywords(
+                            new_index, row_of[entry["Resume ID"]], jd, self.threshold
+                        )
+                return entries
+
+            self._merge_into(jd["jobId"], new_entries, len(new_index), fill_matching_keywords)
+        return new_index
+
+    def _merge_into(self, job_id, new_entries, added, fill_matching_keywords):
+        """Read-modify-write one leaderboard, retrying if it changed underneath us.
+
+        fill_matching_keywords completes the merged keyword rows that came in
+        without "Matching Keywords".
+        """
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            board = self.matches.find_one({"jobId": job_id})
+            if board is None:
+                return  # never scored; the next batch or add_jds run will create it
+            keywords = merge_entries(board["keywords"], new_entries["keywords"], KEYWORD_COLUMN, self.top_n)
+            merged = {
+                "keywords": fill_matching_keywords(keywords),
+                "vector": merge_entries(board["vector"], new_entries["vector"], VECTOR_COLUMN, self.top_n),
+                "corpusSize": board.get("corpusSize", 0) + added,
+                "computedAt": datetime.datetime.now(datetime.timezone.utc),
+                "version": board.get("version", 0) + 1,
+            }
+            result = self.matches.update_one(
+                {"_id": board["_id"], "version": board.get("version", {"$exists": False})},
+                {"$set": merged},
+            )
+            if result.modified_count:
+                return
+        raise RuntimeError(f"leaderboard for {job_id} kept changing; gave up after {MAX_WRITE_ATTEMPTS} attempts")
+
+    def add_jds(self, jd_documents, index):
+        """Score new JD documents against the resume index and store their leaderboards."""
+        jds = [
+            {
+                "jobId": jd.get("jobId"),
+                "keywords": [preprocess_keyword(k) for k in jd.get("structured_query", {}).get("keywords", [])],
+                "embedding": jd.get("embedding"),
+            }
+            for jd in jd_documents
+            if jd.get("jobId") is not None
+        ]
+        write_leaderboards_mongo(self.matches, score_all(index, jds, self.top_n, threshold=self.threshold), len(index))
+        known = {jd["jobId"] for jd in self.jds}
+        self.jds.extend(jd for jd in jds if jd["jobId"] not in known)
+
+def verify_leaderboards(db, index=None, job_ids=None, top_n=200):
+    """Compare stored leaderboards with a full recompute.
+
+    Returns {jobId: [problems]} for every JD whose stored ranking differs in
+    resume ids or scores; an empty dict means the incremental path is exact.
+    """
+    index = index or load_resume_index_parallel(db["resumes"])
+    jds = [jd for jd in load_jds(db["job_description"]) if job_ids is None or jd["jobId"] in job_ids]
+    expected = score_all(index, jds, top_n)
+
+    problems = {}
+    for job_id, board in expected.items():
+        stored = db[MATCHES_COLLECTION].find_one({"jobId": job_id}) or {"keywords": [], "vector": []}
+        for kind, column in (("keywords", KEYWORD_COLUMN), ("vector", VECTOR_COLUMN)):
+            want = [(row["Resume ID"], row[column]) for row in board[kind]]
+            have = [(row["Resume ID"], row[column]) for row in stored[kind][:top_n]]
+            if want != have:
+                first = next((i for i, (w, h) in enumerate(zip(want, have)) if w != h), min(len(want), len(have)))
+                problems.setdefault(job_id, []).append(
+                    f"{kind}: first difference at rank {first + 1} ({len(want)} expected, {len(have)} stored)"
+                )
+    return problems
+
+def watch(db, updater, max_batch=500, max_wait=1.0):
+    """Apply inserts from change streams in small batches (needs a replica set).
+
+    The resume index for scoring new JDs is read from the collection once,
+    on the first JD batch; resumes merged afterwards are appended to it in
+    memory.
+    """
+    index, appended = None, []
+    pipeline = [{"$match": {"operationType": "insert"}}]
+    with db["resumes"].watch(pipeline) as resume_stream, db["job_description"].watch(pipeline) as jd_stream:
+        while True:
+            new_resumes, new_jds = [], []
+            deadline = time.monotonic() + max_wait
+            while time.monotonic() < deadline and len(new_resumes) + len(new_jds) < max_batch:
+                resume_event = resume_stream.try_next()
+                jd_event = jd_stream.try_next()
+                if resume_event:
+                    new_resumes.append(resume_event["fullDocument"])
+                if jd_event:
+                    new_jds.append(jd_event["fullDocument"])
+                if not resume_event and not jd_event:
+                    time.sleep(0.05)
+
+            if new_resumes:
+                start = time.perf_counter()
+                added = updater.add_resumes(new_resumes)
+                print(f"merged {len(added)}/{len(new_resumes)} resumes in {time.perf_counter() - start:.2f}s", flush=True)
+                if index is not None and len(added):
+                    appended.append(added)  # new JDs must see the new resumes
+            if new_jds:
+                if index is None:
+                    index = load_resume_index_parallel(db["resumes"])
+                elif appended:
+                    index, appended = concat_indexes([index, *appended]), []
+                start = time.perf_counter()
+                updater.add_jds(new_jds, index)
+                print(f"scored {len(new_jds)} new JDs in {time.perf_counter() - start:.2f}s", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally maintain per-JD leaderboards.")
+    parser.add_argument("command", choices=["watch", "verify"])
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--top-n", type=int, default=200)
+    args = parser.parse_args()
+
+    db = get_database(args.mongo_uri)
+    if args.command == "watch":
+        watch(db, LeaderboardUpdater(db, args.top_n))
+        return
+
+    problems = verify_leaderboards(db, top_n=args.top_n)
+    for job_id, messages in problems.items():
+        for message in messages:
+            print(f"{job_id}: {message}")
+    print("leaderboards match a full recompute" if not problems else f"{len(problems)} JDs differ")
+    raise SystemExit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import argparse
+import contextlib
+import json
+import random
+import resource
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import bson
+
+from benchmark import ENGINES, generate_corpus, in_process_database, load_corpus, server_database, variant_functions
+from stage_timing import percentiles
+
+# Documents in the first reply of a find, as the server sends them
+FIRST_BATCH_SIZE = 101
+# Upper bound on one getMore reply
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+
+class NetworkModel:
+    """Delays standing in for the network between an app replica and Mongo.
+
+    Every round trip costs `latency` seconds plus its reply bytes over
+    `bandwidth` (bytes/second, None for unlimited) and holds one of
+    `pool_size` connections meanwhile, like the driver's connection pool.
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, pool_size=100):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self._pool = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self.round_trips = 0
+        self.pool_wait = 0.0
+
+    def round_trip(self, reply_bytes=0):
+        start = time.perf_counter()
+        with self._pool:
+            waited = time.perf_counter() - start
+            delay = self.latency + (reply_bytes / self.bandwidth if self.bandwidth else 0.0)
+            if delay:
+                time.sleep(delay)
+        with self._lock:
+            self.round_trips += 1
+            self.pool_wait += waited
+
+def _size(document):
+    return len(bson.encode(document))
+
+def _copies(args, kwargs):
+    """Shallow-copy dict arguments: mongomock rewrites projections in place, and the apps share theirs as constants."""
+    return (
+        [dict(a) if isinstance(a, dict) else a for a in args],
+        {k: dict(v) if isinstance(v, dict) else v for k, v in kwargs.items()},
+    )
+
+class SlowCursor:
+    """Cursor that pays one round trip for the first batch and one per getMore.
+
+    With a lock (the in-process stand-in, which is not thread-safe), every
+    document is pulled from the underlying cursor while holding it.
+    """
+
+    def __init__(self, cursor, network, lock=None):
+        self._cursor = cursor
+        self._network = network
+        self._lock = lock or contextlib.nullcontext()
+
+    def limit(self, *args, **kwargs):
+        self._cursor = self._cursor.limit(*args, **kwargs)
+        return self
+
+    def skip(self, *args, **kwargs):
+        self._cursor = self._cursor.skip(*args, **kwargs)
+        return self
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def batch_size(self, *args, **kwargs):
+        self._cursor = self._cursor.batch_size(*args, **kwargs)
+        return self
+
+    def __iter__(self):
+        batch, batch_bytes, limit = [], 0, FIRST_BATCH_SIZE
+        with self._lock:
+            iterator = iter(self._cursor)
+        while True:
+            with self._lock:
+                document = next(iterator, None)
+            if document is None:
+                break
+            batch.append(document)
+            batch_bytes += _size(document)
+            if (limit and len(batch) >= limit) or batch_bytes >= MAX_BATCH_BYTES:
+                self._network.round_trip(batch_bytes)
+                yield from batch
+                batch, batch_bytes, limit = [], 0, None
+        self._network.round_trip(batch_bytes)
+        yield from batch
+
+class SlowCollection:
+    """Collection wrapper adding NetworkModel delays to the calls the matchers make.
+
+    Pass a lock when the collection is the in-process stand-in: sessions
+    run as threads, so its calls are serialized (the network delays are not).
+    """
+
+    def __init__(self, collection, network, lock=None):
+        self._collection = collection
+        self._network = network
+        self._lock = lock or contextlib.nullcontext()
+
+    def find(self, *args, **kwargs):
+        args, kwargs = _copies(args, kwargs)
+        with self._lock:
+            cursor = self._collection.find(*args, **kwargs)
+        return SlowCursor(cursor, self._network, self._lock)
+
+    def find_one(self, *args, **kwargs):
+        args, kwargs = _copies(args, kwargs)
+        with self._lock:
+            document = self._collection.find_one(*args, **kwargs)
+        self._network.round_trip(_size(document) if document else 0)
+        return document
+
+    def count_documents(self, *args, **kwargs):
+        args, kwargs = _copies(args, kwargs)
+        with self._lock:
+            count = self._collection.count_documents(*args, **kwargs)
+        self._network.round_trip()
+        return count
+
+    def aggregate(self, *args, **kwargs):
+        args, kwargs = _copies(args, kwargs)
+        with self._lock:
+            documents = list(self._collection.aggregate(*args, **kwargs))
+        self._network.round_trip(sum(_size(d) for d in documents))
+        return iter(documents)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+class SlowDatabase:
+    def __init__(self, db, network, lock=None):
+        self._db = db
+        self._network = network
+        self._lock = lock
+
+    def __getitem__(self, name):
+        return SlowCollection(self._db[name], self._network, self._lock)
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_session(functions, jds, deadline, think_time, rng, latencies, errors):
+    """One recruiter: pick a JD, run the matchers the app runs for it, repeat until the deadline.
+
+    An exception ends the session and is appended to errors, so the run can
+    report it instead of summarizing the surviving sessions only.
+    """
+    try:
+        session_loop(functions, jds, deadline, think_time, rng, latencies)
+    except Exception:
+        errors.append(traceback.format_exc())
+
+def session_loop(functions, jds, deadline, think_time, rng, latencies):
+    while time.perf_counter() < deadline:
+        jd = rng.choice(jds)
+        selection_start = time.perf_counter()
+        for name, function in functions.items():
+            start = time.perf_counter()
+            if name == "find_keyword_matches":
+                function(jd["structured_query"]["keywords"])
+            elif name == "find_top_matches" and jd.get("embedding"):
+                function(jd["embedding"])
+            latencies[name].append(time.perf_counter() - start)
+        latencies["jd_selection"].append(time.perf_counter() - selection_start)
+        if think_time:
+            time.sleep(rng.expovariate(1 / think_time))
+
+def run_worker(worker, options):
+    """One app replica: run its sessions as threads, as Streamlit does, against its own stand-in or the server."""
+    if options["mongo_uri"]:
+        db = server_database(options["mongo_uri"])
+    else:
+        db = in_process_database()
+        load_corpus(db, *generate_corpus(options["resumes"], options["dim"], seed=options["seed"]))
+    jds = list(db["job_description"].find())
+    network = NetworkModel(options["latency"], options["bandwidth"], options["pool_size"])
+    # mongomock is not thread-safe; a real server needs no lock
+    lock = None if options["mongo_uri"] else threading.Lock()
+    functions, build_seconds = variant_functions(options["variant"], SlowDatabase(db, network, lock))
+    functions = {name: functions[name] for name in ("find_keyword_matches", "find_top_matches") if name in functions}
+
+    latencies = {name: [] for name in (*functions, "jd_selection")}
+    errors = []
+    start = time.perf_counter()
+    deadline = start + options["duration"]
+    sessions = [
+        threading.Thread(target=run_session, args=(
+            functions, jds, deadline, options["think_time"], random.Random(options["seed"] * 1000 + worker * 100 + i),
+            latencies, errors,
+        ))
+        for i in range(options["sessions"])
+    ]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "worker": worker,
+        "sessions": options["sessions"],
+        "seconds": elapsed,
+        "build_seconds": round(build_seconds, 3),
+        "latencies": latencies,
+        "round_trips": network.round_trips,
+        "pool_wait_seconds": round(network.pool_wait, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "errors": errors,
+    }
+
+def summarize(workers):
+    """Pool the workers' samples into p50/p99 and throughput per entry point.
+
+    failed_sessions counts the sessions that died; their samples up to the
+    failure are included, so any failure makes the figures unreliable.
+    """
+    seconds = max(worker["seconds"] for worker in workers)
+    names = sorted({name for worker in workers for name in worker["latencies"]})
+    entry_points = {}
+    for name in names:
+        samples = [s for worker in workers for s in worker["latencies"].get(name, [])]
+        entry_points[name] = {
+            "calls": len(samples),
+            "per_second": round(len(samples) / seconds, 2) if seconds else None,
+            **percentiles(samples),
+        }
+    return {
+        "entry_points": entry_points,
+        "failed_sessions": sum(len(worker["errors"]) for worker in workers),
+        "workers": [
+            {key: value for key, value in worker.items() if key != "latencies"} for worker in workers
+        ],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent recruiter sessions against the matchers.")
+    parser.add_argument("--variant", default="app9.py", help="app file or engine: " + ", ".join(ENGINES))
+    parser.add_argument("--workers", type=int, default=1, help="app replicas (processes)")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions per worker")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds between JD selections")
+    parser.add_argument("--resumes", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--latency", type=float, default=0.002, help="seconds added per Mongo round trip")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes/second between app and Mongo")
+    parser.add_argument("--pool-size", type=int, default=100, help="Mongo connections per worker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-uri", help="use this server instead of a per-worker in-process stand-in")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    options = vars(args)
+    if args.mongo_uri:
+        # Workers share the server, so the corpus is loaded once up front
+        load_corpus(server_database(args.mongo_uri), *generate_corpus(args.resumes, args.dim, seed=args.seed))
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_worker, worker, options) for worker in range(args.workers)]
+        workers = [future.result() for future in futures]
+    report = {"config": {k: v for k, v in options.items() if k not in ("output", "mongo_uri")}, **summarize(workers)}
+
+    for name, stats in report["entry_points"].items():
+        print(f"{name}: {stats['calls']} calls, {stats['per_second']}/s, p50 {stats['p50_ms']}ms, "
+              f"p99 {stats['p99_ms']}ms", file=sys.stderr)
+    for worker in report["workers"]:
+        print(f"worker {worker['worker']}: peak RSS {worker['peak_rss_mb']} MB, {worker['round_trips']} round trips, "
+              f"{worker['pool_wait_seconds']}s waiting for a connection", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report["entry_points"]))
+    if report["failed_sessions"]:
+        for worker in report["workers"]:
+            for error in worker["errors"]:
+                print(f"worker {worker['worker']} session failed:\n{error}", file=sys.stderr)
+        raise SystemExit(f"{report['failed_sessions']} sessions failed; the figures above are not reliable")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from bulk_loader import fetch_resumes_parallel, id_ranges
+from matching import keyword_result_rows, score_keywords, score_vectors, top_k, vector_result_rows
+from mongo_config import get_database
+from resume_index import RESUME_QUERY, build_resume_index
+from shared_index import attach_index
+
+
+def load_shard(shard, num_shards, index_path=None, mongo_uri=None):
+    """Load this worker's part of the corpus.
+
+    With a published shared index the worker takes a contiguous block of its
+    rows. Otherwise it reads only its own _id range from MongoDB, so each
+    node holds roughly 1/num_shards of the corpus; shards beyond the ranges
+    MongoDB could split the corpus into are left empty.
+    """
+    if index_path:
+        index = attach_index(index_path)
+        bounds = np.linspace(0, len(index), num_shards + 1).astype(int)
+        return index.slice(bounds[shard], bounds[shard + 1])
+
+    collection = get_database(mongo_uri)["resumes"]
+    ranges = id_ranges(collection, num_shards, RESUME_QUERY) if num_shards > 1 else [{}]
+    # $bucketAuto returns fewer buckets than asked for when there are few distinct _ids
+    if shard >= len(ranges):
+        return build_resume_index([])
+    return build_resume_index(fetch_resumes_parallel(collection, {"$and": [RESUME_QUERY, ranges[shard]]}))
+
+def search_shard(index, shard, keywords=None, embedding=None, k=50, threshold=80):
+    """Score one shard and return its top-k rows, tagged with candidate keys for the merge."""
+    result = {"shard": shard, "size": len(index)}
+    if keywords is not None:
+        jd_keywords_normalized, match_percentage, hits = score_keywords(index, keywords, threshold)
+        rows = top_k(match_percentage, k)
+        result["keywords"] = keyword_result_rows(index, rows, match_percentage, hits, jd_keywords_normalized)
+        for row, entry in zip(rows, result["keywords"]):
+            entry["_key"] = index.candidate_keys[row]
+    if embedding is not None:
+        match_percentage = score_vectors(index, embedding)
+        rows = top_k(match_percentage, k)
+        result["vector"] = vector_result_rows(index, rows, match_percentage)
+        for row, entry in zip(rows, result["vector"]):
+            entry["_key"] = index.candidate_keys[row]
+    return result
+
+def make_worker_handler(index, shard):
+    """Build the request handler class serving one shard."""
+
+    class ShardHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"shard": shard, "size": len(index)})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/search":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                payload = search_shard(
+                    index, shard,
+                    keywords=request.get("keywords"),
+                    embedding=request.get("embedding"),
+                    k=request.get("k", 50),
+                    threshold=request.get("threshold", 80),
+                )
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(200, payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ShardHandler
+
+def serve_shard(index, shard, host="127.0.0.1", port=8601):
+    """Serve one shard until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_worker_handler(index, shard))
+    print(f"shard {shard}: {len(index)} resumes on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+def merge_ranked(partials, field, score_column, num_candidates):
+    """Merge per-shard rankings, dropping candidates already returned by another shard."""
+    entries = [entry for partial in partials for entry in partial.get(field, [])]
+    entries.sort(key=lambda entry: entry[score_column], reverse=True)
+    merged, seen_keys = [], set()
+    for entry in entries:
+        key = entry.pop("_key", None)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        merged.append(entry)
+        if len(merged) >= num_candidates:
+            break
+    return merged
+
+class ScatterGatherMatcher:
+    """Broadcast a JD to every shard worker and merge their top-k lists.
+
+    Shards that fail or miss the deadline are reported in "missing_shards"
+    and the answer is built from the shards that did respond.
+    """
+
+    def __init__(self, worker_urls, timeout=2.0):
+        self.worker_urls = list(worker_urls)
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_maxsize=max(len(self.worker_urls), 10)))
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.worker_urls), 1))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+
+    def _post(self, url, payload):
+        response = self._session.post(f"{url}/search", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, jd_keywords=None, jd_embedding=None, num_candidates=50, threshold=80):
+        """Query every shard and return merged keyword/vector rows plus any missing shards."""
+        payload = {"keywords": jd_keywords, "k": num_candidates, "threshold": threshold}
+        if jd_embedding is not None:
+            payload["embedding"] = [float(x) for x in jd_embedding]
+        futures = {self._executor.submit(self._post, url, payload): url for url in self.worker_urls}
+        done, not_done = wait(futures, timeout=self.timeout)
+
+        partials, missing_shards = [], [futures[f] for f in not_done]
+        for future in done:
+            try:
+                partials.append(future.result())
+            except (requests.RequestException, ValueError):
+                missing_shards.append(futures[future])
+        partials.sort(key=lambda partial: partial["shard"])
+
+        return {
+            "keywords": merge_ranked(partials, "keywords", "Match Percentage (Keywords)", num_candidates),
+            "vector": merge_ranked(partials, "vector", "Match Percentage (Vector)", num_candidates),
+            "missing_shards": missing_shards,
+        }
+
+    def find_keyword_matches(self, jd_keywords, num_candidates=50, threshold=80):
+        """Keyword-match across all shards (partial if a shard is unavailable)."""
+        return self.search(jd_keywords, None, num_candidates, threshold)["keywords"]
+
+    def find_top_matches(self, jd_embedding, num_candidates=50):
+        """Vector-match across all shards (partial if a shard is unavailable)."""
+        return self.search(None, jd_embedding, num_candidates)["vector"]
+
+def launch_local_workers(num_workers, base_port=8601, index_path=None, mongo_uri=None):
+    """Start num_workers shard workers on localhost and return (processes, urls)."""
+    processes, urls = [], []
+    for shard in range(num_workers):
+        port = base_port + shard
+        command = [sys.executable, __file__, "worker", "--shard", str(shard),
+                   "--num-shards", str(num_workers), "--port", str(port)]
+        if index_path:
+            command += ["--index-path", index_path]
+        if mongo_uri:
+            command += ["--mongo-uri", mongo_uri]
+        processes.append(subprocess.Popen(command))
+        urls.append(f"http://127.0.0.1:{port}")
+    return processes, urls
+
+def wait_until_healthy(urls, timeout=60):
+    """Block until every worker answers /health, or raise after timeout seconds."""
+    deadline = time.monotonic() + timeout
+    pending = list(urls)
+    while pending:
+        url = pending[0]
+        try:
+            requests.get(f"{url}/health", timeout=1).raise_for_status()
+            pending.pop(0)
+        except requests.RequestException:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"worker {url} did not start")
+            time.sleep(0.2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Scatter-gather matching across shard workers.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker = subparsers.add_parser("worker", help="serve one shard")
+    worker.add_argument("--shard", type=int, required=True)
+    worker.add_argument("--num-shards", type=int, required=True)
+    worker.add_argument("--host", default="127.0.0.1")
+    worker.add_argument("--port", type=int, default=8601)
+    worker.add_argument("--index-path")
+    worker.add_argument("--mongo-uri")
+
+    local = subparsers.add_parser("local", help="run N workers on this machine")
+    local.add_argument("--workers", type=int, default=4)
+    local.add_argument("--base-port", type=int, default=8601)
+    local.add_argument("--index-path")
+    local.add_argument("--mongo-uri")
+
+    args = parser.parse_args()
+    if args.command == "worker":
+        index = load_shard(args.shard, args.num_shards, args.index_path, args.mongo_uri)
+        serve_shard(index, args.shard, args.host, args.port)
+        return
+
+    processes, urls = launch_local_workers(args.workers, args.base_port, args.index_path, args.mongo_uri)
+    try:
+        wait_until_healthy(urls)
+        print(f"MATCHER_WORKERS={','.join(urls)}", flush=True)
+        for process in processes:
+            process.wait()
+    finally:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
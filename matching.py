@@ -0,0 +1,238 @@
+import re
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from scipy import sparse
+from scipy.stats import rankdata
+
+
+def preprocess_keyword(keyword):
+    """Preprocess a keyword by normalizing its format."""
+    keyword = keyword.casefold().strip()
+    keyword = re.sub(r'[^\w\s]', '', keyword)
+    return ' '.join(sorted(keyword.split()))
+
+def fuzzy_match(keyword, target_keywords, threshold=80):
+    """Perform fuzzy matching with a similarity threshold."""
+    return any(fuzz.ratio(keyword, tk) >= threshold for tk in target_keywords)
+
+def expand_keywords(jd_keywords_normalized, vocab, threshold=80):
+    """Return a (JD keyword x vocabulary) boolean matrix of exact or fuzzy matches.
+
+    A JD keyword matches a resume when it matches any of the resume's keywords,
+    so comparing against the vocabulary once replaces the per-resume fuzzy loop.
+    """
+    if not jd_keywords_normalized or not vocab:
+        return np.zeros((len(jd_keywords_normalized), len(vocab)), dtype=bool)
+    scores = process.cdist(jd_keywords_normalized, vocab, scorer=fuzz.ratio, score_cutoff=threshold)
+    return scores >= threshold
+
+# Scores are rounded to 2 decimals before ranking, as the apps sort on the
+# rounded percentages and keep ties in scan order.
+
+def score_keywords(index, jd_keywords, threshold=80):
+    """Score every resume in the index against the JD keywords.
+
+    Returns the normalized JD keywords, the match percentage per row (NaN for
+    resumes without keywords) and a (row x JD keyword) hit matrix.
+    """
+    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
+    total_keywords = len(jd_keywords_normalized)
+    if total_keywords == 0 or len(index) == 0:
+        return jd_keywords_normalized, np.full(len(index), np.nan), np.zeros((len(index), total_keywords), dtype=bool)
+
+    expansion = expand_keywords(jd_keywords_normalized, index.vocab, threshold)
+    hits = (index.keyword_matrix() @ sparse.csr_matrix(expansion.T, dtype=np.int32)).toarray() > 0
+
+    match_percentage = np.round(hits.sum(axis=1) * (100.0 / total_keywords), 2)
+    match_percentage[np.diff(index.keyword_offsets) == 0] = np.nan
+    return jd_keywords_normalized, match_percentage, hits
+
+def score_vectors(index, jd_embedding):
+    """Return the cosine match percentage per row (NaN for resumes without an embedding)."""
+    return score_vectors_batch(index, [jd_embedding])[:, 0]
+
+def score_vectors_batch(index, jd_embeddings):
+    """Score several JD embeddings in one matrix multiply; returns a (row x JD) matrix.
+
+    Columns for embeddings that are empty, zero or of the wrong dimension are NaN.
+    """
+    return cosine_percentages(index.embeddings, index.norms, jd_embeddings)
+
+def cosine_percentages(embeddings, norms, jd_embeddings):
+    """Cosine match percentages of unit-normalized rows against raw JD embeddings."""
+    match_percentage = np.full((len(norms), len(jd_embeddings)), np.nan)
+    valid, queries = [], []
+    for column, jd_embedding in enumerate(jd_embeddings):
+        query = np.asarray(jd_embedding if jd_embedding is not None else [], dtype=np.float32)
+        magnitude = np.linalg.norm(query)
+        if query.ndim == 1 and query.shape[0] == embeddings.shape[1] and magnitude > 0:
+            valid.append(column)
+            queries.append(query / magnitude)
+    if len(norms) == 0 or not valid:
+        return match_percentage
+
+    match_percentage[:, valid] = np.round((embeddings @ np.stack(queries, axis=1)).astype(np.float64) * 100, 2)
+    match_percentage[norms == 0] = np.nan
+    return match_percentage
+
+def score_hybrid(index, jd_keywords, jd_embedding, keyword_weight=0.7, vector_weight=0.3, threshold=80,
+                 method="weighted"):
+    """Score keywords and vectors for every row in one pass and fuse them.
+
+    method is "weighted" (weighted sum of the percentages) or "rrf" (weighted
+    reciprocal rank fusion). Returns the normalized JD keywords, keyword,
+    vector and final scores, and the keyword hit matrix.
+    """
+    jd_keywords_normalized, keyword_percentage, hits = score_keywords(index, jd_keywords, threshold)
+    vector_percentage = score_vectors(index, jd_embedding)
+    fuse = reciprocal_rank_fusion if method == "rrf" else fuse_scores
+    final_score = fuse(keyword_percentage, vector_percentage, keyword_weight, vector_weight)
+    return jd_keywords_normalized, keyword_percentage, vector_percentage, final_score, hits
+
+def fuse_scores(keyword_percentage, vector_percentage, keyword_weight=0.7, vector_weight=0.3):
+    """Weighted sum of two score arrays, treating NaN as 0 unless both are NaN."""
+    final_score = np.round(
+        keyword_weight * np.nan_to_num(keyword_percentage)
+        + vector_weight * np.nan_to_num(vector_percentage),
+        2,
+    )
+    final_score[np.isnan(keyword_percentage) & np.isnan(vector_percentage)] = np.nan
+    return final_score
+
+def rank_positions(scores):
+    """Return the 1-based rank of every row by descending score (NaN rows stay NaN).
+
+    Tied scores share the best rank among them, so equal inputs fuse equally.
+    """
+    scores = np.asarray(scores, dtype=float)
+    ranks = np.full(len(scores), np.nan)
+    present = ~np.isnan(scores)
+    ranks[present] = rankdata(-scores[present], method="min")
+    return ranks
+
+def reciprocal_rank_fusion(keyword_percentage, vector_percentage, keyword_weight=0.5, vector_weight=0.5, k=60):
+    """Fuse two rankings by weighted reciprocal rank.
+
+    Each ranking contributes weight / (k + rank); a row missing from a ranking
+    gets nothing from it. Scaled so 100 means first in both rankings.
+    """
+    fused = (
+        keyword_weight / (k + rank_positions(keyword_percentage)),
+        vector_weight / (k + rank_positions(vector_percentage)),
+    )
+    final_score = np.nan_to_num(fused[0]) + np.nan_to_num(fused[1])
+    final_score = np.round(final_score * 100 * (k + 1) / ((keyword_weight + vector_weight) or 1), 2)
+    final_score[np.isnan(fused[0]) & np.isnan(fused[1])] = np.nan
+    return final_score
+
+def top_k(scores, k=None):
+    """Return the rows of the k highest non-NaN scores, best first, ties in row order."""
+    rows = np.flatnonzero(~np.isnan(scores))
+    if k is not None and k < len(rows):
+        if k <= 0:
+            return rows[:0]
+        # Take everything above the k-th score, then the earliest rows tied with it
+        kth = np.partition(scores[rows], len(rows) - k)[len(rows) - k]
+        above = rows[scores[rows] > kth]
+        tied = rows[scores[rows] == kth][:k - len(above)]
+        rows = np.concatenate([above, tied])
+    return rows[np.lexsort((rows, -scores[rows]))]
+
+def keyword_result_rows(index, rows, match_percentage, hits, jd_keywords_normalized):
+    """Build the "Top Matches (Keywords)" table rows for the given index rows."""
+    return [
+        {
+            "Resume ID": index.resume_ids[row],
+            "Name": index.names[row],
+            "Match Percentage (Keywords)": round(float(match_percentage[row]), 2),
+            "Matching Keywords": [kw for kw, hit in zip(jd_keywords_normalized, hits[row]) if hit],
+        }
+        for row in rows
+    ]
+
+def _percentage(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+def hybrid_result_rows(index, rows, keyword_percentage, vector_percentage, final_score, hits,
+                       jd_keywords_normalized):
+    """Build single-table rows carrying both scores and the fused "Final Score"."""
+    return [
+        {
+            "Resume ID": index.resume_ids[row],
+            "Name": index.names[row],
+            "Final Score": _percentage(final_score[row]),
+            "Match Percentage (Keywords)": _percentage(keyword_percentage[row]),
+            "Match Percentage (Vector)": _percentage(vector_percentage[row]),
+            "Matching Keywords": [kw for kw, hit in zip(jd_keywords_normalized, hits[row]) if hit],
+        }
+        for row in rows
+    ]
+
+def vector_result_rows(index, rows, match_percentage):
+    """Build the "Top Matches (Vector Similarity)" table rows for the given index rows."""
+    return [
+        {
+            "Resume ID": index.resume_ids[row],
+            "Name": index.names[row],
+            "Match Percentage (Vector)": round(float(match_percentage[row]), 2),
+        }
+        for row in rows
+    ]
+
+def similar_resumes(index, resume_id, resume_embedding, num_candidates=10):
+    """Vector table rows for the resumes closest to one resume, excluding itself."""
+    match_percentage = score_vectors(index, resume_embedding)
+    rows = top_k(match_percentage, num_candidates + 1)
+    rows = [row for row in rows if index.resume_ids[row] != resume_id][:num_candidates]
+    return vector_result_rows(index, rows, match_percentage)
+
+def _merge_top_k(best_rows, best_scores, rows, scores, k):
+    """Top k of the kept rows plus a new chunk, returned in row order (ties stay in scan order)."""
+    rows = np.concatenate([best_rows, rows])
+    scores = np.concatenate([best_scores, scores])
+    keep = np.sort(top_k(scores, k))
+    return rows[keep], scores[keep], keep
+
+def stream_matches(index, jd_keywords, jd_embedding, num_candidates=50, chunk_size=20000, threshold=80):
+    """Score the corpus chunk by chunk, yielding the running top matches after each chunk.
+
+    Yields (rows scored, keyword table rows, vector table rows). The last
+    yield is the full-scan result of score_keywords / score_vectors + top_k;
+    earlier ones are the best of the rows scored so far.
+    """
+    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
+    total_keywords = len(jd_keywords_normalized)
+    keyword_matrix = index.keyword_matrix()
+    has_keywords = np.diff(index.keyword_offsets) > 0
+    expansion = sparse.csr_matrix(expand_keywords(jd_keywords_normalized, index.vocab, threshold).T, dtype=np.int32)
+
+    empty_rows, empty_scores = np.empty(0, dtype=np.int64), np.empty(0)
+    keyword_rows, keyword_scores, keyword_hits = empty_rows, empty_scores, np.zeros((0, total_keywords), dtype=bool)
+    vector_rows, vector_scores = empty_rows, empty_scores
+    for start in range(0, len(index), chunk_size):
+        stop = min(start + chunk_size, len(index))
+        rows = np.arange(start, stop)
+
+        if total_keywords:
+            hits = (keyword_matrix[start:stop] @ expansion).toarray() > 0
+            match_percentage = np.round(hits.sum(axis=1) * (100.0 / total_keywords), 2)
+            match_percentage[~has_keywords[start:stop]] = np.nan
+            keyword_rows, keyword_scores, keep = _merge_top_k(
+                keyword_rows, keyword_scores, rows, match_percentage, num_candidates
+            )
+            keyword_hits = np.concatenate([keyword_hits, hits])[keep]
+
+        match_percentage = cosine_percentages(index.embeddings[start:stop], index.norms[start:stop], [jd_embedding])[:, 0]
+        vector_rows, vector_scores, _ = _merge_top_k(vector_rows, vector_scores, rows, match_percentage, num_candidates)
+
+        keyword_order = top_k(keyword_scores)
+        vector_order = top_k(vector_scores)
+        yield (
+            stop,
+            keyword_result_rows(
+                index, keyword_rows[keyword_order], dict(zip(keyword_rows, keyword_scores)),
+                dict(zip(keyword_rows, keyword_hits)), jd_keywords_normalized,
+            ),
+            vector_result_rows(index, vector_rows[vector_order], dict(zip(vector_rows, vector_scores))),
+        )
@@ -0,0 +1,19 @@
+import os
+
+from pymongo import MongoClient
+
+DB_NAME = "resumes_database"
+
+
+def get_mongo_uri(uri=None):
+    """Return the given URI, else $MONGO_URI, else the Streamlit mongo secret."""
+    if uri:
+        return uri
+    if os.environ.get("MONGO_URI"):
+        return os.environ["MONGO_URI"]
+    import streamlit as st
+    return st.secrets["mongo"]["uri"]
+
+def get_database(uri=None, **client_options):
+    """Connect to the resumes database outside of the Streamlit apps."""
+    return MongoClient(get_mongo_uri(uri), **client_options)[DB_NAME]
@@ -0,0 +1,157 @@
+import contextvars
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import bson
+from pymongo import monitoring
+
+# Reruns kept for the dashboard and for comparing query volume between reruns
+HISTORY = 50
+# Connection and session housekeeping the driver issues on its own
+IGNORED_COMMANDS = frozenset([
+    "hello", "ismaster", "isMaster", "ping", "buildInfo", "buildinfo", "endSessions",
+    "saslStart", "saslContinue", "authenticate", "getnonce", "killCursors",
+])
+# Frames from these files are the profiler and the driver, never the caller
+_SKIPPED_FILES = {os.path.abspath(__file__)}
+_REPO_DIRECTORY = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+# Rerun being profiled in the current context (None outside of rerun())
+_active_rerun = contextvars.ContextVar("active_rerun", default=None)
+
+
+def command_label(command_name, command):
+    """Name a command the way the app code spells it.
+
+    find_one() is sent as a single-batch find with limit 1 and
+    count_documents() as an aggregate ending in a {_id: 1, n: {$sum: 1}} group.
+    """
+    if command_name == "find" and command.get("singleBatch") and command.get("limit") == 1:
+        return "find_one"
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        if pipeline and pipeline[-1].get("$group") == {"_id": 1, "n": {"$sum": 1}}:
+            return "count_documents"
+    return command_name
+
+def calling_function(directory=_REPO_DIRECTORY):
+    """module.function of the innermost frame in this repository that is not the profiler."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(directory) and filename not in _SKIPPED_FILES:
+            module = os.path.splitext(os.path.basename(filename))[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "(library)"
+
+class RerunProfile:
+    """Round trips, reply bytes and duration per (app function, command) for one rerun."""
+
+    def __init__(self, number, label=None):
+        self.number = number
+        self.label = label
+        self.started_at = time.time()
+        self.stats = defaultdict(lambda: {"round_trips": 0, "reply_bytes": 0, "duration_ms": 0.0, "failures": 0})
+
+    @property
+    def round_trips(self):
+        return sum(stat["round_trips"] for stat in self.stats.values())
+
+    @property
+    def reply_bytes(self):
+        return sum(stat["reply_bytes"] for stat in self.stats.values())
+
+    @property
+    def duration_ms(self):
+        return sum(stat["duration_ms"] for stat in self.stats.values())
+
+    def rows(self):
+        """[{function, command, round_trips, reply_bytes, duration_ms, failures}], most round trips first."""
+        rows = [
+            {"function": function, "command": command, **stat, "duration_ms": round(stat["duration_ms"], 2)}
+            for (function, command), stat in self.stats.items()
+        ]
+        return sorted(rows, key=lambda row: (-row["round_trips"], row["function"], row["command"]))
+
+class CommandProfiler(monitoring.CommandListener):
+    """pymongo CommandListener attributing every command to a rerun and the app function that issued it.
+
+    Pass it to MongoClient(event_listeners=[...]). Commands issued inside
+    rerun() are counted on that rerun; the rest (e.g. from loader threads,
+    which do not inherit the context) go to a rerun numbered 0. Durations are
+    the driver's round-trip times; reply bytes are the BSON size of the
+    reply, which costs one re-encode per command.
+    """
+
+    def __init__(self, history=HISTORY, measure_bytes=True):
+        self.measure_bytes = measure_bytes
+        self._lock = threading.Lock()
+        self._numbers = itertools.count(1)
+        self._pending = {}
+        self.reruns = deque(maxlen=history)
+        self.background = RerunProfile(0, "outside reruns")
+
+    @contextmanager
+    def rerun(self, label=None):
+        """Profile the commands issued inside the block as one rerun; yields its RerunProfile."""
+        profile = RerunProfile(next(self._numbers), label)
+        with self._lock:
+            self.reruns.append(profile)
+        token = _active_rerun.set(profile)
+        try:
+            yield profile
+        finally:
+            _active_rerun.reset(token)
+
+    def last_reruns(self, count=2):
+        """The most recent completed or running reruns, newest last."""
+        with self._lock:
+            return list(self.reruns)[-count:]
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        profile = _active_rerun.get() or self.background
+        key = (calling_function(), command_label(event.command_name, event.command))
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = (profile, key)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        with self._lock:
+            pending = self._pending.pop((event.request_id, event.connection_id), None)
+        if pending is None:
+            return
+        profile, key = pending
+        reply_bytes = len(bson.encode(event.reply)) if self.measure_bytes and not failed else 0
+        with self._lock:
+            stat = profile.stats[key]
+            stat["round_trips"] += 1
+            stat["reply_bytes"] += reply_bytes
+            stat["duration_ms"] += event.duration_micros / 1000
+            stat["failures"] += failed
+
+def query_volume_change(previous, current):
+    """Rows whose round trips changed between two reruns, for spotting new or repeated queries."""
+    keys = sorted(set(previous.stats) | set(current.stats))
+    changes = []
+    for key in keys:
+        before = previous.stats[key]["round_trips"] if key in previous.stats else 0
+        after = current.stats[key]["round_trips"] if key in current.stats else 0
+        if before != after:
+            changes.append({"function": key[0], "command": key[1], "before": before, "after": after})
+    return changes
+
+# Process-wide profiler, registered on the app's MongoClient
+MONGO_PROFILER = CommandProfiler()
@@ -0,0 +1,145 @@
+import multiprocessing as mp
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from matching import keyword_result_rows, score_keywords, score_vectors, top_k, vector_result_rows
+from shared_index import DEFAULT_INDEX_PATH, attach_index
+
+# Per-process shard state, set once by _init_shard in every worker
+_shard = None
+_shard_start = 0
+_shard_memory = None
+
+
+def _attach_shared_memory(name):
+    """Attach to an existing block owned by the parent process."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: spawned workers share the parent's resource tracker
+        return shared_memory.SharedMemory(name=name)
+
+def _release(pools, memory):
+    """Stop the shard workers and free the shared embeddings."""
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+    if memory is not None:
+        memory.close()
+        memory.unlink()
+
+def _init_shard(memory_name, shape, start, stop, shard):
+    """Worker initializer: keep the shard and view its embedding rows in shared memory."""
+    global _shard, _shard_start, _shard_memory
+    _shard_memory = _attach_shared_memory(memory_name)
+    embeddings = np.ndarray(shape, dtype=np.float32, buffer=_shard_memory.buf)[start:stop]
+    _shard = replace(shard, embeddings=embeddings)
+    _shard_start = start
+
+def _attach_published_shard(root, version, start, stop):
+    """Worker initializer: map the shard's rows of a published index version read-only."""
+    global _shard, _shard_start
+    _shard = attach_index(root, version).slice(start, stop)
+    _shard_start = start
+
+def _score_shard(jd_keywords, jd_embedding, num_candidates, threshold):
+    """Score the worker's shard and return its local top-k in global row numbers."""
+    result = {}
+    if jd_keywords is not None:
+        jd_keywords_normalized, match_percentage, hits = score_keywords(_shard, jd_keywords, threshold)
+        rows = top_k(match_percentage, num_candidates)
+        result["keywords"] = (rows + _shard_start, match_percentage[rows], hits[rows], jd_keywords_normalized)
+    if jd_embedding is not None:
+        match_percentage = score_vectors(_shard, jd_embedding)
+        rows = top_k(match_percentage, num_candidates)
+        result["vector"] = (rows + _shard_start, match_percentage[rows])
+    return result
+
+class ShardedScorer:
+    """Score a ResumeIndex across persistent worker processes, one per shard.
+
+    When index is a published version (pass its version, and root if not
+    the default), every worker maps its slice of that version's files, so
+    the embeddings stay in the one set of shared pages. Otherwise the
+    embeddings are copied once into a shared memory block that every worker
+    views, and keyword postings are sent to each worker when it starts.
+    Queries fan out to all shards and the per-shard top-k lists are merged
+    here.
+    """
+
+    def __init__(self, index, num_shards=None, version=None, root=DEFAULT_INDEX_PATH):
+        self.index = index
+        num_shards = max(1, min(num_shards or os.cpu_count() or 1, len(index) or 1))
+
+        self._memory = None
+        if version is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=max(index.embeddings.nbytes, 1))
+            np.ndarray(index.embeddings.shape, dtype=np.float32, buffer=self._memory.buf)[:] = index.embeddings
+
+        bounds = np.linspace(0, len(index), num_shards + 1).astype(int)
+        context = mp.get_context("spawn")
+        self._pools = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if version is None:
+                shard = replace(index.slice(start, stop), embeddings=None)
+                initializer = _init_shard
+                initargs = (self._memory.name, index.embeddings.shape, int(start), int(stop), shard)
+            else:
+                initializer, initargs = _attach_published_shard, (root, version, int(start), int(stop))
+            pool = ProcessPoolExecutor(
+                max_workers=1, mp_context=context, initializer=initializer, initargs=initargs,
+            )
+            self._pools.append(pool)
+        self._finalizer = weakref.finalize(self, _release, self._pools, self._memory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the workers and release any shared embeddings (also done on garbage collection)."""
+        self._finalizer()
+
+    def _gather(self, jd_keywords, jd_embedding, num_candidates, threshold):
+        futures = [
+            pool.submit(_score_shard, jd_keywords, jd_embedding, num_candidates, threshold)
+            for pool in self._pools
+        ]
+        return [future.result() for future in futures]
+
+    def _merge_keywords(self, partials, num_candidates):
+        rows = np.concatenate([p["keywords"][0] for p in partials])
+        scores = np.concatenate([p["keywords"][1] for p in partials])
+        hits = np.concatenate([p["keywords"][2] for p in partials])
+        jd_keywords_normalized = partials[0]["keywords"][3]
+        order = top_k(scores, num_candidates)
+        match_percentage = dict(zip(rows[order], scores[order]))
+        hits_by_row = dict(zip(rows[order], hits[order]))
+        return keyword_result_rows(self.index, rows[order], match_percentage, hits_by_row, jd_keywords_normalized)
+
+    def _merge_vector(self, partials, num_candidates):
+        rows = np.concatenate([p["vector"][0] for p in partials])
+        scores = np.concatenate([p["vector"][1] for p in partials])
+        order = top_k(scores, num_candidates)
+        return vector_result_rows(self.index, rows[order], dict(zip(rows[order], scores[order])))
+
+    def find_keyword_matches(self, jd_keywords, num_candidates=50, threshold=80):
+        """Keyword-match the whole corpus and return the merged top rows."""
+        partials = self._gather(jd_keywords, None, num_candidates, threshold)
+        return self._merge_keywords(partials, num_candidates)
+
+    def find_top_matches(self, jd_embedding, num_candidates=50):
+        """Vector-match the whole corpus and return the merged top rows."""
+        partials = self._gather(None, jd_embedding, num_candidates, 80)
+        return self._merge_vector(partials, num_candidates)
+
+    def find_matches(self, jd_keywords, jd_embedding, num_candidates=50, threshold=80):
+        """Run keyword and vector matching in one round trip to the workers."""
+        partials = self._gather(jd_keywords, jd_embedding, num_candidates, threshold)
+        vector_matches = self._merge_vector(partials, num_candidates) if jd_embedding is not None else []
+        return self._merge_keywords(partials, num_candidates), vector_matches
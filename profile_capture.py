@@ -0,0 +1,110 @@
+import contextvars
+import cProfile
+import datetime
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_MODES = ("cprofile", "sampling")
+DEFAULT_PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "zapptest", "profiles")
+)
+# Seconds between stack samples in sampling mode
+SAMPLE_INTERVAL = 0.005
+
+# Capture running in the current context (None when not profiling)
+_active_capture = contextvars.ContextVar("active_capture", default=None)
+
+
+def set_capture_tags(**tags):
+    """Tag the running capture (e.g. jd_id, corpus_size); a no-op when nothing is being profiled."""
+    capture = _active_capture.get()
+    if capture is not None:
+        capture.tags.update({key: value for key, value in tags.items() if value is not None})
+
+def artifact_name(started_at, tags, extension):
+    """File name like 20240101T120000123456_corpus-1200_jd-J42.pstats."""
+    parts = [started_at.strftime("%Y%m%dT%H%M%S%f")]
+    parts += [f"{key.split('_')[0]}-{value}" for key, value in sorted(tags.items())]
+    return re.sub(r"[^\w.-]", "_", "_".join(parts)) + extension
+
+class StackSampler:
+    """Sample one thread's Python stack on a background thread.
+
+    Stacks are counted in collapsed form (root;...;leaf), the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}.{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class ProfileCapture:
+    """One profiled run; `path` is set once the artifact is written."""
+
+    def __init__(self, mode, directory):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self.directory = directory
+        self.tags = {}
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.path = None
+
+@contextmanager
+def capture(mode="cprofile", directory=DEFAULT_PROFILE_DIR):
+    """Profile the block and save a pstats ("cprofile") or collapsed-stack ("sampling") file.
+
+    Yields the ProfileCapture; tags set with set_capture_tags() inside the
+    block end up in the file name.
+    """
+    run = ProfileCapture(mode, directory)
+    os.makedirs(directory, exist_ok=True)
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    token = _active_capture.set(run)
+    try:
+        yield run
+    finally:
+        _active_capture.reset(token)
+        if mode == "cprofile":
+            profiler.disable()
+            run.path = os.path.join(directory, artifact_name(run.started_at, run.tags, ".pstats"))
+            profiler.dump_stats(run.path)
+        else:
+            profiler.stop()
+            run.path = os.path.join(directory, artifact_name(run.started_at, run.tags, ".collapsed"))
+            profiler.write(run.path)
@@ -0,0 +1,201 @@
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+
+from matching import cosine_percentages, score_vectors, vector_result_rows
+from mongo_config import get_database
+from shared_index import DEFAULT_INDEX_PATH, attach_or_load_index
+
+# Rows used to estimate the principal axes
+PCA_SAMPLE_SIZE = 20000
+# Slack on the pruning bound (as a cosine) so float32 rounding never drops a
+# row whose exact score reaches the threshold
+BOUND_SLACK = 1e-4
+# When more rows than this survive the first block, gathering them costs more
+# than scoring everything, so the query falls back to a full scan
+FULL_SCAN_FRACTION = 0.05
+
+
+class RangeSearchIndex:
+    """Bounds for exact "everything above X%" vector queries.
+
+    Embeddings are rotated onto their principal axes (a rotation keeps every
+    dot product), so most of each vector's energy lands in the first
+    dimensions. Queries accumulate the dot product one block of dimensions at
+    a time; by Cauchy-Schwarz the rest can add at most
+    |query tail| * |row tail|, and rows whose partial dot plus that bound
+    cannot reach the threshold are dropped before the next block.
+
+    The rotated blocks are a float32 copy of every embedding. Built in a
+    process, that copy is private to it; attach_or_build_range_index()
+    publishes it next to a shared index version so that every process maps
+    the same read-only pages instead.
+    """
+
+    def __init__(self, index, block_size=32, sample_size=PCA_SAMPLE_SIZE, seed=0):
+        self.index = index
+        self.block_size = block_size
+        embedded = np.flatnonzero(index.norms > 0)
+        sample = embedded
+        if len(sample) > sample_size:
+            sample = np.sort(np.random.default_rng(seed).choice(embedded, sample_size, replace=False))
+
+        dim = index.dim
+        # A covariance needs at least two rows; any rotation is exact, so fall back to none
+        if len(sample) >= 2:
+            _, axes = np.linalg.eigh(np.cov(index.embeddings[sample].astype(np.float64), rowvar=False).reshape(dim, dim))
+            self.basis = np.ascontiguousarray(axes[:, ::-1], dtype=np.float32)
+        else:
+            self.basis = np.eye(dim, dtype=np.float32)
+        rotated = index.embeddings @ self.basis
+        self.boundaries = list(range(0, dim, block_size)) + [dim]
+        # One contiguous (row x block) array per block and one tail-norm
+        # column per boundary, so the first block is a plain sequential scan
+        self.blocks = [
+            np.ascontiguousarray(rotated[:, start:stop]) for start, stop in zip(self.boundaries, self.boundaries[1:])
+        ]
+        self.tail_norms = np.ascontiguousarray(tail_norms(rotated, self.boundaries).T)
+
+    def save(self, directory):
+        """Write the basis, blocks and tail norms as .npy files into a new directory.
+
+        The files are written to a temporary directory renamed into place, so
+        readers never see a partial set; raises OSError if directory exists.
+        """
+        staging = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(staging)
+        try:
+            np.save(os.path.join(staging, "basis.npy"), self.basis)
+            np.save(os.path.join(staging, "tail_norms.npy"), self.tail_norms)
+            for block, values in enumerate(self.blocks):
+                np.save(os.path.join(staging, f"block{block}.npy"), values)
+            os.rename(staging, directory)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @classmethod
+    def attach(cls, index, directory):
+        """Map bounds written by save() read-only, for the index they were built from."""
+        def load(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        range_index = cls.__new__(cls)
+        range_index.index = index
+        range_index.basis = load("basis")
+        range_index.tail_norms = load("tail_norms")
+        range_index.blocks = [load(f"block{block}") for block in range(range_index.tail_norms.shape[0] - 1)]
+        range_index.block_size = range_index.blocks[0].shape[1] if range_index.blocks else 0
+        range_index.boundaries = np.cumsum([0] + [block.shape[1] for block in range_index.blocks]).tolist()
+        if range_index.tail_norms.shape[1] != len(index):
+            raise ValueError(f"range bounds in {directory} cover {range_index.tail_norms.shape[1]} rows, index has {len(index)}")
+        return range_index
+
+    def search(self, jd_embedding, threshold=75.0):
+        """Return (rows, match percentages) of every row scoring at least threshold, best first.
+
+        Scores are computed exactly as score_vectors computes them; the
+        rotated copy is only used to decide which rows to score.
+        """
+        index = self.index
+        empty = np.empty(0, dtype=np.int64), np.empty(0)
+        query = np.asarray(jd_embedding if jd_embedding is not None else [], dtype=np.float32)
+        magnitude = np.linalg.norm(query)
+        if query.ndim != 1 or query.shape[0] != index.dim or magnitude == 0 or len(index) == 0:
+            return empty
+
+        query = (query / magnitude) @ self.basis
+        query_tails = tail_norms(query[None, :], self.boundaries)[0]
+        # Anything rounding up to the threshold counts, as the apps compare rounded percentages
+        cutoff = (threshold - 0.005) / 100 - BOUND_SLACK
+
+        partial = self.blocks[0] @ query[:self.boundaries[1]]
+        keep = (partial + query_tails[1] * self.tail_norms[1] >= cutoff) & (index.norms > 0)
+        rows, partial = np.flatnonzero(keep), partial[keep]
+        if len(rows) > FULL_SCAN_FRACTION * len(index):
+            rows, match_percentage = np.arange(len(index)), score_vectors(index, jd_embedding)
+        else:
+            rows = self._prune(rows, partial, query, query_tails, cutoff)
+            match_percentage = cosine_percentages(index.embeddings[rows], index.norms[rows], [jd_embedding])[:, 0]
+        keep = match_percentage >= threshold
+        rows, match_percentage = rows[keep], match_percentage[keep]
+        order = np.lexsort((rows, -match_percentage))
+        return rows[order], match_percentage[order]
+
+    def _prune(self, rows, partial, query, query_tails, cutoff):
+        """Run the remaining blocks over the surviving rows."""
+        for block in range(1, len(self.blocks)):
+            if not len(rows):
+                break
+            start, stop = self.boundaries[block], self.boundaries[block + 1]
+            partial += self.blocks[block][rows] @ query[start:stop]
+            keep = partial + query_tails[block + 1] * self.tail_norms[block + 1, rows] >= cutoff
+            rows, partial = rows[keep], partial[keep]
+        return rows
+
+def tail_norms(vectors, boundaries):
+    """Norm of each vector's dimensions from every block boundary on (last column is 0)."""
+    squares = vectors.astype(np.float64) ** 2
+    suffix = np.cumsum(squares[:, ::-1], axis=1)[:, ::-1]
+    tails = np.zeros((len(vectors), len(boundaries)), dtype=np.float32)
+    tails[:, :-1] = np.sqrt(suffix[:, boundaries[:-1]])
+    return tails
+
+def attach_or_build_range_index(index, version=None, root=DEFAULT_INDEX_PATH, block_size=32):
+    """Range search bounds for an index attached from a published version.
+
+    The first process to ask builds the bounds and writes them into the
+    version directory; every process then maps them, so the rotated
+    embeddings are held once per host. Without a version (a privately
+    loaded index) or a writable version directory, the bounds are built in
+    this process and cost a float32 copy of every embedding.
+    """
+    if version is None:
+        return RangeSearchIndex(index, block_size)
+    directory = os.path.join(root, version, f"range_bounds_{block_size}")
+    if not os.path.isdir(directory):
+        range_index = RangeSearchIndex(index, block_size)
+        try:
+            range_index.save(directory)
+        except OSError:
+            # Another process published first, or the version was removed meanwhile
+            if not os.path.isdir(directory):
+                return range_index
+    return RangeSearchIndex.attach(index, directory)
+
+def find_matches_above(range_index, jd_embedding, threshold=75.0, limit=None):
+    """Table rows for every resume at or above threshold percent vector match."""
+    rows, match_percentage = range_index.search(jd_embedding, threshold)
+    rows, match_percentage = rows[:limit], match_percentage[:limit]
+    return vector_result_rows(range_index.index, rows, dict(zip(rows, match_percentage)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Time thresholded vector queries against a full scan.")
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--threshold", type=float, default=75.0)
+    parser.add_argument("--block-size", type=int, default=32)
+    args = parser.parse_args()
+
+    db = get_database(args.mongo_uri)
+    index = attach_or_load_index(db["resumes"])
+    start = time.perf_counter()
+    range_index = RangeSearchIndex(index, args.block_size)
+    print(f"built bounds for {len(index)} resumes in {time.perf_counter() - start:.1f}s")
+
+    for jd in db["job_description"].find({"embedding": {"$exists": True}}, {"jobId": 1, "embedding": 1}):
+        start = time.perf_counter()
+        full = score_vectors(index, jd["embedding"])
+        expected = np.count_nonzero(full >= args.threshold)
+        scanned = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows, _ = range_index.search(jd["embedding"], args.threshold)
+        pruned = time.perf_counter() - start
+        status = "ok" if len(rows) == expected else f"MISMATCH (scan found {expected})"
+        print(f"{jd['jobId']}: {len(rows)} above {args.threshold}%, {scanned * 1000:.1f}ms scan, "
+              f"{pruned * 1000:.1f}ms pruned, {status}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+from dataclasses import dataclass, replace
+
+import numpy as np
+from scipy import sparse
+
+from matching import preprocess_keyword
+
+# Only documents with a resumeId take part in matching
+RESUME_QUERY = {"resumeId": {"$exists": True}}
+RESUME_PROJECTION = {
+    "resumeId": 1, "name": 1, "email": 1, "contactNo": 1, "keywords": 1, "embedding": 1,
+    "keywords_norm": 1, "candidateKey": 1,
+}
+
+
+def candidate_key(resume):
+    """Build the email/phone key used to skip duplicate resumes."""
+    return f"{resume.get('email')}_{resume.get('contactNo')}"
+
+def normalized_keywords(resume):
+    """Distinct normalized keywords, precomputed at ingestion (keywords_norm) or derived here."""
+    if "keywords_norm" in resume:
+        return resume["keywords_norm"]
+    return list(dict.fromkeys(preprocess_keyword(k) for k in resume.get("keywords") or []))
+
+class StringColumn:
+    """Read-only list of strings stored as UTF-8 bytes plus row offsets.
+
+    Supports len(), iteration, integer indexing and slicing, so it can stand in
+    for a list of strings while keeping the data in two flat arrays that can
+    be memory-mapped.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [("" if s is None else str(s)).encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError("StringColumn only supports contiguous slices")
+            lo, hi = self.offsets[start], self.offsets[max(start, stop)]
+            return StringColumn(self.data[lo:hi], self.offsets[start:max(start, stop) + 1] - lo)
+        if item < 0:
+            item += len(self)
+        return self.data[self.offsets[item]:self.offsets[item + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data, offsets = self.data.tobytes(), self.offsets.tolist()
+        return (data[start:stop].decode("utf-8") for start, stop in zip(offsets, offsets[1:]))
+
+class CategoricalColumn:
+    """Read-only list of repetitive strings stored as int32 codes into the distinct values.
+
+    Names repeat a lot ("N/A", common names), so each distinct value is
+    kept once and rows hold a 4-byte code.
+    """
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_strings(cls, strings):
+        lookup, categories, codes = {}, [], []
+        for s in strings:
+            if s not in lookup:
+                lookup[s] = len(categories)
+                categories.append(s)
+            codes.append(lookup[s])
+        return cls(np.asarray(codes, dtype=np.int32), categories)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return CategoricalColumn(self.codes[item], self.categories)
+        return self.categories[self.codes[item]]
+
+    def __iter__(self):
+        return (self.categories[code] for code in self.codes.tolist())
+
+@dataclass
+class ResumeIndex:
+    """In-memory copy of the fields the matchers need, one row per unique candidate.
+
+    Columnar: resume ids and candidate keys are StringColumns, names a
+    CategoricalColumn, and keywords are stored normalized, as vocabulary ids
+    in an offsets-plus-data layout; embeddings are unit-normalized float32
+    rows with their original norms kept alongside (0 for resumes without an
+    embedding). Matchers address resumes by integer row.
+    """
+    resume_ids: list
+    names: list
+    candidate_keys: list
+    vocab: list
+    keyword_offsets: np.ndarray
+    keyword_ids: np.ndarray
+    embeddings: np.ndarray
+    norms: np.ndarray
+
+    def __len__(self):
+        return len(self.resume_ids)
+
+    @property
+    def dim(self):
+        return self.embeddings.shape[1]
+
+    def row_keywords(self, row):
+        """Return the normalized keywords of one row."""
+        start, stop = self.keyword_offsets[row], self.keyword_offsets[row + 1]
+        return [self.vocab[i] for i in self.keyword_ids[start:stop]]
+
+    def keyword_matrix(self, rows=None):
+        """Return the (row x vocabulary) keyword incidence matrix as CSR.
+
+        With rows, only those rows, in that order; their postings are gathered
+        straight from the offsets, so the cost follows the selected rows.
+        """
+        if rows is None:
+            offsets, keyword_ids = self.keyword_offsets, self.keyword_ids
+        else:
+            starts = self.keyword_offsets[rows]
+            lengths = self.keyword_offsets[np.asarray(rows) + 1] - starts
+            offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            keyword_ids = self.keyword_ids[np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])]
+        data = np.ones(len(keyword_ids), dtype=np.int32)
+        return sparse.csr_matrix((data, keyword_ids, offsets), shape=(len(offsets) - 1, len(self.vocab)))
+
+    def slice(self, start, stop):
+        """Return rows [start, stop) as a new index with a compacted vocabulary."""
+        lo, hi = self.keyword_offsets[start], self.keyword_offsets[stop]
+        used, keyword_ids = np.unique(self.keyword_ids[lo:hi], return_inverse=True)
+        return replace(
+            self,
+            resume_ids=self.resume_ids[start:stop],
+            names=self.names[start:stop],
+            candidate_keys=self.candidate_keys[start:stop],
+            vocab=[self.vocab[i] for i in used],
+            keyword_offsets=self.keyword_offsets[start:stop + 1] - lo,
+            keyword_ids=keyword_ids.astype(np.int32),
+            embeddings=self.embeddings[start:stop],
+            norms=self.norms[start:stop],
+        )
+
+def unit_embeddings(vectors):
+    """Stack embeddings as unit-normalized float32 rows plus their original norms.
+
+    The dimension is taken from the first non-empty vector; missing vectors and
+    vectors of another dimension become zero rows with norm 0.
+    """
+    dim = next((len(v) for v in vectors if v), 0)
+    embeddings = np.zeros((len(vectors), dim), dtype=np.float32)
+    norms = np.zeros(len(vectors), dtype=np.float32)
+    for row, vector in enumerate(vectors):
+        if not vector or len(vector) != dim:
+            continue
+        embeddings[row] = vector
+        norms[row] = np.linalg.norm(embeddings[row])
+    np.divide(embeddings, norms[:, None], out=embeddings, where=norms[:, None] > 0)
+    return embeddings, norms
+
+def build_resume_index(resumes):
+    """Build a ResumeIndex from resume documents, keeping the first of each candidate."""
+    seen_keys = set()
+    resume_ids, names, candidate_keys, vectors = [], [], [], []
+    vocab, vocab_lookup = [], {}
+    keyword_offsets, keyword_ids = [0], []
+
+    for resume in resumes:
+        key = resume.get("candidateKey") or candidate_key(resume)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+
+        resume_ids.append(resume.get("resumeId"))
+        names.append(resume.get("name", "N/A"))
+        candidate_keys.append(key)
+
+        for keyword in normalized_keywords(resume):
+            if keyword not in vocab_lookup:
+                vocab_lookup[keyword] = len(vocab)
+                vocab.append(keyword)
+            keyword_ids.append(vocab_lookup[keyword])
+        keyword_offsets.append(len(keyword_ids))
+
+        vectors.append(resume.get("embedding") or None)
+
+    embeddings, norms = unit_embeddings(vectors)
+    return ResumeIndex(
+        resume_ids=StringColumn.from_strings(resume_ids),
+        names=CategoricalColumn.from_strings(names),
+        candidate_keys=StringColumn.from_strings(candidate_keys),
+        vocab=vocab,
+        keyword_offsets=np.asarray(keyword_offsets, dtype=np.int64),
+        keyword_ids=np.asarray(keyword_ids, dtype=np.int32),
+        embeddings=embeddings,
+        norms=norms,
+    )
+
+def concat_indexes(indexes):
+    """Stack indexes row-wise into one, merging their vocabularies.
+
+    Used to append newly inserted candidates to a loaded index without
+    reading the collection again; the caller keeps rows unique.
+    """
+    vocab, vocab_lookup, keyword_ids = [], {}, []
+    for index in indexes:
+        remap = np.empty(len(index.vocab), dtype=np.int32)
+        for i, keyword in enumerate(index.vocab):
+            if keyword not in vocab_lookup:
+                vocab_lookup[keyword] = len(vocab)
+                vocab.append(keyword)
+            remap[i] = vocab_lookup[keyword]
+        keyword_ids.append(remap[index.keyword_ids])
+
+    def stacked_offsets(columns):
+        lengths = [column[1:] - column[0] for column in columns]
+        starts = np.cumsum([0] + [length[-1] if len(length) else 0 for length in lengths[:-1]])
+        return np.concatenate([np.zeros(1, dtype=np.int64)] + [length + start for length, start in zip(lengths, starts)])
+
+    # As in unit_embeddings, rows of another dimension (e.g. an index without
+    # any embedding, dimension 0) become zero rows with norm 0
+    dim = max(index.dim for index in indexes)
+    embeddings = np.zeros((sum(len(index) for index in indexes), dim), dtype=np.float32)
+    norms = np.zeros(len(embeddings), dtype=np.float32)
+    row = 0
+    for index in indexes:
+        if index.dim == dim:
+            embeddings[row:row + len(index)] = index.embeddings
+            norms[row:row + len(index)] = index.norms
+        row += len(index)
+
+    return ResumeIndex(
+        resume_ids=StringColumn(
+            np.concatenate([index.resume_ids.data for index in indexes]),
+            stacked_offsets([index.resume_ids.offsets for index in indexes]),
+        ),
+        names=CategoricalColumn.from_strings(name for index in indexes for name in index.names),
+        candidate_keys=StringColumn(
+            np.concatenate([index.candidate_keys.data for index in indexes]),
+            stacked_offsets([index.candidate_keys.offsets for index in indexes]),
+        ),
+        vocab=vocab,
+        keyword_offsets=stacked_offsets([index.keyword_offsets for index in indexes]),
+        keyword_ids=np.concatenate(keyword_ids).astype(np.int32),
+        embeddings=embeddings,
+        norms=norms,
+    )
+
+def count_duplicate_resumes(collection):
+    """Count duplicate resumes by email and phone on the server.
+
+    Same rule as find_duplicate_resumes in the apps: only resumes with an email
+    or a phone number are grouped, and every resume beyond the first in a
+    group is a duplicate. Returns (duplicate_groups, total_duplicates).
+    """
+    pipeline = [
+        {"$match": {"$or": [{"email": {"$nin": [None, ""]}}, {"contactNo": {"$nin": [None, ""]}}]}},
+        {"$group": {
+            "_id": {"email": {"$ifNull": ["$email", None]}, "contactNo": {"$ifNull": ["$contactNo", None]}},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$group": {"_id": None, "groups": {"$sum": 1}, "duplicates": {"$sum": {"$subtract": ["$count", 1]}}}},
+    ]
+    summary = next(collection.aggregate(pipeline, allowDiskUse=True), None)
+    if summary is None:
+        return 0, 0
+    return summary["groups"], summary["duplicates"]
+
+def load_resume_index(collection, query=None):
+    """Read all matchable resumes from MongoDB into a ResumeIndex."""
+    return build_resume_index(collection.find(query or RESUME_QUERY, RESUME_PROJECTION))
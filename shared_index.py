@@ -0,0 +1,101 @@
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+
+from bulk_loader import load_resume_index_parallel
+from mongo_config import get_database
+from resume_index import ResumeIndex, StringColumn
+
+# tmpfs by default, so published files live in shared memory
+DEFAULT_INDEX_PATH = os.environ.get("RESUME_INDEX_PATH", "/dev/shm/resume_index")
+CURRENT_FILE = "CURRENT"
+
+ARRAY_FIELDS = ["keyword_offsets", "keyword_ids", "embeddings", "norms"]
+STRING_FIELDS = ["resume_ids", "names", "candidate_keys", "vocab"]
+
+
+def current_version(root=DEFAULT_INDEX_PATH):
+    """Return the name of the published index version, or None if nothing is published."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def publish_index(index, root=DEFAULT_INDEX_PATH, keep=2):
+    """Write the index as .npy files into a new version directory and make it current.
+
+    Readers attached to an older version keep their mappings; only versions
+    beyond the newest `keep` are removed.
+    """
+    now = time.time_ns()
+    version = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10**9))}-{now % 10**9:09d}"
+    target = os.path.join(root, version)
+    os.makedirs(target)
+
+    for field in ARRAY_FIELDS:
+        np.save(os.path.join(target, f"{field}.npy"), getattr(index, field))
+    for field in STRING_FIELDS:
+        column = getattr(index, field)
+        if not isinstance(column, StringColumn):
+            column = StringColumn.from_strings(column)
+        np.save(os.path.join(target, f"{field}.data.npy"), column.data)
+        np.save(os.path.join(target, f"{field}.offsets.npy"), column.offsets)
+
+    pointer = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}")
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+
+    versions = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
+
+def attach_index(root=DEFAULT_INDEX_PATH, version=None):
+    """Map a published index read-only; pages are shared with every other reader."""
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No resume index published under {root}")
+    source = os.path.join(root, version)
+
+    def load(name):
+        return np.load(os.path.join(source, f"{name}.npy"), mmap_mode="r")
+
+    fields = {field: load(field) for field in ARRAY_FIELDS}
+    for field in STRING_FIELDS:
+        fields[field] = StringColumn(load(f"{field}.data"), load(f"{field}.offsets"))
+    # rapidfuzz scans the vocabulary on every query, so decode it once
+    fields["vocab"] = list(fields["vocab"])
+    return ResumeIndex(**fields)
+
+def attach_or_load_index(collection, root=DEFAULT_INDEX_PATH):
+    """Attach the published index if there is one, else load a private copy from MongoDB."""
+    if current_version(root):
+        return attach_index(root)
+    return load_resume_index_parallel(collection)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load resumes from MongoDB and publish a shared index.")
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--path", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--refresh-seconds", type=float, default=0,
+                        help="republish at this interval instead of exiting")
+    args = parser.parse_args()
+
+    collection = get_database(args.mongo_uri)["resumes"]
+    os.makedirs(args.path, exist_ok=True)
+    while True:
+        start = time.perf_counter()
+        index = load_resume_index_parallel(collection)
+        version = publish_index(index, args.path)
+        print(f"published {len(index)} resumes as {version} in {time.perf_counter() - start:.1f}s")
+        if not args.refresh_seconds:
+            break
+        time.sleep(args.refresh_seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Samples kept per stage for the rolling percentiles
+WINDOW = 1000
+# Cumulative histogram bucket bounds (seconds) for the Prometheus export
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_NAME = "zapptest_stage_seconds"
+DEFAULT_METRICS_PORT = int(os.environ.get("METRICS_PORT", 9464))
+
+# Totals of the stages timed with accumulate() inside the current stage() block
+_active_totals = contextvars.ContextVar("active_totals", default=None)
+
+
+def percentiles(samples):
+    """Return p50/p95/p99 in milliseconds for a list of durations in seconds."""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+class StageTimings:
+    """Thread-safe latency samples per named stage.
+
+    stage() times a block and records one sample. Inside it, functions
+    wrapped with accumulate() and iterators wrapped with iterate() add up
+    their time over the whole block (e.g. every preprocess_keyword call of
+    one search) and record one sample per stage when the block ends.
+    """
+
+    def __init__(self, window=WINDOW, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._bucket_counts = defaultdict(lambda: [0] * len(buckets))
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+            self._sums[stage] += seconds
+            bucket_counts = self._bucket_counts[stage]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    bucket_counts[i] += 1
+
+    @contextmanager
+    def stage(self, name):
+        totals = defaultdict(float)
+        token = _active_totals.set(totals)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _active_totals.reset(token)
+            self.record(name, elapsed)
+            for part, seconds in totals.items():
+                self.record(f"{name}/{part}", seconds)
+
+    def timed(self, name):
+        """Decorator running a function inside stage(name)."""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _add(self, part, seconds):
+        totals = _active_totals.get()
+        if totals is None:
+            self.record(part, seconds)
+        else:
+            totals[part] += seconds
+
+    def accumulate(self, part):
+        """Decorator adding a function's run time to the enclosing stage under `part`."""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self._add(part, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    @contextmanager
+    def part(self, part):
+        """Add the time of a block to the enclosing stage under `part`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(part, time.perf_counter() - start)
+
+    def iterate(self, part, iterable):
+        """Yield from iterable, adding the time spent waiting on it (e.g. a Mongo cursor) to `part`."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._add(part, time.perf_counter() - start)
+                return
+            self._add(part, time.perf_counter() - start)
+            yield item
+
+    def summary(self):
+        """Return [{stage, count, p50_ms, p95_ms, p99_ms}] over the rolling window, by stage name."""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+        return [{"stage": stage, "count": counts[stage], **percentiles(samples[stage])} for stage in sorted(samples)]
+
+    def prometheus_text(self):
+        """Render all stages in the Prometheus text exposition format.
+
+        The histogram is cumulative since start; the rolling p50/p95/p99 are
+        exported as a summary over the last `window` samples.
+        """
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+            counts, sums = dict(self._counts), dict(self._sums)
+            bucket_counts = {stage: list(values) for stage, values in self._bucket_counts.items()}
+
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent per stage.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for stage in sorted(samples):
+            label = _escape_label(stage)
+            for bound, count in zip(self.buckets, bucket_counts[stage]):
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{bound}"}} {count}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="+Inf"}} {counts[stage]}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {sums[stage]:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {counts[stage]}')
+
+        rolling = f"{METRIC_NAME}_rolling"
+        lines += [f"# HELP {rolling} Per-stage quantiles over recent samples.", f"# TYPE {rolling} summary"]
+        for stage in sorted(samples):
+            label = _escape_label(stage)
+            for quantile, value in zip(("0.5", "0.95", "0.99"), np.percentile(samples[stage], [50, 95, 99])):
+                lines.append(f'{rolling}{{stage="{label}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'{rolling}_sum{{stage="{label}"}} {sum(samples[stage]):.6f}')
+            lines.append(f'{rolling}_count{{stage="{label}"}} {len(samples[stage])}')
+        return "\n".join(lines) + "\n"
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def start_metrics_server(timings, host="127.0.0.1", port=DEFAULT_METRICS_PORT):
+    """Serve /metrics for the given StageTimings on a daemon thread; returns the server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = timings.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+# Process-wide timings shared by the app and its helpers
+TIMINGS = StageTimings()
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+import api_server  # noqa: E402
+from resume_index import load_resume_index  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    db = mongomock.MongoClient().db
+    db["resumes"].insert_many([
+        {"resumeId": f"R{i}", "name": f"N{i}", "email": f"c{i}", "keywords": ["python", "sql"][:i % 3],
+         "embedding": [1.0, float(i), 0.5]}
+        for i in range(20)
+    ])
+    db["job_description"].insert_one(
+        {"jobId": "J1", "structured_query": {"keywords": ["python"]}, "embedding": [1.0, 2.0, 0.5]}
+    )
+    # Serve a private index built from the stand-in, never a published one
+    monkeypatch.setattr(api_server, "current_version", lambda: None)
+    monkeypatch.setattr(api_server, "attach_or_load_index", load_resume_index)
+    return api_server.create_app(db)
+
+def post_all(app, requests):
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            statuses = []
+            for path, body in requests:
+                response = await client.post(path, data=body, headers={"Content-Type": "application/json"})
+                statuses.append(response.status)
+            return statuses
+    return asyncio.run(run())
+
+def test_match_rejects_malformed_input_with_400(app):
+    statuses = post_all(app, [
+        ("/match/keyword", '["not", "an", "object"]'),
+        ("/match/keyword", '"J1"'),
+        ("/match/keyword", '{"jd_id": "J1", "k": "ten"}'),
+        ("/match/keyword", '{"jd_id": "J1", "k": -1}'),
+        ("/match/keyword", '{"jd_id": "J1", "threshold": "high"}'),
+        ("/match/vector", '{"jd_id": "J1", "min_score": "high"}'),
+        ("/match/vector", '{"jd_id": "J1", "min_score": [1]}'),
+        ("/match/hybrid", '{"jd_id": "J1", "keyword_weight": {}}'),
+        ("/match/keyword", '{"jd_id": "J1", "weighting": "tfidf"}'),
+        ("/match/keyword", "not json"),
+    ])
+    assert statuses == [400] * 10
+
+def test_match_accepts_valid_input(app):
+    statuses = post_all(app, [
+        ("/match/keyword", '{"jd_id": "J1", "k": 5}'),
+        ("/match/vector", '{"jd_id": "J1", "k": "3", "min_score": 50}'),
+        ("/match/hybrid", '{"jd_id": "J1", "k": 5, "keyword_weight": 0.5, "vector_weight": 0.5}'),
+    ])
+    assert statuses == [200, 200, 200]
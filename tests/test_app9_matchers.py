@@ -0,0 +1,119 @@
+"""The first-page keyword and vector matchers in app9 against the document-scanning originals."""
+import os
+import re
+
+import pytest
+from rapidfuzz import fuzz
+
+mongomock = pytest.importorskip("mongomock")
+pytest.importorskip("streamlit")
+
+from benchmark import generate_corpus, load_app_functions, load_corpus  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app9.py")
+
+
+def preprocess_keyword(keyword):
+    keyword = keyword.casefold().strip()
+    keyword = re.sub(r'[^\w\s]', '', keyword)
+    return ' '.join(sorted(keyword.split()))
+
+def original_keyword_matches(collection, jd_keywords, num_candidates=50):
+    """The matcher as it scanned documents before the index: first num_candidates * 2, deduplicated."""
+    results, seen_keys = [], set()
+    jd_keywords_normalized = [preprocess_keyword(keyword) for keyword in jd_keywords]
+    for resume in collection.find().limit(num_candidates * 2):
+        key = f"{resume.get('email')}_{resume.get('contactNo')}"
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        resume_keywords = [preprocess_keyword(keyword) for keyword in resume.get("keywords") or []]
+        if not resume_keywords or not jd_keywords_normalized:
+            continue
+        matching_keywords = [
+            keyword for keyword in jd_keywords_normalized
+            if any(keyword == rk or fuzz.ratio(keyword, rk) >= 80 for rk in resume_keywords)
+        ]
+        results.append({
+            "Resume ID": resume.get("resumeId"),
+            "Name": resume.get("name", "N/A"),
+            "Match Percentage (Keywords)": round(len(matching_keywords) / len(jd_keywords_normalized) * 100, 2),
+            "Matching Keywords": matching_keywords,
+        })
+        if len(results) >= num_candidates:
+            break
+    return sorted(results, key=lambda x: x["Match Percentage (Keywords)"], reverse=True)
+
+def original_top_matches(collection, jd_embedding, num_candidates=50):
+    results, seen_keys = [], set()
+    for resume in collection.find().limit(num_candidates * 2):
+        key = f"{resume.get('email')}_{resume.get('contactNo')}"
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        resume_embedding = resume.get("embedding")
+        if not resume_embedding:
+            continue
+        dot_product = sum(a * b for a, b in zip(jd_embedding, resume_embedding))
+        magnitude_jd = sum(a * a for a in jd_embedding) ** 0.5
+        magnitude_resume = sum(b * b for b in resume_embedding) ** 0.5
+        if magnitude_jd == 0 or magnitude_resume == 0:
+            continue
+        results.append({
+            "Resume ID": resume.get("resumeId"),
+            "Name": resume.get("name", "N/A"),
+            "Match Percentage (Vector)": round(dot_product / (magnitude_jd * magnitude_resume) * 100, 2),
+        })
+        if len(results) >= num_candidates:
+            break
+    return sorted(results, key=lambda x: x["Match Percentage (Vector)"], reverse=True)
+
+@pytest.fixture(scope="module")
+def corpus():
+    resumes, jds = generate_corpus(400, dim=16, duplicate_rate=0.2, missing_embedding_rate=0.1, seed=7)
+    # Leading documents the candidate window must treat as the original did
+    for i, resume in enumerate(resumes[:12]):
+        if i % 4 == 0:
+            del resume["resumeId"]
+        elif i % 4 == 1:
+            resume["keywords"] = []
+        elif i % 4 == 2:
+            resume["email"], resume["contactNo"] = resumes[i - 1]["email"], resumes[i - 1]["contactNo"]
+    db = mongomock.MongoClient().db
+    load_corpus(db, resumes, jds)
+    functions, _ = load_app_functions(APP, db)
+    return db, jds, functions
+
+@pytest.mark.parametrize("num_candidates", [5, 50])
+def test_keyword_matches_scan_the_original_window(corpus, num_candidates):
+    db, jds, functions = corpus
+    for jd in jds:
+        keywords = jd["structured_query"]["keywords"]
+        assert functions["find_keyword_matches"](keywords, num_candidates) == \
+            original_keyword_matches(db["resumes"], keywords, num_candidates)
+
+@pytest.mark.parametrize("num_candidates", [5, 50])
+def test_vector_matches_scan_the_original_window(corpus, num_candidates):
+    db, jds, functions = corpus
+    for jd in jds:
+        matches = functions["find_top_matches"](jd["embedding"], num_candidates)
+        expected = original_top_matches(db["resumes"], jd["embedding"], num_candidates)
+        # Same candidates; float32 scoring may move a score by one in the last decimal
+        key = lambda row: str(row["Resume ID"])  # noqa: E731
+        assert [row["Resume ID"] for row in sorted(matches, key=key)] == \
+            [row["Resume ID"] for row in sorted(expected, key=key)]
+        for row, original in zip(sorted(matches, key=key), sorted(expected, key=key)):
+            assert row["Match Percentage (Vector)"] == pytest.approx(original["Match Percentage (Vector)"], abs=0.011)
+
+def test_detail_columns_are_not_borrowed_by_rows_without_a_resume_id(corpus):
+    db, jds, _ = corpus
+    functions, _ = load_app_functions(APP, db, names=["find_keyword_matches", "with_detail_columns"])
+    matches = functions["find_keyword_matches"](jds[0]["structured_query"]["keywords"])
+    detailed = functions["with_detail_columns"](matches)
+    assert any(row["Resume ID"] is None for row in detailed)
+    for row in detailed:
+        if row["Resume ID"] is None:
+            assert row["Skills"] == row["Job Experiences"] == row["Educational Qualifications"] == ""
+        else:
+            resume = db["resumes"].find_one({"resumeId": row["Resume ID"]})
+            assert row["Skills"] == ", ".join(resume["keywords"])
@@ -0,0 +1,32 @@
+import numpy as np
+
+from cascade import shortlist
+from resume_index import build_resume_index
+
+
+def corpus_index():
+    # Rows 0-7 have keywords and no embedding, rows 8-9 an embedding and no keywords
+    resumes = [{"resumeId": f"R{i}", "email": f"c{i}", "keywords": ["python"] if i % 2 else ["python", "sql"]}
+               for i in range(8)]
+    resumes += [{"resumeId": f"R{i}", "email": f"c{i}", "embedding": [1.0, float(i)]} for i in range(8, 10)]
+    return build_resume_index(resumes)
+
+def test_vector_stage_falls_back_to_exact_keywords_without_an_embedding():
+    index = corpus_index()
+    assert np.array_equal(shortlist(index, ["python", "sql"], None, 3, "vector"),
+                          shortlist(index, ["python", "sql"], None, 3, "exact"))
+    assert len(shortlist(index, ["python", "sql"], None, 3, "vector")) == 3
+
+def test_union_fills_up_from_the_other_side():
+    index = corpus_index()
+    rows = shortlist(index, ["python", "sql"], [1.0, 1.0], 5, "union")
+    # Only two rows have vector scores, so keyword rows fill the rest
+    assert len(rows) == 5 and len(set(rows.tolist())) == 5
+    assert {8, 9} <= set(rows.tolist())
+    rows = shortlist(index, ["python", "sql"], None, 6, "union")
+    assert len(rows) == 6
+
+def test_union_takes_half_from_each_side_when_both_suffice():
+    index = corpus_index()
+    rows = shortlist(index, ["python"], [1.0, 1.0], 4, "union")
+    assert len(rows) == 4 and {8, 9} <= set(rows.tolist())
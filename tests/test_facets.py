@@ -0,0 +1,35 @@
+import numpy as np
+
+from facets import RowSet
+
+SIZE = 5000
+
+
+def row_set(mask):
+    return RowSet.from_rows(np.flatnonzero(mask), SIZE)
+
+def test_union_and_intersect_match_boolean_masks():
+    rng = np.random.default_rng(0)
+    dense = rng.random(SIZE) < 0.5
+    sparse = np.zeros(SIZE, dtype=bool)
+    sparse[[0, 1, 2, 3, 9, 10, 4995, 4999]] = True  # several rows per byte
+    other = np.zeros(SIZE, dtype=bool)
+    other[[1, 3, 10, 11, 4999]] = True
+
+    for masks in ([dense, sparse], [sparse, other], [dense, sparse, other], [dense, dense]):
+        sets = [row_set(mask) for mask in masks]
+        union = RowSet.union(sets, SIZE)
+        intersection = RowSet.intersect(sets, SIZE)
+        expected_union = np.logical_or.reduce(masks)
+        expected_intersection = np.logical_and.reduce(masks)
+        assert np.array_equal(union.to_rows(), np.flatnonzero(expected_union))
+        assert len(union) == expected_union.sum()
+        assert np.array_equal(np.sort(intersection.to_rows()), np.flatnonzero(expected_intersection))
+        assert len(intersection) == expected_intersection.sum()
+
+def test_union_of_all_rows_sharing_one_byte():
+    dense = np.zeros(SIZE, dtype=bool)
+    dense[8:] = True
+    sparse = np.zeros(SIZE, dtype=bool)
+    sparse[:4] = True
+    assert len(RowSet.union([row_set(dense), row_set(sparse)], SIZE)) == SIZE - 4
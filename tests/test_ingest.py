@@ -0,0 +1,50 @@
+import io
+import json
+
+import mongomock
+import pytest
+
+from ingest import ensure_indexes, ingest, read_json_array, read_resumes
+
+RESUMES = [{"resumeId": f"R{i}", "keywords": ["python", "sql"], "score": i * 1.5, "note": "a, b ] [ c"} for i in range(50)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_read_json_array_in_small_chunks(chunk_size):
+    f = io.StringIO(json.dumps(RESUMES, indent=1)[1:])
+    assert list(read_json_array(f, chunk_size)) == RESUMES
+
+def test_read_json_array_numbers_split_across_chunks():
+    assert list(read_json_array(io.StringIO(" 12345 , 6.75e2,[1]]"), 2)) == [12345, 675.0, [1]]
+
+def test_read_json_array_rejects_truncated_input():
+    with pytest.raises(ValueError):
+        list(read_json_array(io.StringIO('{"resumeId": "R1"}, {"resumeId"'), 4))
+
+def test_read_resumes_json_lines_and_array(tmp_path):
+    lines = tmp_path / "resumes.jsonl"
+    lines.write_text("\n".join(json.dumps(r) for r in RESUMES[:3]) + "\n\n")
+    array = tmp_path / "resumes.json"
+    array.write_text("  " + json.dumps(RESUMES[3:]))
+    assert list(read_resumes([str(lines), str(array)])) == RESUMES
+
+def test_ingest_refuses_upsert_with_incremental_updates():
+    with pytest.raises(ValueError):
+        ingest(None, iter(RESUMES), upsert=True, updater=object())
+
+def test_ingest_leaves_indexes_alone_by_default():
+    db = mongomock.MongoClient().db
+    totals = ingest(db, iter(RESUMES[:5]), batch_size=2, report=lambda line: None)
+    assert totals["written"] == 5
+    assert list(db["resumes"].index_information()) == ["_id_"]
+
+def test_ensure_indexes_reports_duplicate_resume_ids_without_creating_any():
+    collection = mongomock.MongoClient().db["resumes"]
+    collection.insert_many([{"resumeId": "R1"}, {"resumeId": "R2"}, {"resumeId": "R1"}, {"name": "no id"}])
+    with pytest.raises(ValueError, match="R1"):
+        ensure_indexes(collection)
+    assert list(collection.index_information()) == ["_id_"]
+
+    collection.delete_one({"resumeId": "R1"})
+    ensure_indexes(collection)
+    assert collection.index_information()["resumeId_1"]["unique"]
@@ -0,0 +1,79 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import mongomock
+import pytest
+
+from jd_embedding import EmbeddingCache, JdEmbedder, make_stub_handler, parse_embedding_response, stub_embedding
+
+JD = "Senior Python developer\n  with SQL and   Kubernetes experience"
+
+
+@pytest.fixture
+def stub():
+    handler = make_stub_handler(dim=16)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", handler
+    server.shutdown()
+    server.server_close()
+
+def test_embed_without_a_cache_calls_the_endpoint_every_time(stub):
+    url, handler = stub
+    embedder = JdEmbedder(url)
+    try:
+        result = embedder.embed(JD)
+        assert result["source"] == "endpoint"
+        assert result["embedding"] == pytest.approx(stub_embedding(" ".join(JD.split()), 16))
+        assert result["keywords"][:3] == ["Senior", "Python", "developer"]
+        assert embedder.embed(JD)["source"] == "endpoint"
+        assert handler.calls == 2
+    finally:
+        embedder.close()
+
+def test_disk_cache_hit_for_rewrapped_text(stub, tmp_path):
+    url, handler = stub
+    embedder = JdEmbedder(url, EmbeddingCache(str(tmp_path)))
+    try:
+        first = embedder.embed(JD)
+        second = embedder.embed(" ".join(JD.split()) + "\n")
+    finally:
+        embedder.close()
+    assert (first["source"], second["source"]) == ("endpoint", "disk")
+    assert second["embedding"] == first["embedding"] and second["keywords"] == first["keywords"]
+    assert handler.calls == 1
+
+def test_mongo_cache_hit_is_copied_to_disk(stub, tmp_path):
+    url, handler = stub
+    collection = mongomock.MongoClient().db["jd_embedding_cache"]
+    warm = JdEmbedder(url, EmbeddingCache(str(tmp_path / "a"), collection))
+    cold = JdEmbedder(url, EmbeddingCache(str(tmp_path / "b"), collection))
+    try:
+        expected = warm.embed(JD)
+        assert collection.count_documents({}) == 1
+        from_mongo = cold.embed(JD)
+        from_disk = cold.embed(JD)
+    finally:
+        warm.close()
+        cold.close()
+    assert (from_mongo["source"], from_disk["source"]) == ("mongo", "disk")
+    assert from_mongo["embedding"] == expected["embedding"] == from_disk["embedding"]
+    assert handler.calls == 1
+
+def test_embed_many_keeps_order_and_returns_errors_in_place(stub):
+    url, _ = stub
+    embedder = JdEmbedder(url)
+    try:
+        results = embedder.embed_many(["Go developer", "   ", "Rust developer"], max_workers=3)
+    finally:
+        embedder.close()
+    assert isinstance(results[1], ValueError)
+    assert results[0]["embedding"] == pytest.approx(stub_embedding("Go developer", 16))
+    assert results[2]["embedding"] == pytest.approx(stub_embedding("Rust developer", 16))
+
+def test_parse_embedding_response_from_a_proxy_body():
+    payload = {"statusCode": 200, "body": '{"embedding": [1, 2], "keywords": ["go"]}'}
+    assert parse_embedding_response(payload) == {"embedding": [1.0, 2.0], "keywords": ["go"]}
+    with pytest.raises(ValueError):
+        parse_embedding_response({"embedding": []})
@@ -0,0 +1,77 @@
+import random
+
+import mongomock
+import pytest
+from mongomock.collection import Collection
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+
+from batch_scorer import MATCHES_COLLECTION, load_jds, score_all, write_leaderboards_mongo
+from leaderboard_updates import LeaderboardUpdater, verify_leaderboards
+from resume_index import load_resume_index
+
+SKILLS = ["python", "Pythn", "java", "sql", "machine learning", "data analysis", "aws", "docker",
+          "kubernetes", "react", "node.js", "c++", "excel", "pandas", "spark", "power bi", "go", "rust"]
+TOP_N = 30
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # mongomock has no bulk_write; apply the operations one at a time
+    def bulk_write(self, operations, ordered=True, **kwargs):
+        for operation in operations:
+            if isinstance(operation, ReplaceOne):
+                self.replace_one(operation._filter, operation._doc, upsert=operation._upsert)
+            elif isinstance(operation, UpdateOne):
+                self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+            elif isinstance(operation, InsertOne):
+                self.insert_one(operation._doc)
+            else:
+                raise NotImplementedError(type(operation).__name__)
+
+    monkeypatch.setattr(Collection, "bulk_write", bulk_write)
+    return mongomock.MongoClient().resumes_database
+
+def synthetic_resumes(start, count, rng, dim=8):
+    # Emails repeat, so some new resumes duplicate an earlier candidate and must be skipped
+    return [
+        {
+            "resumeId": f"R{i}", "name": f"Candidate {i}", "email": f"c{rng.randint(0, 700)}", "contactNo": "1",
+            "keywords": rng.sample(SKILLS, rng.randint(0, 6)),
+            "embedding": [rng.gauss(0, 1) for _ in range(dim)] if rng.random() > 0.1 else None,
+        }
+        for i in range(start, start + count)
+    ]
+
+def synthetic_jd(job_id, rng, dim=8):
+    return {
+        "jobId": job_id,
+        "structured_query": {"keywords": rng.sample(SKILLS, rng.randint(1, 5))},
+        "embedding": [rng.gauss(0, 1) for _ in range(dim)],
+    }
+
+def test_incremental_inserts_match_a_full_recompute(db):
+    rng = random.Random(7)
+    db["resumes"].insert_many(synthetic_resumes(0, 300, rng))
+    db["job_description"].insert_many([synthetic_jd(f"J{i}", rng) for i in range(8)])
+    index = load_resume_index(db["resumes"])
+    write_leaderboards_mongo(db[MATCHES_COLLECTION], score_all(index, load_jds(db["job_description"]), TOP_N), len(index))
+
+    updater = LeaderboardUpdater(db, TOP_N)
+    new = synthetic_resumes(300, 400, rng)
+    for start in range(0, len(new), 37):
+        batch = new[start:start + 37]
+        db["resumes"].insert_many(batch)
+        updater.add_resumes(batch)
+    jd = synthetic_jd("J-new", rng)
+    db["job_description"].insert_one(jd)
+    updater.add_jds([jd], load_resume_index(db["resumes"]))
+
+    index = load_resume_index(db["resumes"])
+    assert len(index) > 300
+    assert verify_leaderboards(db, index, top_n=TOP_N) == {}
+    expected = score_all(index, load_jds(db["job_description"]), TOP_N)
+    for job_id, board in expected.items():
+        stored = db[MATCHES_COLLECTION].find_one({"jobId": job_id})
+        assert stored["keywords"] == board["keywords"]
+        assert stored["vector"] == board["vector"]
+        assert stored["corpusSize"] == len(index)
@@ -0,0 +1,79 @@
+import socket
+
+import mongomock
+import numpy as np
+import pytest
+
+import matcher_service
+from matcher_service import (
+    ScatterGatherMatcher,
+    launch_local_workers,
+    load_shard,
+    merge_ranked,
+    search_shard,
+    wait_until_healthy,
+)
+from resume_index import build_resume_index
+from shared_index import attach_index, publish_index
+
+SKILLS = ["python", "sql", "go", "rust", "java", "spark", "docker", "kubernetes"]
+
+
+def synthetic_resumes(rows=120, dim=8, seed=3):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "resumeId": f"R{i}", "email": f"c{i}",
+            "keywords": list(rng.choice(SKILLS, int(rng.integers(1, 5)), replace=False)),
+            "embedding": rng.standard_normal(dim).tolist(),
+        }
+        for i in range(rows)
+    ]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_load_shard_leaves_shards_beyond_the_id_ranges_empty(monkeypatch):
+    db = mongomock.MongoClient().db
+    db["resumes"].insert_many(synthetic_resumes(rows=4))
+    monkeypatch.setattr(matcher_service, "get_database", lambda uri=None: db)
+    monkeypatch.setattr(matcher_service, "id_ranges", lambda collection, num_ranges, query=None: [{}])
+    monkeypatch.setattr(matcher_service, "fetch_resumes_parallel", lambda collection, query: collection.find(query))
+
+    assert len(load_shard(0, 3)) == 4
+    assert len(load_shard(2, 3)) == 0
+
+def test_merged_results_skip_a_killed_worker(tmp_path):
+    num_shards = 3
+    index = build_resume_index(synthetic_resumes())
+    publish_index(index, str(tmp_path))
+    processes, urls = launch_local_workers(num_shards, free_port(), index_path=str(tmp_path))
+    try:
+        wait_until_healthy(urls, timeout=60)
+        processes[1].kill()
+        processes[1].wait()
+
+        matcher = ScatterGatherMatcher(urls, timeout=5)
+        try:
+            jd_keywords, jd_embedding = ["Python", "sql"], np.random.default_rng(9).standard_normal(8)
+            result = matcher.search(jd_keywords, jd_embedding, num_candidates=15)
+        finally:
+            matcher.close()
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+    assert result["missing_shards"] == [urls[1]]
+    attached = attach_index(str(tmp_path))
+    bounds = np.linspace(0, len(attached), num_shards + 1).astype(int)
+    partials = [search_shard(attached.slice(bounds[shard], bounds[shard + 1]), shard, jd_keywords,
+                             jd_embedding.tolist(), k=15) for shard in (0, 2)]
+    assert result["keywords"] == merge_ranked(partials, "keywords", "Match Percentage (Keywords)", 15)
+    assert result["vector"] == merge_ranked(partials, "vector", "Match Percentage (Vector)", 15)
+    assert result["keywords"] and result["vector"]
+    survivors = {entry["Resume ID"] for entry in result["vector"]}
+    killed_ids = set(attached.resume_ids[bounds[1]:bounds[2]])
+    assert not survivors & killed_ids
@@ -0,0 +1,18 @@
+import numpy as np
+
+from matching import rank_positions, reciprocal_rank_fusion
+
+
+def test_rank_positions_share_rank_on_ties():
+    ranks = rank_positions(np.array([50.0, 80.0, 50.0, np.nan, 80.0, 10.0]))
+    assert np.array_equal(ranks, [3, 1, 3, np.nan, 1, 5], equal_nan=True)
+
+def test_reciprocal_rank_fusion_scores_identical_inputs_equally():
+    keyword = np.full(4, 75.0)
+    vector = np.full(4, 60.0)
+    assert np.array_equal(reciprocal_rank_fusion(keyword, vector), [100.0] * 4)
+
+def test_reciprocal_rank_fusion_keeps_missing_rows_missing():
+    fused = reciprocal_rank_fusion(np.array([90.0, np.nan, 90.0]), np.array([np.nan, np.nan, 40.0]))
+    assert np.isnan(fused[1])
+    assert fused[2] > fused[0]
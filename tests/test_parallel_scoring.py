@@ -0,0 +1,40 @@
+import numpy as np
+
+from matching import keyword_result_rows, score_keywords, score_vectors, top_k, vector_result_rows
+from parallel_scoring import ShardedScorer
+from resume_index import build_resume_index
+from shared_index import attach_index, publish_index
+
+SKILLS = ["python", "sql", "go", "rust", "java", "spark", "docker", "kubernetes"]
+
+
+def synthetic_index(rows=300, dim=12, seed=1):
+    rng = np.random.default_rng(seed)
+    return build_resume_index([
+        {
+            "resumeId": f"R{i}", "email": f"c{i}",
+            "keywords": list(rng.choice(SKILLS, int(rng.integers(0, 5)), replace=False)),
+            "embedding": rng.standard_normal(dim).tolist() if i % 7 else None,
+        }
+        for i in range(rows)
+    ])
+
+def expected_matches(index, jd_keywords, jd_embedding, num_candidates=20):
+    jd_keywords_normalized, match_percentage, hits = score_keywords(index, jd_keywords)
+    rows = top_k(match_percentage, num_candidates)
+    keyword = keyword_result_rows(index, rows, match_percentage, hits, jd_keywords_normalized)
+    match_percentage = score_vectors(index, jd_embedding)
+    return keyword, vector_result_rows(index, top_k(match_percentage, num_candidates), match_percentage)
+
+def test_workers_on_a_published_version_match_a_single_process(tmp_path):
+    index = synthetic_index()
+    version = publish_index(index, str(tmp_path))
+    attached = attach_index(str(tmp_path), version)
+    jd_keywords, jd_embedding = ["Python", "sql", "Kubernetes"], np.random.default_rng(5).standard_normal(12).tolist()
+
+    with ShardedScorer(attached, num_shards=3, version=version, root=str(tmp_path)) as published, \
+            ShardedScorer(index, num_shards=3) as private:
+        assert published._memory is None
+        expected = expected_matches(index, jd_keywords, jd_embedding)
+        assert published.find_matches(jd_keywords, jd_embedding, 20) == expected
+        assert private.find_matches(jd_keywords, jd_embedding, 20) == expected
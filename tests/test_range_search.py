@@ -0,0 +1,51 @@
+import numpy as np
+
+from range_search import RangeSearchIndex, attach_or_build_range_index
+from resume_index import build_resume_index
+from shared_index import attach_index, publish_index
+
+
+def synthetic_index(rows=400, dim=40, seed=0):
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((5, dim))
+    resumes = [
+        {"resumeId": f"R{i}", "email": f"c{i}", "embedding": (topics[i % 5] + 0.5 * rng.standard_normal(dim)).tolist()}
+        for i in range(rows)
+    ]
+    return build_resume_index(resumes), topics
+
+def test_published_bounds_are_shared_and_search_like_private_ones(tmp_path):
+    index, topics = synthetic_index()
+    version = publish_index(index, str(tmp_path))
+    attached = attach_index(str(tmp_path), version)
+
+    first = attach_or_build_range_index(attached, version, str(tmp_path), block_size=16)
+    second = attach_or_build_range_index(attached, version, str(tmp_path), block_size=16)
+    private = RangeSearchIndex(index, block_size=16)
+    assert (tmp_path / version / "range_bounds_16").is_dir()
+    assert all(isinstance(block, np.memmap) for block in second.blocks)
+    assert second.boundaries == private.boundaries
+
+    for topic in topics:
+        expected = private.search(topic, 60.0)
+        assert len(expected[0])
+        for range_index in (first, second):
+            rows, match_percentage = range_index.search(topic, 60.0)
+            assert np.array_equal(rows, expected[0])
+            assert np.array_equal(match_percentage, expected[1])
+
+def test_without_a_version_bounds_are_built_privately(tmp_path):
+    index, _ = synthetic_index(rows=50)
+    range_index = attach_or_build_range_index(index, None, str(tmp_path))
+    assert not isinstance(range_index.blocks[0], np.memmap)
+    assert not any(tmp_path.iterdir())
+
+def test_single_embedded_row_uses_the_identity_basis():
+    index = build_resume_index([
+        {"resumeId": "R0", "email": "a", "embedding": [0.6, 0.8, 0.0]},
+        {"resumeId": "R1", "email": "b", "embedding": None},
+    ])
+    range_index = RangeSearchIndex(index, block_size=2)
+    assert np.array_equal(range_index.basis, np.eye(3, dtype=np.float32))
+    rows, match_percentage = range_index.search([0.6, 0.8, 0.0], 90.0)
+    assert rows.tolist() == [0] and match_percentage.tolist() == [100.0]
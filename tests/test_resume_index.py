@@ -0,0 +1,45 @@
+import numpy as np
+
+from resume_index import build_resume_index, concat_indexes
+
+
+def resume(i):
+    return {
+        "resumeId": f"R{i}",
+        "name": ["Ann", "Bo", "N/A"][i % 3],
+        "email": f"c{i}@example.com",
+        "keywords": [["Python", "SQL"], ["sql", "Go"], [], ["Rust"]][i % 4],
+        "embedding": [float(i % 5), 1.0, float(i % 2)] if i % 6 else None,
+    }
+
+def assert_same_index(actual, expected):
+    assert list(actual.resume_ids) == list(expected.resume_ids)
+    assert list(actual.names) == list(expected.names)
+    assert list(actual.candidate_keys) == list(expected.candidate_keys)
+    assert [actual.row_keywords(row) for row in range(len(actual))] == \
+        [expected.row_keywords(row) for row in range(len(expected))]
+    assert np.array_equal(actual.embeddings, expected.embeddings)
+    assert np.array_equal(actual.norms, expected.norms)
+
+def test_concat_indexes_matches_one_build():
+    resumes = [resume(i) for i in range(40)]
+    parts = [build_resume_index(resumes[:17]), build_resume_index(resumes[17:18]), build_resume_index(resumes[18:])]
+    assert_same_index(concat_indexes(parts), build_resume_index(resumes))
+
+def test_concat_indexes_of_slices_and_empty_parts():
+    index = build_resume_index([resume(i) for i in range(30)])
+    parts = [index.slice(0, 9), build_resume_index([]), index.slice(9, 30)]
+    assert_same_index(concat_indexes(parts), index)
+
+def test_concat_indexes_pads_parts_without_embeddings():
+    with_vectors = build_resume_index([resume(i) for i in range(1, 5)])
+    without = build_resume_index([{**resume(i), "embedding": None} for i in range(5, 8)])
+    combined = concat_indexes([with_vectors, without])
+    assert combined.embeddings.shape == (7, 3)
+    assert not combined.norms[4:].any()
+
+def test_keyword_matrix_of_selected_rows():
+    index = build_resume_index([resume(i) for i in range(25)])
+    rows = np.array([24, 3, 2, 2, 10, 0])
+    assert (index.keyword_matrix(rows) != index.keyword_matrix()[rows]).nnz == 0
+    assert index.keyword_matrix(rows[:0]).shape == (0, len(index.vocab))